@@ -0,0 +1,269 @@
+"""
+Crash-safe, resumable batch crawl.
+Scrapes a list of set URLs and appends every attempt and result to an fsync'd
+NDJSON journal as it happens. Re-running with the same journal only scrapes the
+URLs that haven't finished (or failed with a retryable error and still have
+attempts left), so a crash mid-batch costs only the remaining work.
+
+    python BatchCrawl.py urls.txt --journal crawl.journal --workers 4
+"""
+import os
+import re
+import json
+import time
+import argparse
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List
+
+from ScrapeCache import normalize_set_url
+
+DEFAULT_MAX_ATTEMPTS = 3
+
+STARTED = "started"
+DONE = "done"
+FAILED = "failed"
+
+# Error taxonomy: what went wrong, and whether trying again can help
+ERROR_CAPTCHA = "captcha"
+ERROR_RATE_LIMITED = "rate_limited"
+ERROR_TIMEOUT = "timeout"
+ERROR_DRIVER_CRASH = "driver_crash"
+ERROR_NETWORK = "network"
+ERROR_NOT_FOUND = "not_found"
+ERROR_EMPTY = "empty"
+ERROR_UNKNOWN = "unknown"
+PERMANENT_ERRORS = {ERROR_NOT_FOUND}
+
+DRIVER_CRASH_MARKERS = (
+    "invalid session id", "session deleted", "chrome not reachable", "no such window",
+    "target window already closed", "disconnected", "tab crashed", "crashed",
+)
+# URLs are cut out of messages before matching, so a set id or slug like
+# /4290417/ or "captcha-basics" can't pass for the error itself
+URL_PATTERN = re.compile(r"\b(?:https?|wss?|file)://\S+")
+
+
+def classify_error(error_type: str, message: str) -> str:
+    """Map an exception class name and message onto the error taxonomy"""
+    text = URL_PATTERN.sub(" ", message or "").lower()
+    error_type = error_type or ""
+    if "captcha" in text or error_type == "ChallengeError":
+        return ERROR_CAPTCHA
+    if re.search(r"\b429\b", text) or "rate limit" in text or error_type in ("RateLimitedError", "CircuitOpenError"):
+        return ERROR_RATE_LIMITED
+    if re.search(r"\b404\b", text) or "not found" in text:
+        return ERROR_NOT_FOUND
+    if "timeout" in error_type.lower() or "timed out" in text:
+        return ERROR_TIMEOUT
+    if error_type in ("InvalidSessionIdException", "NoSuchWindowException") or \
+            any(marker in text for marker in DRIVER_CRASH_MARKERS):
+        return ERROR_DRIVER_CRASH
+    if error_type in ("FetchError", "URLError", "ConnectionError") or "net::err" in text:
+        return ERROR_NETWORK
+    return ERROR_UNKNOWN
+
+
+def read_url_list(path: str) -> List[str]:
+    """URLs one per line; blank lines and # comments are skipped"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.strip().startswith('#')]
+
+
+class CrawlJournal:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = None
+
+    def open(self) -> None:
+        self._file = open(self.path, 'a', encoding='utf-8')
+        # Terminate a torn last line so the next record starts on a line of its own
+        if self._file.tell() > 0:
+            with open(self.path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    self._file.write("\n")
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def append(self, record: Dict) -> None:
+        """Write one record and make sure it is on disk before returning"""
+        line = json.dumps(dict(record, ts=time.time()), ensure_ascii=False) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def records(self) -> Iterator[Dict]:
+        """Replay the journal, skipping a torn last line left by a crash"""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+    def state(self) -> Dict[str, Dict]:
+        """Latest status and attempt count per set, without holding any cards in memory"""
+        state = {}
+        for record in self.records():
+            entry = state.setdefault(record['key'], {'url': record['url'], 'status': None,
+                                                     'attempts': 0, 'error_kind': None})
+            if record['status'] == STARTED:
+                entry['attempts'] += 1
+                if entry['status'] != DONE:
+                    entry['status'] = STARTED
+            elif entry['status'] != DONE:
+                entry['status'] = record['status']
+                entry['error_kind'] = record.get('error_kind')
+        return state
+
+    def results(self) -> Iterator[Dict]:
+        """Every finished set: {'url', 'flashcards'}"""
+        for record in self.records():
+            if record['status'] == DONE:
+                yield {'url': record['url'], 'flashcards': record.get('flashcards', [])}
+
+
+def pending_urls(urls: List[str], state: Dict[str, Dict], max_attempts: int) -> List[str]:
+    """URLs that still need scraping after replaying the journal"""
+    pending = []
+    seen = set()
+    for url in urls:
+        key = normalize_set_url(url)
+        if key in seen:
+            continue
+        seen.add(key)
+
+        entry = state.get(key)
+        if entry is None:
+            pending.append(url)
+        elif entry['status'] == DONE:
+            continue
+        elif entry['error_kind'] in PERMANENT_ERRORS:
+            continue
+        elif entry['attempts'] < max_attempts:
+            # Includes sets that were in flight when the last run died
+            pending.append(url)
+    return pending
+
+
+class BatchCrawl:
+    def __init__(self, journal_path: str, scrape: Callable[[str], Dict], workers: int = 1,
+                 max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+        # scrape(url) returns a DriverPool-style result: {'flashcards', 'error', 'error_type'}
+        self.journal = CrawlJournal(journal_path)
+        self.scrape = scrape
+        self.workers = workers
+        self.max_attempts = max_attempts
+
+    def _crawl_one(self, url: str) -> str:
+        key = normalize_set_url(url)
+        self.journal.append({'key': key, 'url': url, 'status': STARTED})
+        try:
+            result = self.scrape(url)
+        except Exception as e:
+            result = {'flashcards': [], 'error': str(e), 'error_type': type(e).__name__}
+
+        if result.get('error'):
+            kind = classify_error(result.get('error_type'), result['error'])
+        elif not result.get('flashcards'):
+            kind = ERROR_EMPTY
+        else:
+            self.journal.append({'key': key, 'url': url, 'status': DONE,
+                                 'card_count': len(result['flashcards']),
+                                 'flashcards': result['flashcards']})
+            return DONE
+
+        self.journal.append({'key': key, 'url': url, 'status': FAILED, 'error_kind': kind,
+                             'error': result.get('error')})
+        return kind
+
+    def run(self, urls: List[str]) -> Counter:
+        """Crawl every URL the journal doesn't already have, retrying failures up to max_attempts"""
+        outcomes = Counter()
+        self.journal.open()
+        try:
+            while True:
+                pending = pending_urls(urls, self.journal.state(), self.max_attempts)
+                if not pending:
+                    break
+                print(f"Crawling {len(pending)} of {len(urls)} sets")
+                with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                    for outcome in executor.map(self._crawl_one, pending):
+                        outcomes[outcome] += 1
+        finally:
+            self.journal.close()
+        return outcomes
+
+    def summary(self) -> Counter:
+        """Final status (or error kind) of every set in the journal"""
+        return Counter(entry['error_kind'] if entry['status'] == FAILED else entry['status']
+                       for entry in self.journal.state().values())
+
+
+if __name__ == "__main__":
+    from DriverPool import DriverPool
+    from Scheduler import CrawlScheduler, HostLimits
+
+    parser = argparse.ArgumentParser(description="Resumable batch crawl of Quizlet sets")
+    parser.add_argument("url_list", help="file with one set URL per line")
+    parser.add_argument("--journal", default="crawl.journal")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--max-attempts", type=int, default=DEFAULT_MAX_ATTEMPTS)
+    parser.add_argument("--export", help="write every finished set to this JSON file")
+    parser.add_argument("--shard-dir", help="write every finished set to its own file in this directory")
+    parser.add_argument("--shard-format", default=".ndjson.gz", help="extension of the shard files")
+    parser.add_argument("--corpus", help="ingest every finished set into this SQLite corpus")
+    parser.add_argument("--snapshots", help="publish every finished set as a new version in this directory")
+    parser.add_argument("--rate", type=float, default=0.5, help="starting pages per second per host")
+    parser.add_argument("--max-rate", type=float, default=2.0)
+    parser.add_argument("--host-concurrency", type=int, default=2)
+    args = parser.parse_args()
+
+    urls = read_url_list(args.url_list)
+    scheduler = CrawlScheduler(HostLimits(rate=args.rate, max_rate=args.max_rate,
+                                          concurrency=args.host_concurrency))
+    with DriverPool(size=args.workers) as pool:
+        crawl = BatchCrawl(args.journal, scheduler.wrap(pool.scrape), workers=args.workers,
+                           max_attempts=args.max_attempts)
+        crawl.run(urls)
+
+    for host, state in scheduler.status().items():
+        print(f"{host}: {state}")
+
+    for status, count in crawl.summary().most_common():
+        print(f"{status:<16}{count:>8}")
+
+    if args.export:
+        with open(args.export, 'w', encoding='utf-8') as f:
+            json.dump({'sets': list(crawl.journal.results())}, f, ensure_ascii=False)
+        print(f"Exported finished sets to {args.export}")
+
+    if args.shard_dir:
+        from OutputSinks import ShardedOutput
+        with ShardedOutput(args.shard_dir, args.shard_format) as shards:
+            written = sum(1 for result in crawl.journal.results()
+                          if shards.write_set(result['url'], result['flashcards']))
+        print(f"Wrote {written} set files to {args.shard_dir}")
+
+    if args.corpus:
+        from Corpus import Corpus
+        with Corpus(args.corpus) as corpus:
+            for result in crawl.journal.results():
+                corpus.ingest(result['url'], result['flashcards'], source="batch-crawl")
+            print(f"Corpus now holds {corpus.stats()}")
+
+    if args.snapshots:
+        from Snapshots import SnapshotStore
+        store = SnapshotStore(args.snapshots)
+        changed = sum(1 for result in crawl.journal.results()
+                      if store.publish(result['url'], result['flashcards'])['changed'])
+        print(f"Published {changed} changed sets to {args.snapshots}")
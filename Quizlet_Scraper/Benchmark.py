@@ -0,0 +1,309 @@
+"""
+Offline benchmark suite for the scraper.
+Serves synthetic terms-list pages (10 to 50,000 cards) from a local HTTP server and
+drives the real reader code against FakeWebDriver, reporting wall time, WebDriver
+round trips, peak memory and cards per second for each extraction strategy, pacing
+profile and save_to_json. Results are written as JSON so runs can be compared
+across commits:
+
+    python Benchmark.py --output bench.json
+    python Benchmark.py --output new.json --compare bench.json
+"""
+import os
+import json
+import time
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+import tracemalloc
+from collections import Counter
+from html import escape
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import List, Dict, Callable
+
+from ChromeViewerLinux import RenderStealthReader
+from Extraction import EXTRACT_BULK, EXTRACT_ELEMENTS, EXTRACT_HARVEST
+from FakeDriver import FakeWebDriver, DEFAULT_LATENCY
+from HttpFetcher import fetch_flashcards
+from Metrics import Metrics
+from Pacing import Pacer, PacingProfile, HostClock, PROFILES
+from ResourcePolicy import POLICIES
+
+DEFAULT_SIZES = [10, 100, 1000, 10000, 50000]
+# Per-element extraction costs two round trips per card; cap it to keep runs short
+DEFAULT_MAX_ELEMENTS_SIZE = 10000
+PACING_PAGE_SIZE = 100
+
+# Sub-resources every fixture page pulls in, to check what a resource policy blocks
+FIXTURE_ASSETS = {
+    '/asset/logo.png': ('image/png', b'\x89PNG\r\n\x1a\n'),
+    '/asset/font.woff2': ('font/woff2', b'wOF2'),
+    '/asset/style.css': ('text/css', b'body { margin: 0; }'),
+    '/asset/app.js': ('application/javascript', b'window.appLoaded = true;'),
+    '/asset/doubleclick.net/ad.js': ('application/javascript', b'window.adLoaded = true;'),
+}
+
+# No delays at all, so extraction benchmarks measure only extraction
+NO_DELAY = PacingProfile(
+    'none',
+    host_interval=(0, 0),
+    homepage_dwell=(0, 0),
+    post_load=(0, 0),
+    scroll_pause=(0, 0),
+    scroll_back_pause=(0, 0),
+    scroll_back_chance=0.0,
+    pre_extract=(0, 0),
+    page_budget=0.0,
+    poll_interval=0.0,
+    idle_window=0.0,
+)
+
+
+def make_fixture_page(card_count: int) -> bytes:
+    """A set page shaped like Quizlet's server-rendered terms list"""
+    parts = ['<html><head><title>Fixture set</title>',
+             '<link rel="stylesheet" href="/asset/style.css">',
+             '<style>@font-face { font-family: F; src: url(/asset/font.woff2); } body { font-family: F; }</style>',
+             '<script src="/asset/app.js"></script><script src="/asset/doubleclick.net/ad.js"></script>',
+             '</head><body><img src="/asset/logo.png">',
+             '<section data-testid="terms-list">']
+    for i in range(card_count):
+        term = escape(f"Question {i}\nSelect one:\na. option {i}\nb. vision\nc. positioning")
+        definition = escape(f"b. vision {i}")
+        parts.append(
+            f'<div class="SetPageTerm" id="term-{i}">'
+            f'<span class="TermText notranslate lang-en">{term}</span>'
+            f'<span class="TermText notranslate lang-en">{definition}</span>'
+            f'</div>'
+        )
+    parts.append('</section></body></html>')
+    return "".join(parts).encode('utf-8')
+
+
+class FixtureServer:
+    """Local HTTP server for /set/<card_count> fixture pages and their assets"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        pages = {}
+        self.requests = 0
+        # Requests received per path, to see what the browser actually fetched
+        self.paths = Counter()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests += 1
+                server.paths[self.path] += 1
+                if self.path in FIXTURE_ASSETS:
+                    content_type, body = FIXTURE_ASSETS[self.path]
+                    self.send_response(200)
+                    self.send_header("Content-Type", content_type)
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                    return
+
+                parts = self.path.strip('/').split('/')
+                if len(parts) != 2 or parts[0] != 'set' or not parts[1].isdigit():
+                    self.send_error(404)
+                    return
+                card_count = int(parts[1])
+                if card_count not in pages:
+                    pages[card_count] = make_fixture_page(card_count)
+                body = pages[card_count]
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def url(self, card_count: int) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/set/{card_count}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def make_reader(latency: float, lazy: bool, profile) -> (RenderStealthReader, FakeWebDriver):
+    """A real reader wrapped around a fake driver, with its own pacer and metrics"""
+    driver = FakeWebDriver(latency=latency, lazy=lazy)
+    reader = RenderStealthReader.from_driver(driver, metrics=Metrics())
+    reader.pacer = Pacer(profile, host_clock=HostClock())
+    return reader, driver
+
+
+def measure(name: str, size: int, run: Callable[[], int], round_trips: Callable[[], int] = None) -> Dict:
+    """Time one benchmark case, tracking peak traced memory"""
+    tracemalloc.start()
+    started = time.perf_counter()
+    cards = run()
+    wall = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result = {
+        'case': name,
+        'size': size,
+        'cards': cards,
+        'wall_s': round(wall, 6),
+        'round_trips': round_trips() if round_trips else None,
+        'peak_mem_bytes': peak,
+        'cards_per_s': round(cards / wall, 1) if wall > 0 else None,
+    }
+    print(f"{name:<24}{size:>8}{cards:>8}{wall:>10.3f}s"
+          f"{result['round_trips'] if result['round_trips'] is not None else '-':>10}"
+          f"{peak / 1024 / 1024:>10.1f}MB{result['cards_per_s'] or 0:>12.0f}/s")
+    return result
+
+
+def bench_extraction(server: FixtureServer, size: int, strategy: str, latency: float, lazy: bool) -> Dict:
+    reader, driver = make_reader(latency, lazy, NO_DELAY)
+    driver.get(server.url(size))
+    driver.reset_counts()
+    return measure(f"extract:{strategy}", size,
+                   lambda: len(reader.extract_flashcards(strategy=strategy)),
+                   lambda: driver.command_count)
+
+
+def bench_http(server: FixtureServer, size: int) -> Dict:
+    return measure("extract:http", size, lambda: len(fetch_flashcards(server.url(size))), lambda: 1)
+
+
+def bench_pacing(server: FixtureServer, profile_name: str, latency: float) -> Dict:
+    reader, driver = make_reader(latency, False, PROFILES[profile_name])
+
+    def run():
+        reader.open_url(server.url(PACING_PAGE_SIZE), start_at_homepage=False)
+        return len(reader.extract_flashcards())
+
+    result = measure(f"pacing:{profile_name}", PACING_PAGE_SIZE, run, lambda: driver.command_count)
+    result['slept_s'] = round(reader.pacer.page_slept, 6)
+    return result
+
+
+def bench_save(size: int, output_dir: str) -> Dict:
+    reader, _ = make_reader(0, False, NO_DELAY)
+    flashcards = [{'term': f"Question {i}", 'definition': f"Answer {i}"} for i in range(size)]
+    output_file = os.path.join(output_dir, f"save-{size}.json")
+    result = measure("save_to_json", size, lambda: reader.save_to_json(flashcards, output_file)['cards'])
+    result['bytes'] = os.path.getsize(output_file)
+    return result
+
+
+def check_resource_policies(policy_names: List[str]) -> List[Dict]:
+    """Load a fixture page in real Chrome under each policy and see what reached the server"""
+    results = []
+    for name in policy_names:
+        with FixtureServer() as server:
+            reader = RenderStealthReader(resource_policy=name, pacing='fast')
+            try:
+                reader.open_url(server.url(PACING_PAGE_SIZE), start_at_homepage=False)
+                cards = len(reader.extract_flashcards())
+            finally:
+                reader.close()
+            fetched = sorted(path for path in server.paths if path in FIXTURE_ASSETS)
+            result = {
+                'case': f"resources:{name}",
+                'size': PACING_PAGE_SIZE,
+                'cards': cards,
+                'server_requests': server.requests,
+                'assets_fetched': fetched,
+                'page_stats': reader.page_stats,
+            }
+            print(f"{result['case']:<24}{server.requests:>6} requests  fetched: {', '.join(fetched) or '-'}")
+            results.append(result)
+    return results
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: List[Dict], baseline_path: str) -> None:
+    """Print wall time and round trip ratios against an earlier results file"""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    previous = {(r['case'], r['size']): r for r in baseline['results']}
+
+    print(f"\nCompared with {baseline.get('commit') or baseline_path}:")
+    print(f"{'case':<24}{'size':>8}{'wall x':>10}{'trips x':>10}")
+    for result in results:
+        old = previous.get((result['case'], result['size']))
+        if not old or 'wall_s' not in result or 'wall_s' not in old:
+            continue
+        wall = result['wall_s'] / old['wall_s'] if old['wall_s'] else float('nan')
+        trips = (result['round_trips'] / old['round_trips']
+                 if result['round_trips'] and old.get('round_trips') else float('nan'))
+        print(f"{result['case']:<24}{result['size']:>8}{wall:>10.2f}{trips:>10.2f}")
+
+
+def run_suite(sizes: List[int], latency: float, lazy: bool, pacing: List[str], max_elements_size: int) -> List[Dict]:
+    results = []
+    print(f"{'case':<24}{'size':>8}{'cards':>8}{'wall':>11}{'trips':>10}{'peak':>12}{'rate':>14}")
+    with FixtureServer() as server, tempfile.TemporaryDirectory() as output_dir:
+        for size in sizes:
+            results.append(bench_extraction(server, size, EXTRACT_BULK, latency, lazy))
+            results.append(bench_extraction(server, size, EXTRACT_HARVEST, latency, lazy))
+            if size <= max_elements_size:
+                results.append(bench_extraction(server, size, EXTRACT_ELEMENTS, latency, lazy))
+            results.append(bench_http(server, size))
+            results.append(bench_save(size, output_dir))
+        for profile_name in pacing:
+            results.append(bench_pacing(server, profile_name, latency))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline scraper benchmarks")
+    parser.add_argument("--sizes", default=",".join(str(size) for size in DEFAULT_SIZES),
+                        help="comma separated card counts")
+    parser.add_argument("--latency", type=float, default=DEFAULT_LATENCY,
+                        help="simulated seconds per WebDriver round trip")
+    parser.add_argument("--lazy", action="store_true", help="only render cards scrolled near the viewport")
+    parser.add_argument("--pacing", default="fast,balanced",
+                        help="comma separated pacing profiles to benchmark (stealthy takes ~20s)")
+    parser.add_argument("--max-elements-size", type=int, default=DEFAULT_MAX_ELEMENTS_SIZE)
+    parser.add_argument("--chrome-resources", action="store_true",
+                        help="also check each resource policy in real Chrome against the fixture server")
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--compare", help="earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',') if size]
+    pacing = [name for name in args.pacing.split(',') if name]
+    results = run_suite(sizes, args.latency, args.lazy, pacing, args.max_elements_size)
+    if args.chrome_resources:
+        results.extend(check_resource_policies(list(POLICIES)))
+
+    report = {
+        'commit': git_commit(),
+        'timestamp': time.time(),
+        'python': platform.python_version(),
+        'latency': args.latency,
+        'lazy': args.lazy,
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved results to {args.output}")
+    if args.compare:
+        compare(results, args.compare)
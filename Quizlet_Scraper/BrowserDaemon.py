@@ -0,0 +1,358 @@
+"""
+Warm browser daemon.
+Keeps stealth-prepared Chrome sessions running so short-lived scrapes can attach to
+one over its remote-debugging endpoint instead of cold-starting Chrome. The daemon
+owns the browsers: clients lease a session, attach, scrape, and hand it back; the
+daemon then resets the tab. Linux OS Only!! (built on RenderStealthReader)
+
+    python BrowserDaemon.py --size 2            # start the daemon
+    with WarmSession() as reader:               # in a scrape script
+        reader.open_url(url, start_at_homepage=False)
+        flashcards = reader.extract_flashcards()
+"""
+import os
+import json
+import time
+import uuid
+import shutil
+import argparse
+import tempfile
+import threading
+import urllib.request
+import urllib.error
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, Optional
+
+from selenium import webdriver
+
+from ChromeViewerLinux import RenderStealthReader
+from Pacing import DEFAULT_PROFILE
+from DriverWatchdog import DriverWatchdog
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 9400
+DEFAULT_DAEMON_URL = f"http://{DEFAULT_HOST}:{DEFAULT_PORT}"
+# Daemon browsers get their own port range so they never collide with a DriverPool
+DAEMON_BASE_PORT = 9300
+DEFAULT_SIZE = 1
+# A lease not returned within this many seconds is reclaimed
+DEFAULT_LEASE_TIMEOUT = 300
+
+
+class DaemonError(RuntimeError):
+    """The daemon is unreachable or has no session to hand out"""
+
+
+class WarmBrowser:
+    def __init__(self, reader: RenderStealthReader):
+        self.session_id = uuid.uuid4().hex
+        self.reader = reader
+        self.leased_at = None
+        # Set while release() resets or replaces it, outside the daemon lock
+        self.releasing = False
+        self.pages_served = 0
+
+    @property
+    def debugger_address(self) -> str:
+        return f"127.0.0.1:{self.reader.debugging_port}"
+
+    def to_dict(self) -> Dict:
+        return {
+            'session_id': self.session_id,
+            'debugger_address': self.debugger_address,
+            'leased': self.leased_at is not None,
+            'pages_served': self.pages_served,
+        }
+
+
+def reset_tab(driver) -> None:
+    """Close extra tabs and leave the first one blank"""
+    handles = driver.window_handles
+    for handle in handles[1:]:
+        driver.switch_to.window(handle)
+        driver.close()
+    driver.switch_to.window(handles[0])
+    driver.get("about:blank")
+
+
+class BrowserDaemon:
+    def __init__(self, size: int = DEFAULT_SIZE, base_port: int = DAEMON_BASE_PORT,
+                 lease_timeout: float = DEFAULT_LEASE_TIMEOUT, reader_class=RenderStealthReader,
+                 watchdog: DriverWatchdog = None):
+        self.size = size
+        self.base_port = base_port
+        self.lease_timeout = lease_timeout
+        self.reader_class = reader_class
+        self.watchdog = watchdog or DriverWatchdog()
+        self.profile_root = tempfile.mkdtemp(prefix="quizlet-daemon-")
+        self.browsers = {}
+        # Port slots whose browser failed to (re)start; lease() retries them
+        self._vacant = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+        for index in range(size):
+            browser = self._start_browser(index)
+            if browser is not None:
+                self.browsers[browser.session_id] = browser
+            else:
+                self._vacant.append(index)
+        if not self.browsers:
+            raise RuntimeError("Could not start any warm browsers")
+
+        self._reaper = threading.Thread(target=self._reap_expired_leases, name="lease-reaper", daemon=True)
+        self._reaper.start()
+        print(f"Browser daemon warmed {len(self.browsers)} sessions")
+
+    def _start_browser(self, index: int) -> Optional[WarmBrowser]:
+        """Cold start a browser for a port slot; the caller files it under the lock"""
+        profile_dir = os.path.join(self.profile_root, f"profile-{index}")
+        os.makedirs(profile_dir, exist_ok=True)
+        try:
+            reader = self.reader_class(debugging_port=self.base_port + index, profile_dir=profile_dir)
+        except Exception as e:
+            print(f"Error starting warm browser {index}: {str(e)}")
+            return None
+        return WarmBrowser(reader)
+
+    def _replace(self, browser: WarmBrowser) -> None:
+        """Swap a dead browser for a fresh one in the same port slot, or leave the slot
+        vacant for lease() to retry if the fresh one won't start. Called without the
+        lock held: the cold start takes seconds."""
+        try:
+            browser.reader.close()
+        except Exception:
+            pass
+        with self._lock:
+            self.browsers.pop(browser.session_id, None)
+        index = browser.reader.debugging_port - self.base_port
+        fresh = self._start_browser(index)
+        with self._lock:
+            if fresh is not None:
+                self.browsers[fresh.session_id] = fresh
+            else:
+                self._vacant.append(index)
+
+    def lease(self) -> WarmBrowser:
+        """Hand out an idle session, restarting a vacant slot if none is idle"""
+        with self._lock:
+            for browser in self.browsers.values():
+                if browser.leased_at is None:
+                    browser.leased_at = time.monotonic()
+                    return browser
+            if not self._vacant:
+                raise DaemonError("No idle browser sessions")
+            index = self._vacant.pop(0)
+        fresh = self._start_browser(index)
+        with self._lock:
+            if fresh is None:
+                self._vacant.append(index)
+                raise DaemonError("No idle browser sessions")
+            fresh.leased_at = time.monotonic()
+            self.browsers[fresh.session_id] = fresh
+            return fresh
+
+    def release(self, session_id: str, pages: int = 1) -> None:
+        """Take a session back, resetting its tab (or replacing it if it died)"""
+        # Claim it under the lock, then do the slow browser work without it; the
+        # session stays leased, so lease() won't hand it out meanwhile
+        with self._lock:
+            browser = self.browsers.get(session_id)
+            if browser is None or browser.leased_at is None or browser.releasing:
+                raise DaemonError(f"Session {session_id} is not leased")
+            browser.releasing = True
+            browser.pages_served += pages
+
+        for _ in range(pages):
+            self.watchdog.page_done(browser.reader)
+        try:
+            reset_tab(browser.reader.driver)
+        except Exception as e:
+            print(f"Warm browser {session_id} failed to reset, replacing it: {str(e)}")
+            self._replace(browser)
+            return
+
+        # The session is idle now, so this is the safe point to recycle it
+        recycle, reason = self.watchdog.check(browser.reader)
+        if recycle:
+            print(f"Recycling warm browser {session_id}: {reason}")
+            self.watchdog.forget(browser.reader)
+            self._replace(browser)
+            return
+        with self._lock:
+            browser.releasing = False
+            browser.leased_at = None
+
+    def _reap_expired_leases(self) -> None:
+        while not self._stop.wait(5):
+            now = time.monotonic()
+            with self._lock:
+                expired = [browser.session_id for browser in self.browsers.values()
+                           if browser.leased_at is not None and not browser.releasing and
+                           now - browser.leased_at > self.lease_timeout]
+            for session_id in expired:
+                print(f"Reclaiming expired lease {session_id}")
+                try:
+                    self.release(session_id, pages=0)
+                except DaemonError:
+                    pass
+
+    def status(self) -> Dict:
+        with self._lock:
+            return {'sessions': [browser.to_dict() for browser in self.browsers.values()],
+                    'vacant_slots': len(self._vacant)}
+
+    def close(self) -> None:
+        self._stop.set()
+        with self._lock:
+            for browser in self.browsers.values():
+                try:
+                    browser.reader.close()
+                except Exception as e:
+                    print(f"Error closing warm browser: {str(e)}")
+            self.browsers = {}
+            self._vacant = []
+        shutil.rmtree(self.profile_root, ignore_errors=True)
+
+
+class DaemonRequestHandler(BaseHTTPRequestHandler):
+    # Set by make_server
+    daemon: BrowserDaemon = None
+
+    def _send_json(self, status: int, payload: Dict) -> None:
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self) -> Dict:
+        length = int(self.headers.get('Content-Length', 0))
+        try:
+            return json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            return {}
+
+    def do_POST(self):
+        try:
+            if self.path == '/lease':
+                self._send_json(200, self.daemon.lease().to_dict())
+            elif self.path == '/release':
+                payload = self._read_json()
+                self.daemon.release(payload.get('session_id'), pages=payload.get('pages', 1))
+                self._send_json(200, {'released': True})
+            else:
+                self._send_json(404, {'error': 'not found'})
+        except DaemonError as e:
+            self._send_json(503, {'error': str(e)})
+
+    def do_GET(self):
+        if self.path == '/status':
+            self._send_json(200, self.daemon.status())
+        else:
+            self._send_json(404, {'error': 'not found'})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(daemon: BrowserDaemon, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> ThreadingHTTPServer:
+    handler = type('BoundDaemonRequestHandler', (DaemonRequestHandler,), {'daemon': daemon})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def _call_daemon(daemon_url: str, path: str, payload: Dict = None) -> Dict:
+    request = urllib.request.Request(f"{daemon_url}{path}", data=json.dumps(payload or {}).encode('utf-8'),
+                                     headers={"Content-Type": "application/json"}, method='POST')
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            return json.load(response)
+    except urllib.error.HTTPError as e:
+        raise DaemonError(f"Daemon refused {path}: {e.read().decode('utf-8', errors='replace')}")
+    except (urllib.error.URLError, OSError) as e:
+        raise DaemonError(f"Browser daemon not reachable at {daemon_url}: {str(e)}")
+
+
+def attach_driver(debugger_address: str):
+    """Connect a new chromedriver to an already running Chrome"""
+    options = webdriver.ChromeOptions()
+    options.add_experimental_option("debuggerAddress", debugger_address)
+    return webdriver.Chrome(service=webdriver.ChromeService(executable_path=os.environ.get('CHROMEDRIVER')),
+                            options=options)
+
+
+class WarmSession:
+    """Lease a warm browser and wrap it in a reader; gives it back on exit"""
+
+    def __init__(self, daemon_url: str = DEFAULT_DAEMON_URL, pacing: str = DEFAULT_PROFILE):
+        self.daemon_url = daemon_url
+        self.pacing = pacing
+        self.lease = None
+        self.reader = None
+
+    def __enter__(self) -> RenderStealthReader:
+        self.lease = _call_daemon(self.daemon_url, '/lease')
+        try:
+            driver = attach_driver(self.lease['debugger_address'])
+        except Exception as e:
+            try:
+                _call_daemon(self.daemon_url, '/release', {'session_id': self.lease['session_id'], 'pages': 0})
+            except DaemonError as release_error:
+                print(f"Error releasing warm browser {self.lease['session_id']}: {str(release_error)}")
+            # Can't use the warm session after all; callers fall back to a cold start
+            raise DaemonError(f"Could not attach to warm browser {self.lease['debugger_address']}: {str(e)}") from e
+        self.reader = RenderStealthReader.from_driver(driver, pacing=self.pacing)
+        return self.reader
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # Only stops our chromedriver (the reader was made with from_driver)
+        try:
+            self.reader.close()
+        except Exception as e:
+            print(f"Error detaching from warm browser: {str(e)}")
+        # A failed release must not throw away the scrape it followed; the daemon
+        # reclaims the lease once it expires
+        try:
+            _call_daemon(self.daemon_url, '/release', {'session_id': self.lease['session_id']})
+        except DaemonError as e:
+            print(f"Error releasing warm browser {self.lease['session_id']}: {str(e)}")
+
+
+def scrape_warm(url: str, daemon_url: str = DEFAULT_DAEMON_URL, fallback: bool = True):
+    """Scrape on a warm session, cold-starting a reader only if the daemon is unavailable"""
+    try:
+        with WarmSession(daemon_url, pacing='fast') as reader:
+            reader.open_url(url, start_at_homepage=False)
+            return reader.extract_flashcards()
+    except DaemonError as e:
+        if not fallback:
+            raise
+        print(f"No warm browser available, cold starting Chrome: {str(e)}")
+
+    reader = RenderStealthReader()
+    try:
+        reader.open_url(url)
+        return reader.extract_flashcards()
+    finally:
+        reader.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Keep warm stealth Chrome sessions for scrapers to attach to")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--size", type=int, default=DEFAULT_SIZE)
+    parser.add_argument("--lease-timeout", type=float, default=DEFAULT_LEASE_TIMEOUT)
+    args = parser.parse_args()
+
+    daemon = BrowserDaemon(size=args.size, lease_timeout=args.lease_timeout)
+    server = make_server(daemon, args.host, args.port)
+    print(f"Browser daemon listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        daemon.close()
@@ -0,0 +1,362 @@
+"""
+Chrome and chromedriver provisioning for Linux hosts (Render and the like).
+Finds a matching Chrome/chromedriver pair and exports it as CHROME_BINARY and
+CHROMEDRIVER, doing as little as possible on the way:
+
+    1. Chrome and chromedriver already on the machine, same major version: use them
+    2. The pinned (or last provisioned) version already in the cache: use it, no network
+    3. Otherwise download that version's pair from Chrome for Testing into the cache
+
+Downloads are checked against sha256 sums when they are pinned (CHROME_SHA256 /
+CHROMEDRIVER_SHA256, or --sha256). Otherwise the sums seen on download are recorded,
+and cached binaries are checked against their recorded size (or full hash with
+--verify) on later runs. A version is only used once its directory is complete, so
+an interrupted download is simply redone.
+
+    CHROME_VERSION=131.0.6778.85 python BrowserProvision.py
+    python BrowserProvision.py --index-url http://127.0.0.1:8000/known-good.json   # local mirror
+
+Chrome for Testing builds still need the usual shared libraries (libnss3 and co.)
+from the base image.
+"""
+import os
+import sys
+import json
+import stat
+import shutil
+import hashlib
+import zipfile
+import argparse
+import tempfile
+import subprocess
+import urllib.error
+import urllib.request
+from typing import Dict, Optional
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Chrome for Testing: every version with downloads, and the current one per channel
+KNOWN_GOOD_URL = "https://googlechromelabs.github.io/chrome-for-testing/known-good-versions-with-downloads.json"
+LAST_KNOWN_GOOD_URL = "https://googlechromelabs.github.io/chrome-for-testing/last-known-good-versions-with-downloads.json"
+DEFAULT_CHANNEL = "Stable"
+DEFAULT_PLATFORM = "linux64"
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "quizlet-browsers")
+DOWNLOAD_TIMEOUT = 120
+
+CHROME = "chrome"
+CHROMEDRIVER = "chromedriver"
+ARTIFACTS = (CHROME, CHROMEDRIVER)
+# Where each artifact's executable sits inside its zip
+EXECUTABLES = {CHROME: "chrome-{platform}/chrome", CHROMEDRIVER: "chromedriver-{platform}/chromedriver"}
+SYSTEM_BINARIES = {
+    CHROME: ("google-chrome", "google-chrome-stable", "chromium", "chromium-browser", "chrome"),
+    CHROMEDRIVER: ("chromedriver",),
+}
+RECORD_NAME = "provision.json"
+CURRENT_NAME = "current.json"
+
+SOURCE_SYSTEM = "system"
+SOURCE_CACHE = "cache"
+SOURCE_DOWNLOAD = "download"
+
+
+class ProvisionError(RuntimeError):
+    """No usable browser pair could be found or installed"""
+
+
+def binary_version(path: str) -> Optional[str]:
+    """'131.0.6778.85' from `chrome --version` / `chromedriver --version`, or None"""
+    try:
+        output = subprocess.run([path, "--version"], capture_output=True, text=True, timeout=30).stdout
+    except (OSError, subprocess.SubprocessError):
+        return None
+    for word in output.split():
+        if word[:1].isdigit() and word.count('.') >= 1:
+            return word
+    return None
+
+
+def major(version: Optional[str]) -> Optional[str]:
+    return version.split('.')[0] if version else None
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _fetch_json(url: str) -> Dict:
+    try:
+        with urllib.request.urlopen(url, timeout=DOWNLOAD_TIMEOUT) as response:
+            return json.load(response)
+    except (urllib.error.URLError, OSError, ValueError) as e:
+        raise ProvisionError(f"Could not read {url}: {str(e)}")
+
+
+class _DirLock:
+    """Exclusive lock on the cache so concurrent workers don't download the same zip twice"""
+
+    def __init__(self, directory: str):
+        self.path = os.path.join(directory, ".lock")
+        self._file = None
+
+    def __enter__(self):
+        self._file = open(self.path, 'a')
+        if fcntl is not None:
+            fcntl.flock(self._file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if fcntl is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+        self._file.close()
+
+
+class BrowserProvisioner:
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, version: str = None, channel: str = DEFAULT_CHANNEL,
+                 platform: str = DEFAULT_PLATFORM, sha256: Dict[str, str] = None,
+                 index_url: str = KNOWN_GOOD_URL, channel_url: str = LAST_KNOWN_GOOD_URL,
+                 use_system: bool = True, verify_cache: bool = False):
+        # Exact Chrome version to pin; None follows `channel` the first time, then
+        # sticks to whatever was provisioned until the cache is cleared
+        self.cache_dir = cache_dir
+        self.version = version
+        self.channel = channel
+        self.platform = platform
+        # Expected sums per artifact, e.g. {'chrome': '...', 'chromedriver': '...'}
+        self.sha256 = {name: value.lower() for name, value in (sha256 or {}).items() if value}
+        self.index_url = index_url
+        self.channel_url = channel_url
+        self.use_system = use_system
+        # Re-hash cached binaries instead of only checking their size (Chrome is ~250MB)
+        self.verify_cache = verify_cache
+
+    def ensure(self) -> Dict:
+        """{'version', 'chrome', 'chromedriver', 'source'} for a working pair"""
+        if self.use_system:
+            found = self.system_pair()
+            if found is not None:
+                return found
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        version = self.version or self._current_version()
+        if version is not None:
+            cached = self.cached_pair(version)
+            if cached is not None:
+                return cached
+
+        with _DirLock(self.cache_dir):
+            # Another worker may have finished the download while we waited
+            version = self.version or self._current_version()
+            if version is not None:
+                cached = self.cached_pair(version)
+                if cached is not None:
+                    return cached
+            return self._download()
+
+    def system_pair(self) -> Optional[Dict]:
+        """Chrome and chromedriver already installed, if their versions agree"""
+        paths = {}
+        for name, candidates in SYSTEM_BINARIES.items():
+            env_path = os.environ.get('CHROME_BINARY' if name == CHROME else 'CHROMEDRIVER')
+            paths[name] = env_path or next(filter(None, map(shutil.which, candidates)), None)
+        if not all(paths.values()):
+            return None
+        chrome_version = binary_version(paths[CHROME])
+        driver_version = binary_version(paths[CHROMEDRIVER])
+        if chrome_version is None or major(chrome_version) != major(driver_version):
+            return None
+        if self.version and chrome_version != self.version:
+            return None
+        return {'version': chrome_version, CHROME: paths[CHROME], CHROMEDRIVER: paths[CHROMEDRIVER],
+                'source': SOURCE_SYSTEM}
+
+    def version_dir(self, version: str) -> str:
+        return os.path.join(self.cache_dir, f"{version}-{self.platform}")
+
+    def _current_version(self) -> Optional[str]:
+        try:
+            with open(os.path.join(self.cache_dir, CURRENT_NAME), 'r', encoding='utf-8') as f:
+                return json.load(f).get('version')
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def cached_pair(self, version: str) -> Optional[Dict]:
+        """The cached pair for version, if it is complete and matches its sums"""
+        directory = self.version_dir(version)
+        try:
+            with open(os.path.join(directory, RECORD_NAME), 'r', encoding='utf-8') as f:
+                record = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        paths = {}
+        for name in ARTIFACTS:
+            artifact = record['artifacts'].get(name, {})
+            expected = self.sha256.get(name)
+            if expected and artifact.get('sha256') != expected:
+                # Pinned to different bytes than what was cached
+                return None
+            path = os.path.join(directory, EXECUTABLES[name].format(platform=self.platform))
+            if not os.access(path, os.X_OK) or os.path.getsize(path) != artifact.get('binary_size'):
+                return None
+            if self.verify_cache and file_sha256(path) != artifact.get('binary_sha256'):
+                return None
+            paths[name] = path
+        return {'version': version, **paths, 'source': SOURCE_CACHE}
+
+    def resolve(self) -> Dict:
+        """{'version', 'downloads': {artifact: url}} for the pinned version or the channel"""
+        if self.version:
+            index = _fetch_json(self.index_url)
+            entry = next((item for item in index.get('versions', []) if item.get('version') == self.version), None)
+            if entry is None:
+                raise ProvisionError(f"Chrome {self.version} is not in {self.index_url}")
+        else:
+            index = _fetch_json(self.channel_url)
+            entry = index.get('channels', {}).get(self.channel)
+            if entry is None:
+                raise ProvisionError(f"No {self.channel} channel in {self.channel_url}")
+
+        downloads = {}
+        for name in ARTIFACTS:
+            url = next((item['url'] for item in entry.get('downloads', {}).get(name, [])
+                        if item.get('platform') == self.platform), None)
+            if url is None:
+                raise ProvisionError(f"Chrome {entry['version']} has no {name} download for {self.platform}")
+            downloads[name] = url
+        return {'version': entry['version'], 'downloads': downloads}
+
+    def _download(self) -> Dict:
+        release = self.resolve()
+        version = release['version']
+        cached = self.cached_pair(version)
+        if cached is None:
+            self._install(version, release['downloads'])
+            cached = self.cached_pair(version)
+        if cached is None:
+            raise ProvisionError(f"Chrome {version} did not install cleanly into {self.version_dir(version)}")
+
+        chrome_version = binary_version(cached[CHROME])
+        if chrome_version is None:
+            raise ProvisionError(f"{cached[CHROME]} does not run; the image may be missing Chrome's shared libraries")
+
+        self._write_json(os.path.join(self.cache_dir, CURRENT_NAME), {'version': version})
+        return dict(cached, source=SOURCE_DOWNLOAD)
+
+    def _install(self, version: str, downloads: Dict[str, str]) -> None:
+        """Download and unpack a version into a scratch directory, then move it into place"""
+        staging = tempfile.mkdtemp(prefix=".staging-", dir=self.cache_dir)
+        try:
+            record = {'version': version, 'platform': self.platform, 'artifacts': {}}
+            for name in ARTIFACTS:
+                archive = os.path.join(staging, f"{name}.zip")
+                digest = self._fetch(downloads[name], archive)
+                expected = self.sha256.get(name)
+                if expected and digest != expected:
+                    raise ProvisionError(f"Checksum mismatch for {downloads[name]}: expected {expected}, got {digest}")
+                try:
+                    with zipfile.ZipFile(archive) as zf:
+                        _extract(zf, staging)
+                except zipfile.BadZipFile as e:
+                    raise ProvisionError(f"{downloads[name]} is not a valid zip: {str(e)}")
+                os.remove(archive)
+
+                executable = os.path.join(staging, EXECUTABLES[name].format(platform=self.platform))
+                if not os.path.isfile(executable):
+                    raise ProvisionError(f"{downloads[name]} has no {EXECUTABLES[name].format(platform=self.platform)}")
+                os.chmod(executable, os.stat(executable).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+                record['artifacts'][name] = {'url': downloads[name], 'sha256': digest,
+                                             'binary_sha256': file_sha256(executable),
+                                             'binary_size': os.path.getsize(executable)}
+            # The record marks the directory complete, so it goes in last
+            self._write_json(os.path.join(staging, RECORD_NAME), record)
+
+            target = self.version_dir(version)
+            if os.path.exists(target):
+                shutil.rmtree(target)
+            os.rename(staging, target)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def _fetch(self, url: str, path: str) -> str:
+        """Stream url to path and return its sha256"""
+        print(f"Downloading {url}")
+        digest = hashlib.sha256()
+        try:
+            with urllib.request.urlopen(url, timeout=DOWNLOAD_TIMEOUT) as response, open(path, 'wb') as f:
+                for block in iter(lambda: response.read(1 << 20), b''):
+                    digest.update(block)
+                    f.write(block)
+        except (urllib.error.URLError, OSError) as e:
+            raise ProvisionError(f"Could not download {url}: {str(e)}")
+        return digest.hexdigest()
+
+    @staticmethod
+    def _write_json(path: str, payload: Dict) -> None:
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+
+def _extract(zf: zipfile.ZipFile, directory: str) -> None:
+    """extractall that keeps the executable bits and refuses paths outside directory"""
+    root = os.path.realpath(directory)
+    for info in zf.infolist():
+        target = os.path.realpath(os.path.join(root, info.filename))
+        if not target.startswith(root + os.sep):
+            raise ProvisionError(f"Refusing to extract {info.filename} outside {directory}")
+        zf.extract(info, root)
+        mode = info.external_attr >> 16
+        if mode and not info.is_dir():
+            os.chmod(target, mode & 0o777)
+
+
+def provision(**kwargs) -> Dict:
+    """Make sure a Chrome/chromedriver pair is available and export it to the environment.
+    Defaults come from CHROME_VERSION, CHROME_SHA256, CHROMEDRIVER_SHA256 and BROWSER_CACHE_DIR."""
+    kwargs.setdefault('cache_dir', os.environ.get('BROWSER_CACHE_DIR') or DEFAULT_CACHE_DIR)
+    kwargs.setdefault('version', os.environ.get('CHROME_VERSION') or None)
+    kwargs.setdefault('sha256', {CHROME: os.environ.get('CHROME_SHA256'),
+                                 CHROMEDRIVER: os.environ.get('CHROMEDRIVER_SHA256')})
+    result = BrowserProvisioner(**kwargs).ensure()
+    os.environ['CHROME_BINARY'] = result[CHROME]
+    os.environ['CHROMEDRIVER'] = result[CHROMEDRIVER]
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Provision a matching Chrome and chromedriver")
+    parser.add_argument("--version", help="exact Chrome version to pin (default: CHROME_VERSION, else the channel)")
+    parser.add_argument("--channel", default=DEFAULT_CHANNEL)
+    parser.add_argument("--cache-dir")
+    parser.add_argument("--sha256", nargs=2, action="append", metavar=("ARTIFACT", "SUM"), default=[],
+                        help="expected sha256 of the chrome or chromedriver zip")
+    parser.add_argument("--index-url", default=KNOWN_GOOD_URL)
+    parser.add_argument("--channel-url", default=LAST_KNOWN_GOOD_URL)
+    parser.add_argument("--no-system", action="store_true", help="ignore binaries already on the machine")
+    parser.add_argument("--verify", action="store_true", help="re-hash cached binaries")
+    args = parser.parse_args()
+
+    options = {'channel': args.channel, 'index_url': args.index_url, 'channel_url': args.channel_url,
+               'use_system': not args.no_system, 'verify_cache': args.verify}
+    if args.version:
+        options['version'] = args.version
+    if args.cache_dir:
+        options['cache_dir'] = args.cache_dir
+    if args.sha256:
+        options['sha256'] = dict(args.sha256)
+    try:
+        result = provision(**options)
+    except ProvisionError as e:
+        print(f"Provisioning failed: {str(e)}")
+        sys.exit(1)
+    print(json.dumps(result, indent=2))
@@ -0,0 +1,666 @@
+"""
+Asyncio scraping engine over raw Chrome DevTools Protocol.
+One WebSocket to one browser carries every tab (flattened target sessions), so a
+single event loop keeps many sets in flight while each waits on the network, instead
+of one blocking Selenium call at a time per Chrome. AsyncStealthReader offers the
+same open/extract/save steps as RenderStealthReader, awaitable, on a CdpTab.
+
+    python CdpEngine.py URL [URL ...] --tabs 8
+    python CdpEngine.py URL --attach 127.0.0.1:9300     # e.g. a BrowserDaemon browser
+
+Needs only a Chrome/Chromium binary (CHROME_BINARY, or google-chrome/chromium on
+PATH); no chromedriver or selenium.
+"""
+import os
+import sys
+import json
+import time
+import base64
+import random
+import shutil
+import struct
+import asyncio
+import hashlib
+import argparse
+import tempfile
+import subprocess
+import urllib.request
+from urllib.parse import urlparse
+from typing import Dict, List, Optional
+
+from Extraction import (
+    EXTRACT_BULK, EXTRACT_HARVEST, EXTRACTION_STRATEGIES, BULK_EXTRACT_SCRIPT, HARVEST_SCRIPT,
+    EXPAND_SCRIPT, HARVEST_MAX_STEPS, TERM_TEXTS_SCRIPT, TERMS_LIST_SELECTOR, TERM_TEXT_SELECTOR,
+    make_flashcard, cards_from_bulk, cards_from_texts
+)
+from HttpFetcher import (
+    ChallengeError, RateLimitedError, CHALLENGE_RATE_LIMITED, PAGE_CHALLENGE_SCRIPT,
+    challenge_from_state
+)
+from Pacing import Pacer, DEFAULT_PROFILE, READY_STATE_SCRIPT, RESOURCE_COUNT_SCRIPT
+from Metrics import METRICS
+from OutputSinks import write_cards
+from ResourcePolicy import DEFAULT_POLICY, PAGE_STATS_SCRIPT, get_policy
+
+HOME_PAGE = "https://quizlet.com"
+OUTPUT_FILE = "flashcards.json"
+USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+HUMAN_SCROLL_LIMIT = 1600
+DEFAULT_MAX_TABS = 8
+DEFAULT_PORT = 9500
+COMMAND_TIMEOUT = 30
+CHROME_BINARIES = ("google-chrome", "google-chrome-stable", "chromium", "chromium-browser", "chrome")
+
+# Background tabs get their timers, rendering and lazy loading throttled; every tab
+# here is a "foreground" tab as far as the scrape is concerned
+CHROME_FLAGS = (
+    "--headless=new",
+    "--no-first-run",
+    "--no-default-browser-check",
+    "--no-sandbox",
+    "--disable-dev-shm-usage",
+    "--disable-gpu",
+    "--disable-blink-features=AutomationControlled",
+    "--disable-background-timer-throttling",
+    "--disable-renderer-backgrounding",
+    "--disable-backgrounding-occluded-windows",
+    f"--user-agent={USER_AGENT}",
+)
+
+# What selenium_stealth and the readers' startup script patch, installed on every
+# new document of a tab instead of once per driver
+STEALTH_SCRIPT = """
+Object.defineProperty(navigator, 'webdriver', {get: () => undefined});
+Object.defineProperty(navigator, 'plugins', {get: () => [1, 2, 3, 4, 5]});
+Object.defineProperty(navigator, 'languages', {get: () => ['en-US', 'en']});
+Object.defineProperty(navigator, 'vendor', {get: () => 'Google Inc.'});
+Object.defineProperty(navigator, 'platform', {get: () => 'Linux x86_64'});
+window.chrome = window.chrome || {runtime: {}};
+const getParameter = WebGLRenderingContext.prototype.getParameter;
+WebGLRenderingContext.prototype.getParameter = function (parameter) {
+    if (parameter === 37445) { return 'Intel Inc.'; }
+    if (parameter === 37446) { return 'Intel Iris OpenGL Engine'; }
+    return getParameter.call(this, parameter);
+};
+"""
+
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+OP_CONTINUATION, OP_TEXT, OP_BINARY, OP_CLOSE, OP_PING, OP_PONG = 0x0, 0x1, 0x2, 0x8, 0x9, 0xA
+
+
+class CdpError(RuntimeError):
+    """Chrome rejected a command, a page script threw, or the connection dropped"""
+
+
+class WebSocket:
+    """Just enough of an RFC 6455 client for the DevTools endpoint: text frames,
+    fragmentation, ping/pong and close. No extensions, no TLS (DevTools is local)."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self._send_lock = asyncio.Lock()
+
+    @classmethod
+    async def connect(cls, url: str) -> 'WebSocket':
+        parsed = urlparse(url)
+        host, port = parsed.hostname, parsed.port or 80
+        # Big sets come back as one multi-megabyte evaluate result
+        reader, writer = await asyncio.open_connection(host, port, limit=1 << 26)
+        key = base64.b64encode(os.urandom(16)).decode('ascii')
+        writer.write((
+            f"GET {parsed.path or '/'} HTTP/1.1\r\n"
+            f"Host: {host}:{port}\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Key: {key}\r\n"
+            "Sec-WebSocket-Version: 13\r\n\r\n"
+        ).encode('ascii'))
+        await writer.drain()
+
+        status = await reader.readline()
+        if b" 101 " not in status:
+            writer.close()
+            raise CdpError(f"WebSocket upgrade to {url} refused: {status.decode(errors='replace').strip()}")
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        expected = base64.b64encode(hashlib.sha1((key + WEBSOCKET_GUID).encode('ascii')).digest()).decode('ascii')
+        if headers.get('sec-websocket-accept') != expected:
+            writer.close()
+            raise CdpError(f"Bad WebSocket handshake from {url}")
+        return cls(reader, writer)
+
+    async def _send_frame(self, opcode: int, payload: bytes) -> None:
+        header = bytes([0x80 | opcode])
+        length = len(payload)
+        if length < 126:
+            header += bytes([0x80 | length])
+        elif length < 1 << 16:
+            header += bytes([0x80 | 126]) + struct.pack('!H', length)
+        else:
+            header += bytes([0x80 | 127]) + struct.pack('!Q', length)
+        # Clients must mask every frame
+        mask = os.urandom(4)
+        masked = (int.from_bytes(payload, 'big') ^ int.from_bytes((mask * (length // 4 + 1))[:length], 'big')
+                  ).to_bytes(length, 'big') if length else b""
+        async with self._send_lock:
+            self.writer.write(header + mask + masked)
+            await self.writer.drain()
+
+    async def send(self, text: str) -> None:
+        await self._send_frame(OP_TEXT, text.encode('utf-8'))
+
+    async def _read_frame(self):
+        first, second = await self.reader.readexactly(2)
+        fin, opcode = first & 0x80, first & 0x0F
+        length = second & 0x7F
+        if length == 126:
+            length, = struct.unpack('!H', await self.reader.readexactly(2))
+        elif length == 127:
+            length, = struct.unpack('!Q', await self.reader.readexactly(8))
+        mask = await self.reader.readexactly(4) if second & 0x80 else None
+        payload = await self.reader.readexactly(length)
+        if mask:
+            payload = (int.from_bytes(payload, 'big') ^ int.from_bytes((mask * (length // 4 + 1))[:length], 'big')
+                       ).to_bytes(length, 'big')
+        return fin, opcode, payload
+
+    async def recv(self) -> str:
+        """Next complete text message; raises ConnectionError once the socket closes"""
+        fragments = []
+        while True:
+            try:
+                fin, opcode, payload = await self._read_frame()
+            except (asyncio.IncompleteReadError, ConnectionError) as e:
+                raise ConnectionError("DevTools connection closed") from e
+            if opcode == OP_PING:
+                await self._send_frame(OP_PONG, payload)
+                continue
+            if opcode == OP_PONG:
+                continue
+            if opcode == OP_CLOSE:
+                raise ConnectionError("DevTools connection closed by the browser")
+            fragments.append(payload)
+            if fin:
+                return b"".join(fragments).decode('utf-8')
+
+    async def close(self) -> None:
+        try:
+            await self._send_frame(OP_CLOSE, struct.pack('!H', 1000))
+        except (ConnectionError, RuntimeError):
+            pass
+        self.writer.close()
+
+
+class CdpConnection:
+    """One browser-level DevTools session; commands for any tab go over it with a sessionId"""
+
+    def __init__(self, socket: WebSocket):
+        self.socket = socket
+        self._next_id = 0
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._waiters: Dict[tuple, List[asyncio.Future]] = {}
+        self.commands_sent = 0
+        self._reader = asyncio.ensure_future(self._read_loop())
+
+    @classmethod
+    async def connect(cls, debugger_address: str) -> 'CdpConnection':
+        version = await asyncio.to_thread(_http_json, f"http://{debugger_address}/json/version")
+        return cls(await WebSocket.connect(version['webSocketDebuggerUrl']))
+
+    async def send(self, method: str, params: Dict = None, session_id: str = None,
+                   timeout: float = COMMAND_TIMEOUT) -> Dict:
+        self._next_id += 1
+        message = {'id': self._next_id, 'method': method, 'params': params or {}}
+        if session_id:
+            message['sessionId'] = session_id
+        future = asyncio.get_running_loop().create_future()
+        self._pending[self._next_id] = future
+        self.commands_sent += 1
+        try:
+            await self.socket.send(json.dumps(message))
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            raise CdpError(f"{method} timed out after {timeout}s")
+        finally:
+            self._pending.pop(message['id'], None)
+
+    async def wait_for_event(self, method: str, session_id: str = None, timeout: float = COMMAND_TIMEOUT) -> Dict:
+        """Params of the next `method` event (from one tab's session, if given)"""
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault((session_id, method), []).append(future)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            waiters = self._waiters.get((session_id, method), [])
+            if future in waiters:
+                waiters.remove(future)
+
+    async def _read_loop(self) -> None:
+        try:
+            while True:
+                message = json.loads(await self.socket.recv())
+                if 'id' in message:
+                    future = self._pending.get(message['id'])
+                    if future is None or future.done():
+                        continue
+                    if 'error' in message:
+                        future.set_exception(CdpError(f"{message['error'].get('message')} "
+                                                      f"({message['error'].get('code')})"))
+                    else:
+                        future.set_result(message.get('result', {}))
+                else:
+                    for future in self._waiters.pop((message.get('sessionId'), message.get('method')), []):
+                        if not future.done():
+                            future.set_result(message.get('params', {}))
+        except ConnectionError as e:
+            error = e
+        except Exception as e:
+            error = CdpError(f"DevTools reader stopped: {str(e)}")
+        for future in list(self._pending.values()):
+            if not future.done():
+                future.set_exception(CdpError(str(error)))
+
+    async def close(self) -> None:
+        self._reader.cancel()
+        await self.socket.close()
+
+
+def _http_json(url: str, timeout: float = 5):
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        return json.load(response)
+
+
+def _wrap_script(script: str, args) -> str:
+    """Run a Selenium-style script body (uses `arguments`, ends in return) via Runtime.evaluate"""
+    return f"(function() {{\n{script}\n}}).apply(null, {json.dumps(list(args))})"
+
+
+class CdpTab:
+    """A page target attached over the shared connection"""
+
+    def __init__(self, connection: CdpConnection, target_id: str, session_id: str):
+        self.connection = connection
+        self.target_id = target_id
+        self.session_id = session_id
+
+    @classmethod
+    async def open(cls, connection: CdpConnection, resource_policy=None) -> 'CdpTab':
+        target = await connection.send('Target.createTarget', {'url': 'about:blank'})
+        attached = await connection.send('Target.attachToTarget', {'targetId': target['targetId'], 'flatten': True})
+        tab = cls(connection, target['targetId'], attached['sessionId'])
+        await tab.send('Page.enable')
+        await tab.send('Network.setUserAgentOverride', {'userAgent': USER_AGENT, 'platform': 'Linux'})
+        await tab.send('Page.addScriptToEvaluateOnNewDocument', {'source': STEALTH_SCRIPT})
+        await tab.send('Emulation.setFocusEmulationEnabled', {'enabled': True})
+        if resource_policy is not None:
+            for method, params in resource_policy.commands():
+                await tab.send(method, params)
+        return tab
+
+    async def send(self, method: str, params: Dict = None, timeout: float = COMMAND_TIMEOUT) -> Dict:
+        return await self.connection.send(method, params, session_id=self.session_id, timeout=timeout)
+
+    async def execute_script(self, script: str, *args):
+        """Same contract as WebDriver.execute_script: a function body, JSON-able result"""
+        response = await self.send('Runtime.evaluate', {
+            'expression': _wrap_script(script, args),
+            'returnByValue': True,
+            'awaitPromise': True,
+        })
+        if 'exceptionDetails' in response:
+            details = response['exceptionDetails']
+            description = details.get('exception', {}).get('description') or details.get('text')
+            raise CdpError(f"Page script failed: {description}")
+        return response.get('result', {}).get('value')
+
+    async def get(self, url: str) -> None:
+        """Navigate; returns once the navigation has committed"""
+        response = await self.send('Page.navigate', {'url': url})
+        if response.get('errorText'):
+            raise CdpError(f"Navigation to {url} failed: {response['errorText']}")
+
+    async def current_url(self) -> str:
+        return await self.execute_script("return location.href")
+
+    async def close(self) -> None:
+        try:
+            await self.connection.send('Target.closeTarget', {'targetId': self.target_id})
+        except CdpError:
+            pass
+
+
+class AsyncStealthReader:
+    """RenderStealthReader's page steps, awaitable, on one tab"""
+
+    def __init__(self, tab: CdpTab, pacing: str = DEFAULT_PROFILE, metrics=METRICS):
+        self.tab = tab
+        self.pacer = Pacer(pacing)
+        self.metrics = metrics
+        self.page_stats = None
+
+    async def sleep(self, seconds: float) -> None:
+        """The one place this reader pauses; yields the loop to the other tabs"""
+        if seconds <= 0:
+            return
+        await asyncio.sleep(seconds)
+        self.pacer.page_slept += seconds
+
+    async def delay(self, kind: str) -> float:
+        seconds = self.pacer.draw(kind)
+        await self.sleep(seconds)
+        return seconds
+
+    async def wait_until(self, condition, timeout: float = 10, message: str = "") -> None:
+        """Poll an async condition until it is truthy, raising TimeoutError after timeout"""
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                if await condition():
+                    return
+            except CdpError:
+                # Page may be mid-navigation; treat as not ready yet
+                pass
+            if time.monotonic() >= deadline:
+                raise TimeoutError(message or f"Condition not met within {timeout}s")
+            await self.sleep(self.pacer.profile.poll_interval)
+
+    async def wait_for_ready_state(self, timeout: float = 10) -> None:
+        async def complete():
+            return await self.tab.execute_script(READY_STATE_SCRIPT) == "complete"
+        await self.wait_until(complete, timeout=timeout, message="Page did not finish loading")
+
+    async def wait_for_network_idle(self, timeout: float = 10) -> bool:
+        """Wait until the page stops loading new resources; False on timeout"""
+        deadline = time.monotonic() + timeout
+        last_count = -1
+        stable_since = time.monotonic()
+        while time.monotonic() < deadline:
+            try:
+                count = await self.tab.execute_script(RESOURCE_COUNT_SCRIPT)
+            except CdpError:
+                count = -1
+            now = time.monotonic()
+            if count != last_count:
+                last_count = count
+                stable_since = now
+            elif now - stable_since >= self.pacer.profile.idle_window:
+                return True
+            await self.sleep(self.pacer.profile.poll_interval)
+        return False
+
+    async def _terms_list_present(self) -> bool:
+        return bool(await self.tab.execute_script(
+            "return !!document.querySelector(arguments[0])", TERMS_LIST_SELECTOR))
+
+    async def human_like_scroll(self) -> None:
+        total_height = await self.tab.execute_script("return document.body.scrollHeight")
+        viewport_height = await self.tab.execute_script("return window.innerHeight")
+        current_position = 0
+        scroll_limit = min(HUMAN_SCROLL_LIMIT, max(total_height - viewport_height, 0))
+
+        while current_position < scroll_limit:
+            current_position += random.randint(300, 700)
+            await self.tab.execute_script(f"window.scrollTo({{top: {current_position}, behavior: 'smooth'}})")
+            await self.delay('scroll_pause')
+
+            if self.pacer.chance('scroll_back_chance'):
+                current_position -= random.randint(40, 100)
+                await self.tab.execute_script(f"window.scrollTo(0, {current_position})")
+                await self.delay('scroll_back_pause')
+
+    async def open_url(self, url: str, start_at_homepage: bool = True, allow_captcha: bool = False) -> None:
+        self.pacer.begin_page(url)
+        await self.sleep(self.pacer.reserve_host(HOME_PAGE if start_at_homepage else url))
+
+        if start_at_homepage:
+            with self.metrics.span('homepage', url):
+                await self.tab.get(HOME_PAGE)
+                await self.wait_for_ready_state()
+                await self.delay('homepage_dwell')
+
+        with self.metrics.span('navigate', url):
+            await self.tab.get(url)
+
+        with self.metrics.span('wait', url):
+            await self.wait_for_ready_state()
+            if not await self._terms_list_present():
+                await self.wait_for_network_idle()
+            await self.delay('post_load')
+
+        challenge = await self._challenge()
+        if challenge == CHALLENGE_RATE_LIMITED:
+            raise RateLimitedError(f"Rate limited on {url}")
+        if challenge is not None and not allow_captcha:
+            raise ChallengeError("Captcha Detected despite stealth measures!")
+
+        with self.metrics.span('scroll', url):
+            await self.human_like_scroll()
+
+        self.page_stats = await self.tab.execute_script(PAGE_STATS_SCRIPT) or {'requests': 0, 'bytes': 0, 'by_type': {}}
+        self.metrics.observe_page(url, self.page_stats)
+
+    async def _challenge(self) -> Optional[str]:
+        return challenge_from_state(await self.tab.execute_script(PAGE_CHALLENGE_SCRIPT))
+
+    async def extract_flashcards(self, strategy: str = EXTRACT_BULK) -> List[Dict[str, str]]:
+        if strategy not in EXTRACTION_STRATEGIES:
+            raise ValueError(f"Unknown extraction strategy: {strategy}")
+
+        flashcards = []
+        started = time.perf_counter()
+        try:
+            await self.wait_until(self._terms_list_present, timeout=10, message="Terms list never appeared")
+            await self.delay('pre_extract')
+
+            if strategy == EXTRACT_HARVEST:
+                flashcards = [card async for card in self.harvest_flashcards()]
+            elif strategy == EXTRACT_BULK:
+                try:
+                    payload = await self.tab.execute_script(BULK_EXTRACT_SCRIPT, TERMS_LIST_SELECTOR, TERM_TEXT_SELECTOR)
+                    flashcards = cards_from_bulk(payload)
+                except CdpError as e:
+                    print(f"Bulk extraction failed, falling back to plain text pairing: {str(e)}")
+
+            if not flashcards:
+                texts = await self.tab.execute_script(TERM_TEXTS_SCRIPT, TERMS_LIST_SELECTOR, TERM_TEXT_SELECTOR)
+                flashcards = cards_from_texts(texts or [])
+        except (CdpError, TimeoutError) as e:
+            print(f"Error waiting for page elements: {str(e)}")
+
+        self.metrics.record('extract', time.perf_counter() - started, url=self.pacer.url)
+        return flashcards
+
+    async def harvest_flashcards(self, max_steps: int = HARVEST_MAX_STEPS, stable_steps: int = 3):
+        """Scroll and expand the terms list in steps, yielding cards as they render"""
+        seen_keys = set()
+        position = 0
+        unchanged = 0
+        step = 0
+        while step < max_steps:
+            step += 1
+            batch = await self.tab.execute_script(HARVEST_SCRIPT, TERMS_LIST_SELECTOR, TERM_TEXT_SELECTOR) or []
+            new_cards = 0
+            for item in batch:
+                if item['key'] in seen_keys:
+                    continue
+                seen_keys.add(item['key'])
+                flashcard = make_flashcard(item.get('term'), item.get('definition'))
+                if flashcard:
+                    new_cards += 1
+                    yield flashcard
+
+            expanded = await self.tab.execute_script(EXPAND_SCRIPT, TERMS_LIST_SELECTOR)
+            total_height = await self.tab.execute_script("return document.body.scrollHeight")
+            viewport_height = await self.tab.execute_script("return window.innerHeight")
+            at_bottom = position + viewport_height >= total_height
+
+            if new_cards or expanded or not at_bottom:
+                unchanged = 0
+            else:
+                unchanged += 1
+                if unchanged >= stable_steps:
+                    break
+
+            position = min(position + viewport_height, max(total_height - viewport_height, 0))
+            await self.tab.execute_script(f"window.scrollTo(0, {position})")
+            if not await self.delay('scroll_pause'):
+                await self.sleep(self.pacer.profile.poll_interval)
+
+    async def save_to_json(self, flashcards: List[Dict[str, str]], output_file: str = OUTPUT_FILE) -> Dict:
+        """Atomic save off the event loop; see OutputSinks"""
+        with self.metrics.span('save', self.pacer.url):
+            entry = await asyncio.to_thread(write_cards, output_file, flashcards, self.pacer.url)
+            self.metrics.add_bytes(entry['bytes'])
+        print(f"Successfully saved {entry['cards']} flashcards to {output_file}")
+        return entry
+
+
+def find_chrome() -> str:
+    binary = os.environ.get('CHROME_BINARY')
+    if binary:
+        return binary
+    for name in CHROME_BINARIES:
+        path = shutil.which(name)
+        if path:
+            return path
+    raise CdpError("No Chrome binary found; set CHROME_BINARY")
+
+
+class CdpEngine:
+    """Scrape many sets concurrently in tabs of one browser
+
+        async with CdpEngine(max_tabs=8) as engine:
+            results = await engine.scrape_many(urls)
+    """
+
+    def __init__(self, debugger_address: str = None, max_tabs: int = DEFAULT_MAX_TABS,
+                 pacing: str = DEFAULT_PROFILE, resource_policy=DEFAULT_POLICY, metrics=METRICS,
+                 port: int = DEFAULT_PORT, start_at_homepage: bool = True):
+        # Attach to a running browser, or launch one on `port` when no address is given
+        self.debugger_address = debugger_address
+        self.max_tabs = max_tabs
+        self.pacing = pacing
+        self.resource_policy = get_policy(resource_policy) if resource_policy is not None else None
+        self.metrics = metrics
+        self.port = port
+        self.start_at_homepage = start_at_homepage
+        self.connection = None
+        self._process = None
+        self._profile_dir = None
+        self._tabs = None
+
+    async def start(self) -> 'CdpEngine':
+        if self.debugger_address is None:
+            with self.metrics.span('driver_start'):
+                await self._launch()
+        self.connection = await CdpConnection.connect(self.debugger_address)
+        self._tabs = asyncio.Semaphore(self.max_tabs)
+        # The homepage hop only needs to happen once per browser: the tabs share cookies
+        self._warmed = asyncio.Lock()
+        self._warm = not self.start_at_homepage
+        return self
+
+    async def _launch(self) -> None:
+        self._profile_dir = tempfile.mkdtemp(prefix="quizlet-cdp-")
+        self._process = subprocess.Popen(
+            [find_chrome(), *CHROME_FLAGS, f"--remote-debugging-port={self.port}",
+             f"--user-data-dir={self._profile_dir}",
+             f"--window-size={random.randint(1050, 1200)},{random.randint(800, 1000)}", "about:blank"],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self.debugger_address = f"127.0.0.1:{self.port}"
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                await asyncio.to_thread(_http_json, f"http://{self.debugger_address}/json/version", 1)
+                return
+            except OSError:
+                if self._process.poll() is not None or time.monotonic() > deadline:
+                    raise CdpError("Chrome did not open its DevTools port")
+                await asyncio.sleep(0.1)
+
+    async def scrape(self, url: str, strategy: str = EXTRACT_BULK) -> Dict:
+        """Scrape one set in its own tab; same result shape as DriverPool.scrape"""
+        result = {'url': url, 'flashcards': [], 'error': None}
+        async with self._tabs:
+            tab = None
+            try:
+                tab = await CdpTab.open(self.connection, self.resource_policy)
+                reader = AsyncStealthReader(tab, pacing=self.pacing, metrics=self.metrics)
+                async with self._warmed:
+                    start_at_homepage = not self._warm
+                    if start_at_homepage:
+                        await reader.open_url(url, start_at_homepage=True)
+                        self._warm = True
+                if not start_at_homepage:
+                    await reader.open_url(url, start_at_homepage=False)
+                result['flashcards'] = await reader.extract_flashcards(strategy)
+                result['timing'] = reader.pacer.summary()
+                result['page_stats'] = reader.page_stats
+            except Exception as e:
+                print(f"Error scraping {url}: {str(e)}")
+                result['error'] = str(e)
+                result['error_type'] = type(e).__name__
+            finally:
+                if tab is not None:
+                    await tab.close()
+        return result
+
+    async def scrape_many(self, urls: List[str], strategy: str = EXTRACT_BULK) -> Dict[str, Dict]:
+        unique_urls = list(dict.fromkeys(urls))
+        results = await asyncio.gather(*(self.scrape(url, strategy) for url in unique_urls))
+        return dict(zip(unique_urls, results))
+
+    async def close(self) -> None:
+        if self.connection is not None:
+            await self.connection.close()
+        if self._process is not None:
+            self._process.terminate()
+            try:
+                await asyncio.to_thread(self._process.wait, 10)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+        if self._profile_dir:
+            shutil.rmtree(self._profile_dir, ignore_errors=True)
+
+    async def __aenter__(self) -> 'CdpEngine':
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+
+def scrape_many(urls: List[str], **engine_kwargs) -> Dict[str, Dict]:
+    """Blocking entry point for callers without an event loop"""
+    async def run():
+        async with CdpEngine(**engine_kwargs) as engine:
+            return await engine.scrape_many(urls)
+    return asyncio.run(run())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape sets in concurrent tabs over raw CDP")
+    parser.add_argument("urls", nargs="+")
+    parser.add_argument("--tabs", type=int, default=DEFAULT_MAX_TABS)
+    parser.add_argument("--attach", help="host:port of an already running Chrome")
+    parser.add_argument("--pacing", default=DEFAULT_PROFILE)
+    parser.add_argument("--output-dir", help="write each set to its own file here")
+    args = parser.parse_args()
+
+    results = scrape_many(args.urls, debugger_address=args.attach, max_tabs=args.tabs, pacing=args.pacing)
+    for url, result in results.items():
+        status = result['error'] or f"{len(result['flashcards'])} cards"
+        print(f"{url}: {status}")
+    if args.output_dir:
+        from OutputSinks import ShardedOutput
+        with ShardedOutput(args.output_dir, ".json") as shards:
+            for url, result in results.items():
+                if result['flashcards']:
+                    shards.write_set(url, result['flashcards'])
+    METRICS.print_summary()
+    sys.exit(0 if all(not result['error'] for result in results.values()) else 1)
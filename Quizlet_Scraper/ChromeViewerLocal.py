@@ -1,27 +1,63 @@
 """
 Windows OS Only!!
 """
-import os
 import random
 from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.action_chains import ActionChains
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from selenium_stealth import stealth
-import json
 import time
-from typing import List, Dict
-import subprocess
-import random
+from typing import Dict, Iterable
+
+from Extraction import (
+    EXTRACT_BULK, EXTRACT_HARVEST, EXTRACTION_STRATEGIES, BULK_EXTRACT_SCRIPT,
+    HARVEST_SCRIPT, EXPAND_SCRIPT, HARVEST_MAX_STEPS, TERMS_LIST_SELECTOR, TERM_TEXT_SELECTOR,
+    make_flashcard, cards_from_bulk, cards_from_texts
+)
+from Pacing import Pacer, DEFAULT_PROFILE
+from Metrics import METRICS
+from HttpFetcher import ChallengeError, RateLimitedError, CHALLENGE_RATE_LIMITED, page_challenge
+from OutputSinks import write_cards, OutputError
+from ResourcePolicy import DEFAULT_POLICY, get_policy, page_stats
 
 OUTPUT_FILE = "Quizlet_API/flashcards.json"
 PATH_TO_PROFILE = r"C:\Users\scott\AppData\Local\Google\Chrome\User Data\Default"
 HOME_PAGE = "https://quizlet.com"
+# How far the warm-up scroll in open_url goes at most
+HUMAN_SCROLL_LIMIT = 1600
 
 class QuizletStealthReader:
-    def __init__(self):
+    @classmethod
+    def from_driver(cls, driver, pacing: str = DEFAULT_PROFILE, metrics=METRICS, resource_policy=None):
+        """Wrap a driver that is already running and stealth-configured"""
+        reader = cls.__new__(cls)
+        reader._init_state(None, None, pacing, metrics, resource_policy)
+        reader.driver = driver
+        # Someone else owns the browser: close() only detaches from it
+        reader._attached = True
+        metrics.instrument_driver(driver)
+        if resource_policy is not None:
+            reader.resource_policy.apply(driver)
+        return reader
+
+    def _init_state(self, debugging_port, profile_dir, pacing, metrics, resource_policy):
+        # Remember where this browser lives so a pool can tell readers apart
+        self.debugging_port = debugging_port
+        self.profile_dir = profile_dir
+        self._attached = False
+
+        # Every pause this reader takes goes through the pacer
+        self.pacer = Pacer(pacing)
+        self.metrics = metrics
+        
+        # Which requests the browser is allowed to make, and what the last page cost
+        self.resource_policy = get_policy(resource_policy) if resource_policy is not None else None
+        self.page_stats = None
+
+    def __init__(self, debugging_port: int = None, profile_dir: str = PATH_TO_PROFILE,
+                 pacing: str = DEFAULT_PROFILE, metrics=METRICS, resource_policy=DEFAULT_POLICY):
+        self._init_state(debugging_port, profile_dir, pacing, metrics, resource_policy)
+
         # Enhanced Chrome options
         options = webdriver.ChromeOptions()
         
@@ -33,7 +69,9 @@ class QuizletStealthReader:
         options.add_argument('--disable-automation')
         options.add_argument('--disable-gpu')
         options.add_argument(f'--window-size={random.randint(1050,1200)},{random.randint(800,1000)}')
-        options.add_argument(f'--user-data-dir={PATH_TO_PROFILE}')
+        options.add_argument(f'--user-data-dir={profile_dir}')
+        if debugging_port:
+            options.add_argument(f'--remote-debugging-port={debugging_port}')
         options.add_argument(f"user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
         
         # Add random plugins count
@@ -43,31 +81,39 @@ class QuizletStealthReader:
         options.add_experimental_option('useAutomationExtension', False)
 
         try:
-            self.driver = webdriver.Chrome(options=options)
+            with self.metrics.span('driver_start'):
+                self.driver = webdriver.Chrome(options=options)
+            self.metrics.instrument_driver(self.driver)
             
-            # Enhanced stealth configuration
-            stealth(self.driver,
-                languages=["en-US", "en"],
-                vendor="Google Inc.",
-                platform="Win32",
-                webgl_vendor="Intel Inc.",
-                renderer="Intel Iris OpenGL Engine",
-                fix_hairline=True,
-                run_on_insecure_origins=True
-            )
+            with self.metrics.span('stealth'):
+                # Enhanced stealth configuration
+                stealth(self.driver,
+                    languages=["en-US", "en"],
+                    vendor="Google Inc.",
+                    platform="Win32",
+                    webgl_vendor="Intel Inc.",
+                    renderer="Intel Iris OpenGL Engine",
+                    fix_hairline=True,
+                    run_on_insecure_origins=True
+                )
             
-            # Additional WebDriver masking
-            self.driver.execute_cdp_cmd('Network.setUserAgentOverride', {
-                "userAgent": 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                "platform": "Windows"
-            })
+                # Additional WebDriver masking
+                self.driver.execute_cdp_cmd('Network.setUserAgentOverride', {
+                    "userAgent": 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+                    "platform": "Windows"
+                })
             
-            # Add more human-like properties
-            self.driver.execute_script("""
-                Object.defineProperty(navigator, 'webdriver', {get: () => undefined});
-                Object.defineProperty(navigator, 'plugins', {get: () => [1, 2, 3, 4, 5]});
-                Object.defineProperty(navigator, 'languages', {get: () => ['en-US', 'en']});
-            """)
+                # Add more human-like properties
+                self.driver.execute_script("""
+                    Object.defineProperty(navigator, 'webdriver', {get: () => undefined});
+                    Object.defineProperty(navigator, 'plugins', {get: () => [1, 2, 3, 4, 5]});
+                    Object.defineProperty(navigator, 'languages', {get: () => ['en-US', 'en']});
+                """)
+            
+            # Skip ads, analytics and heavy media before the first page load
+            if self.resource_policy is not None:
+                with self.metrics.span('resource_policy'):
+                    self.resource_policy.apply(self.driver)
             
         except Exception as e:
             print("Error starting chrome driver.")
@@ -78,8 +124,9 @@ class QuizletStealthReader:
         total_height = self.driver.execute_script("return document.body.scrollHeight")
         viewport_height = self.driver.execute_script("return window.innerHeight")
         current_position = 0
+        scroll_limit = min(HUMAN_SCROLL_LIMIT, max(total_height - viewport_height, 0))
         
-        while current_position < 1600:
+        while current_position < scroll_limit:
             # Random scroll amount
             scroll_amount = random.randint(300, 700)
             current_position += scroll_amount
@@ -93,40 +140,53 @@ class QuizletStealthReader:
             """)
             
             # Random pause between scrolls
-            time.sleep(random.uniform(0.5, 2.0))
+            self.pacer.delay('scroll_pause')
             
             # Occasionally scroll back up slightly
-            if random.random() < 0.2:
+            if self.pacer.chance('scroll_back_chance'):
                 current_position -= random.randint(40, 100)
                 self.driver.execute_script(f"window.scrollTo(0, {current_position})")
-                time.sleep(random.uniform(0.3, 0.7))
+                self.pacer.delay('scroll_back_pause')
 
     def open_url(self, url: str, start_at_homepage: bool = True, allow_captcha: bool = False):
-        # Randomize initial delay
-        time.sleep(random.uniform(1, 3))
+        self.pacer.begin_page(url)
+
+        # Space out visits to the host instead of a fixed random delay
+        self.pacer.wait_for_host(HOME_PAGE if start_at_homepage else url)
         
         # First visit homepage with some random behavior
         if start_at_homepage:
-            self.driver.get(HOME_PAGE)
-            time.sleep(random.uniform(2, 4))
+            with self.metrics.span('homepage', url):
+                self.driver.get(HOME_PAGE)
+                self.pacer.wait_for_ready_state(self.driver)
+                self.pacer.delay('homepage_dwell')
         
         # Now navigate to the actual page
-        self.driver.get(url)
+        with self.metrics.span('navigate', url):
+            self.driver.get(url)
+        
+        # Wait for page load, then for the terms list or the network to settle
+        with self.metrics.span('wait', url):
+            self.pacer.wait_for_ready_state(self.driver)
+            if not self._terms_list_present():
+                self.pacer.wait_for_network_idle(self.driver)
+            self.pacer.delay('post_load')
         
-        # Wait for page load with random additional delay
-        WebDriverWait(self.driver, 10).until(
-            lambda d: d.execute_script("return document.readyState") == "complete"
-        )
-        time.sleep(random.uniform(1, 3))
+        # Bail out before scrolling if we were served a bot check or a 429
+        challenge = page_challenge(self.driver)
+        if challenge == CHALLENGE_RATE_LIMITED:
+            raise RateLimitedError(f"Rate limited on {url}")
+        if challenge is not None and not allow_captcha:
+            self.close()
+            raise ChallengeError("Captcha Detected despite stealth measures!")
         
         # Human-like scrolling
-        self.human_like_scroll()
+        with self.metrics.span('scroll', url):
+            self.human_like_scroll()
         
-        if (not allow_captcha and 
-            "quizlet" in self.get_active_tab_url() and 
-            EC.presence_of_element_located((By.ID, "px-captcha-wrapper"))):
-            self.close()
-            raise RuntimeError("Captcha Detected despite stealth measures!")
+        # What the page cost in requests and bytes under the resource policy
+        self.page_stats = page_stats(self.driver)
+        self.metrics.observe_page(url, self.page_stats)
 
     def simulate_human_behavior(self):
         """Simulate random human-like behavior"""
@@ -150,49 +210,104 @@ class QuizletStealthReader:
                 actions.release()
         
         actions.perform()
-        time.sleep(random.uniform(0.5, 2))
+        self.pacer.delay('pre_extract')
 
-    def extract_flashcards(self):
+    def extract_flashcards(self, strategy: str = EXTRACT_BULK):
         """Extract flashcards with human-like behavior"""
+        if strategy not in EXTRACTION_STRATEGIES:
+            raise ValueError(f"Unknown extraction strategy: {strategy}")
+
         flashcards = []
+        started = time.perf_counter()
         
         try:
             # Wait for content with random delay
-            WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, "section[data-testid='terms-list']"))
-            )
-            time.sleep(random.uniform(0.5, 2))
+            self.pacer.wait_until(self._terms_list_present, timeout=10, message="Terms list never appeared")
+            self.pacer.delay('pre_extract')
             
             # Simulate human behavior before extraction
             # self.simulate_human_behavior()
             
-            section = self.driver.find_element(By.CSS_SELECTOR, "section[data-testid='terms-list']")
-            term_elements = section.find_elements(By.CSS_SELECTOR, "span.TermText.notranslate.lang-en")
-            
-            for i in range(0, len(term_elements), 2):
+            if strategy == EXTRACT_HARVEST:
+                flashcards = list(self.harvest_flashcards())
+            elif strategy == EXTRACT_BULK:
                 try:
-                    # if random.random() < 0.3:  # Occasionally add delay between extractions
-                    #     time.sleep(random.uniform(0.1, 0.5))
-                    
-                    term = term_elements[i].text.strip()
-                    definition = term_elements[i+1].text.strip()
-                    
-                    if term and definition:
-                        flashcard = {
-                            'term': term,
-                            'definition': definition
-                        }
-                        flashcards.append(flashcard)
-                        
+                    # Every card in a single round trip
+                    payload = self.driver.execute_script(BULK_EXTRACT_SCRIPT, TERMS_LIST_SELECTOR, TERM_TEXT_SELECTOR)
+                    flashcards = cards_from_bulk(payload)
                 except Exception as e:
-                    print(f"Error extracting card: {str(e)}")
-                    continue
+                    print(f"Bulk extraction failed, falling back to per-element reads: {str(e)}")
+
+            if not flashcards:
+                flashcards = self._extract_flashcards_by_element()
                     
         except Exception as e:
             print(f"Error waiting for page elements: {str(e)}")
             
+        self.metrics.record('extract', time.perf_counter() - started, url=self.pacer.url)
         return flashcards
 
+    def harvest_flashcards(self, max_steps: int = HARVEST_MAX_STEPS, stable_steps: int = 3):
+        """Scroll and expand the terms list in steps, yielding cards as they render"""
+        seen_keys = set()
+        position = 0
+        unchanged = 0
+        
+        step = 0
+        while step < max_steps:
+            step += 1
+            
+            # Collect whatever rendered since the last step
+            batch = self.driver.execute_script(HARVEST_SCRIPT, TERMS_LIST_SELECTOR, TERM_TEXT_SELECTOR) or []
+            new_cards = 0
+            for item in batch:
+                if item['key'] in seen_keys:
+                    continue
+                seen_keys.add(item['key'])
+                flashcard = make_flashcard(item.get('term'), item.get('definition'))
+                if flashcard:
+                    new_cards += 1
+                    yield flashcard
+            
+            expanded = self.driver.execute_script(EXPAND_SCRIPT, TERMS_LIST_SELECTOR)
+            total_height = self.driver.execute_script("return document.body.scrollHeight")
+            viewport_height = self.driver.execute_script("return window.innerHeight")
+            at_bottom = position + viewport_height >= total_height
+            
+            # Stop once a few steps at the bottom turn up nothing new
+            if new_cards or expanded or not at_bottom:
+                unchanged = 0
+            else:
+                unchanged += 1
+                if unchanged >= stable_steps:
+                    break
+            
+            position = min(position + viewport_height, max(total_height - viewport_height, 0))
+            self.driver.execute_script(f"window.scrollTo(0, {position})")
+            
+            # Give lazily rendered cards a moment even once the delay budget is spent
+            if not self.pacer.delay('scroll_pause'):
+                self.pacer.sleep(self.pacer.profile.poll_interval)
+
+    def _terms_list_present(self) -> bool:
+        """Whether the terms list has rendered yet"""
+        return bool(self.driver.find_elements(By.CSS_SELECTOR, TERMS_LIST_SELECTOR))
+
+    def _extract_flashcards_by_element(self):
+        """Read each term/definition element separately (one round trip per element)"""
+        section = self.driver.find_element(By.CSS_SELECTOR, TERMS_LIST_SELECTOR)
+        term_elements = section.find_elements(By.CSS_SELECTOR, TERM_TEXT_SELECTOR)
+        
+        texts = []
+        for element in term_elements:
+            try:
+                texts.append(element.text)
+            except Exception as e:
+                print(f"Error extracting card: {str(e)}")
+                texts.append('')
+        
+        return cards_from_texts(texts)
+
     
     def close_full_screen_ad(self):
         # Close 
@@ -211,17 +326,21 @@ class QuizletStealthReader:
         """Get the URL of the currently active tab"""
         return self.driver.current_url
 
-    def save_to_json(self, flashcards: List[Dict[str, str]], output_file=OUTPUT_FILE) -> None:
-        """Save the flashcards to a JSON file"""
-        try:
-            with open(output_file, 'w', encoding='utf-8') as f:
-                json.dump({'terms': flashcards}, f, ensure_ascii=False, indent=2)
-            print(f"Successfully saved {len(flashcards)} flashcards to {output_file}")
-        except Exception as e:
-            print(f"Error saving to file: {str(e)}")
+    def save_to_json(self, flashcards: Iterable[Dict[str, str]], output_file=OUTPUT_FILE) -> Dict:
+        """Save the flashcards atomically; the format follows the file name (see OutputSinks).
+        Raises OutputError and leaves the previous file in place if the write fails."""
+        with self.metrics.span('save', self.pacer.url):
+            entry = write_cards(output_file, flashcards, url=self.pacer.url)
+            self.metrics.add_bytes(entry['bytes'])
+        print(f"Successfully saved {entry['cards']} flashcards to {output_file}")
+        return entry
 
     def close(self):
-        """Close the WebDriver connection and Chrome Window"""
+        """Close the WebDriver connection and Chrome Window (for a reader made with
+        from_driver, only stop our chromedriver and leave the browser running)"""
+        if self._attached:
+            self.driver.service.stop()
+            return
         self.driver.close()
         self.driver.quit()
         return
@@ -245,6 +364,9 @@ class QuizletStealthReader:
             else:
                 print("No flashcards found on the page")
                 
+        except OutputError:
+            # The skill would keep serving stale cards; don't let that pass quietly
+            raise
         except Exception as e:
             print(f"An error occurred: {str(e)}")
         finally:
@@ -0,0 +1,317 @@
+"""
+Local SQLite corpus of scraped sets.
+Every ingested set keeps its URL, source and scrape time; its cards go into an FTS5
+index over terms and definitions. Cards that are identical or nearly identical
+across sets (same question reworded by punctuation, a typo, an extra word) are
+grouped under one canonical card using 64-bit SimHash fingerprints, so searches and
+quizzes don't repeat the same question from ten copies of a class set.
+
+    python Corpus.py ingest flashcards.json Quizlet_API/flashcards.json
+    python Corpus.py search "marketing myopia"
+    python Corpus.py quiz 10
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import sqlite3
+import argparse
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from ScrapeCache import normalize_set_url, content_hash
+from GradingIndex import normalize_answer
+from OutputSinks import read_cards
+
+DEFAULT_CORPUS_PATH = "corpus.sqlite3"
+SIMHASH_BITS = 64
+# Character shingles: cards are too short for word features to separate well
+SHINGLE_SIZE = 3
+# Fingerprints at most this many bits apart are the same card. On short cards this
+# catches most one-character typos and small rewordings with no false matches in testing.
+NEAR_DUPLICATE_DISTANCE = 6
+# Split into NEAR_DUPLICATE_DISTANCE + 1 bands: two fingerprints within that distance
+# must agree exactly on at least one band, so candidates come from an indexed lookup
+SIMHASH_BANDS = NEAR_DUPLICATE_DISTANCE + 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sets (
+    id INTEGER PRIMARY KEY,
+    url_key TEXT NOT NULL UNIQUE,
+    url TEXT NOT NULL,
+    source TEXT,
+    content_hash TEXT NOT NULL,
+    card_count INTEGER NOT NULL,
+    first_seen REAL NOT NULL,
+    scraped_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cards (
+    id INTEGER PRIMARY KEY,
+    set_id INTEGER NOT NULL REFERENCES sets(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    term TEXT NOT NULL,
+    definition TEXT NOT NULL,
+    exact_hash TEXT NOT NULL,
+    simhash INTEGER NOT NULL,
+    canonical_id INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cards_set ON cards(set_id, position);
+CREATE INDEX IF NOT EXISTS cards_exact ON cards(exact_hash);
+CREATE INDEX IF NOT EXISTS cards_canonical ON cards(canonical_id);
+CREATE TABLE IF NOT EXISTS simhash_bands (
+    band INTEGER NOT NULL,
+    value INTEGER NOT NULL,
+    card_id INTEGER NOT NULL REFERENCES cards(id) ON DELETE CASCADE,
+    PRIMARY KEY (band, value, card_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS simhash_bands_card ON simhash_bands(card_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS cards_fts USING fts5(
+    term, definition, content='cards', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS cards_fts_insert AFTER INSERT ON cards BEGIN
+    INSERT INTO cards_fts(rowid, term, definition) VALUES (new.id, new.term, new.definition);
+END;
+CREATE TRIGGER IF NOT EXISTS cards_fts_delete AFTER DELETE ON cards BEGIN
+    INSERT INTO cards_fts(cards_fts, rowid, term, definition) VALUES ('delete', old.id, old.term, old.definition);
+END;
+"""
+
+
+def _card_text(card: Dict[str, str]) -> str:
+    return normalize_answer(card.get('term', '')) + ' | ' + normalize_answer(card.get('definition', ''))
+
+
+def exact_hash(card: Dict[str, str]) -> str:
+    """Hash of the normalized card, equal for cards that differ only in case and punctuation"""
+    return hashlib.sha1(_card_text(card).encode('utf-8')).hexdigest()
+
+
+def _feature_hash(feature: str) -> int:
+    return int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def simhash(card: Dict[str, str]) -> int:
+    """64-bit SimHash over character shingles of the normalized card"""
+    text = _card_text(card)
+    features = {text[i:i + SHINGLE_SIZE] for i in range(max(1, len(text) - SHINGLE_SIZE + 1))}
+    # Each bit of the fingerprint is the majority vote of that bit across the feature
+    # hashes; transposing the bit strings lets zip do the per-bit counting in C
+    rows = [format(_feature_hash(feature), f'0{SIMHASH_BITS}b') for feature in features]
+    majority = len(rows) / 2
+    bits = ''.join('1' if column.count('1') > majority else '0' for column in zip(*rows))
+    return int(bits, 2)
+
+
+def fts_query(text: str) -> str:
+    """User text as an FTS5 query matching every word, with FTS syntax (quotes,
+    AND/OR/NOT, column filters, *) taken literally"""
+    return " ".join('"' + word.replace('"', '""') + '"' for word in text.split())
+
+
+def _to_signed(value: int) -> int:
+    """SQLite integers are signed 64-bit"""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def _to_unsigned(value: int) -> int:
+    return value + (1 << 64) if value < 0 else value
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(_to_unsigned(a) ^ _to_unsigned(b)).count('1')
+
+
+def bands(fingerprint: int) -> List[int]:
+    """The fingerprint cut into SIMHASH_BANDS runs of (nearly) equal width"""
+    edges = [band * SIMHASH_BITS // SIMHASH_BANDS for band in range(SIMHASH_BANDS + 1)]
+    return [(fingerprint >> low) & ((1 << (high - low)) - 1) for low, high in zip(edges, edges[1:])]
+
+
+class Corpus:
+    def __init__(self, path: str = DEFAULT_CORPUS_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA foreign_keys=ON")
+        self.db.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.db.close()
+
+    def __enter__(self) -> 'Corpus':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _near_canonical(self, fingerprint: int) -> Optional[int]:
+        """Canonical id of the closest stored card within NEAR_DUPLICATE_DISTANCE bits"""
+        clauses = ' OR '.join('(band = ? AND value = ?)' for _ in range(SIMHASH_BANDS))
+        params = [item for band, value in enumerate(bands(fingerprint)) for item in (band, value)]
+        candidates = self.db.execute(
+            f"SELECT DISTINCT c.id, c.simhash, c.canonical_id FROM simhash_bands b "
+            f"JOIN cards c ON c.id = b.card_id WHERE {clauses}", params
+        ).fetchall()
+        best = None
+        for candidate in candidates:
+            distance = hamming(candidate['simhash'], _to_signed(fingerprint))
+            if distance <= NEAR_DUPLICATE_DISTANCE and (best is None or distance < best[0]):
+                best = (distance, candidate['canonical_id'])
+        return best[1] if best else None
+
+    def ingest(self, url: str, flashcards: List[Dict[str, str]], source: str = "scrape",
+               scraped_at: float = None) -> Dict:
+        """Store a set's cards, replacing its previous version if the cards changed"""
+        scraped_at = scraped_at or time.time()
+        url_key = normalize_set_url(url)
+        digest = content_hash(flashcards)
+
+        with self._lock, self.db:
+            existing = self.db.execute("SELECT id, content_hash FROM sets WHERE url_key = ?", (url_key,)).fetchone()
+            if existing is not None and existing['content_hash'] == digest:
+                self.db.execute("UPDATE sets SET scraped_at = ?, source = ? WHERE id = ?",
+                                (scraped_at, source, existing['id']))
+                return {'set_id': existing['id'], 'changed': False, 'cards': len(flashcards), 'duplicates': 0}
+
+            if existing is not None:
+                set_id = existing['id']
+                self._drop_cards(set_id)
+                self.db.execute(
+                    "UPDATE sets SET url = ?, source = ?, content_hash = ?, card_count = ?, scraped_at = ? WHERE id = ?",
+                    (url, source, digest, len(flashcards), scraped_at, set_id))
+            else:
+                set_id = self.db.execute(
+                    "INSERT INTO sets (url_key, url, source, content_hash, card_count, first_seen, scraped_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (url_key, url, source, digest, len(flashcards), scraped_at, scraped_at)).lastrowid
+
+            duplicates = 0
+            for position, card in enumerate(flashcards):
+                exact = exact_hash(card)
+                twin = self.db.execute("SELECT canonical_id, simhash FROM cards WHERE exact_hash = ? LIMIT 1",
+                                       (exact,)).fetchone()
+                if twin is not None:
+                    # Same normalized text: no need to fingerprint it again
+                    canonical_id, fingerprint = twin['canonical_id'], _to_unsigned(twin['simhash'])
+                else:
+                    fingerprint = simhash(card)
+                    canonical_id = self._near_canonical(fingerprint)
+                card_id = self.db.execute(
+                    "INSERT INTO cards (set_id, position, term, definition, exact_hash, simhash, canonical_id) "
+                    "VALUES (?, ?, ?, ?, ?, ?, 0)",
+                    (set_id, position, card.get('term', ''), card.get('definition', ''), exact,
+                     _to_signed(fingerprint))).lastrowid
+                if canonical_id is None:
+                    canonical_id = card_id
+                else:
+                    duplicates += 1
+                self.db.execute("UPDATE cards SET canonical_id = ? WHERE id = ?", (canonical_id, card_id))
+                self.db.executemany("INSERT INTO simhash_bands (band, value, card_id) VALUES (?, ?, ?)",
+                                    [(band, value, card_id) for band, value in enumerate(bands(fingerprint))])
+
+        return {'set_id': set_id, 'changed': True, 'cards': len(flashcards), 'duplicates': duplicates}
+
+    def _drop_cards(self, set_id: int) -> None:
+        """Delete a set's cards, handing canonical status to a surviving duplicate"""
+        doomed = [row['id'] for row in self.db.execute("SELECT id FROM cards WHERE set_id = ?", (set_id,))]
+        for card_id in doomed:
+            heir = self.db.execute(
+                "SELECT MIN(id) AS id FROM cards WHERE canonical_id = ? AND set_id != ?", (card_id, set_id)
+            ).fetchone()['id']
+            if heir is not None:
+                self.db.execute("UPDATE cards SET canonical_id = ? WHERE canonical_id = ? AND set_id != ?",
+                                (heir, card_id, set_id))
+        self.db.execute("DELETE FROM cards WHERE set_id = ?", (set_id,))
+
+    def ingest_file(self, path: str, url: str = None, source: str = None) -> Dict:
+        """Ingest a saved flashcards file in any format OutputSinks reads"""
+        flashcards = list(read_cards(path))
+        url = url or f"file://{os.path.abspath(path)}"
+        return self.ingest(url, flashcards, source=source or "file",
+                           scraped_at=os.path.getmtime(path))
+
+    def search(self, query: str, limit: int = 20, distinct: bool = True) -> List[Dict]:
+        """Full-text search over terms and definitions, best matches first"""
+        match = fts_query(query)
+        if not match:
+            return []
+        group = "c.canonical_id" if distinct else "c.id"
+        # bm25() can't be used under GROUP BY, so rank first and collapse copies after
+        rows = self.db.execute(
+            f"WITH m AS MATERIALIZED (SELECT rowid, bm25(cards_fts) AS score FROM cards_fts WHERE cards_fts MATCH ?) "
+            f"SELECT c.id, c.term, c.definition, c.canonical_id, s.url, MIN(m.score) AS rank "
+            f"FROM m JOIN cards c ON c.id = m.rowid JOIN sets s ON s.id = c.set_id "
+            f"GROUP BY {group} ORDER BY rank LIMIT ?",
+            (match, limit)).fetchall()
+        return [dict(row) for row in rows]
+
+    def quiz(self, count: int = 10, query: str = None, set_urls: Iterable[str] = None) -> List[Dict]:
+        """Random distinct cards, optionally limited to a search or to some sets"""
+        clauses = ["c.id = c.canonical_id"]
+        params = []
+        if query and query.strip():
+            clauses.append("c.id IN (SELECT rowid FROM cards_fts WHERE cards_fts MATCH ?)")
+            params.append(fts_query(query))
+        if set_urls:
+            keys = [normalize_set_url(url) for url in set_urls]
+            # A canonical card counts for a set if any of its copies is in it
+            clauses[0] = "c.id IN (SELECT canonical_id FROM cards d JOIN sets s ON s.id = d.set_id " \
+                         f"WHERE s.url_key IN ({', '.join('?' for _ in keys)}))"
+            params = keys + params
+        rows = self.db.execute(
+            f"SELECT c.id, c.term, c.definition FROM cards c WHERE {' AND '.join(clauses)} "
+            f"ORDER BY random() LIMIT ?", params + [count]).fetchall()
+        return [dict(row) for row in rows]
+
+    def duplicates(self, card_id: int) -> List[Dict]:
+        """Every stored copy of a card, with the set it came from"""
+        rows = self.db.execute(
+            "SELECT c.id, c.term, c.definition, s.url FROM cards c JOIN sets s ON s.id = c.set_id "
+            "WHERE c.canonical_id = (SELECT canonical_id FROM cards WHERE id = ?) ORDER BY c.id",
+            (card_id,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def set_cards(self, url: str) -> List[Dict[str, str]]:
+        """A stored set's cards in their original order"""
+        rows = self.db.execute(
+            "SELECT c.term, c.definition FROM cards c JOIN sets s ON s.id = c.set_id "
+            "WHERE s.url_key = ? ORDER BY c.position", (normalize_set_url(url),)).fetchall()
+        return [dict(row) for row in rows]
+
+    def stats(self) -> Dict[str, int]:
+        row = self.db.execute(
+            "SELECT (SELECT COUNT(*) FROM sets) AS sets, (SELECT COUNT(*) FROM cards) AS cards, "
+            "(SELECT COUNT(*) FROM cards WHERE id = canonical_id) AS distinct_cards").fetchone()
+        return dict(row)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local corpus of scraped flashcard sets")
+    parser.add_argument("--db", default=DEFAULT_CORPUS_PATH)
+    commands = parser.add_subparsers(dest="command", required=True)
+    ingest = commands.add_parser("ingest", help="add saved flashcards files")
+    ingest.add_argument("files", nargs="+")
+    search = commands.add_parser("search", help="full-text search")
+    search.add_argument("query")
+    search.add_argument("--limit", type=int, default=20)
+    quiz = commands.add_parser("quiz", help="random distinct cards")
+    quiz.add_argument("count", type=int, nargs="?", default=10)
+    quiz.add_argument("--query")
+    commands.add_parser("stats")
+    args = parser.parse_args()
+
+    with Corpus(args.db) as corpus:
+        if args.command == "ingest":
+            for path in args.files:
+                result = corpus.ingest_file(path)
+                print(f"{path}: {result['cards']} cards, {result['duplicates']} duplicates"
+                      f"{'' if result['changed'] else ' (unchanged)'}")
+        elif args.command == "search":
+            json.dump(corpus.search(args.query, args.limit), sys.stdout, ensure_ascii=False, indent=2)
+        elif args.command == "quiz":
+            json.dump({'terms': corpus.quiz(args.count, args.query)}, sys.stdout, ensure_ascii=False, indent=2)
+        else:
+            print(corpus.stats())
@@ -0,0 +1,378 @@
+"""
+Set discovery: start from profile, folder or class pages, follow the listing pages
+they link to, and scrape every set found along the way.
+
+Every link goes through a persistent SQLite frontier. The frontier normalizes URLs,
+drops ones it has already seen, and hands out work best-first: shallow before deep,
+and within a listing page in page order (Quizlet lists newest sets first). A Bloom
+filter in front of it answers "seen before?" for the millions of repeat links in a
+big graph without touching the database, so memory stays at the filter's fixed size
+however large the crawl gets. Sets are claimed and scraped in batches and never
+scraped again once done; a killed run picks up where it stopped, redoing only the
+sets that were in flight. Listing pages are different: they gain sets over time, so
+one expanded longer than listing_ttl ago goes back in line, seeds included,
+and only its new sets are queued.
+
+    python Discovery.py https://quizlet.com/someuser/sets --max-depth 2 --shard-dir sets/
+"""
+import re
+import math
+import time
+import sqlite3
+import hashlib
+import argparse
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse, parse_qs, urlencode
+from typing import Callable, Dict, Iterable, List, Optional
+
+from ScrapeCache import normalize_set_url, SET_ID_PATTERN
+from BatchCrawl import classify_error, PERMANENT_ERRORS, DEFAULT_MAX_ATTEMPTS, ERROR_EMPTY
+
+DEFAULT_FRONTIER_PATH = "frontier.sqlite3"
+DEFAULT_CAPACITY = 1_000_000
+# Chance that a URL never seen before is taken for a seen one and skipped
+DEFAULT_ERROR_RATE = 1e-6
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_MAX_DEPTH = 3
+# Age after which an expanded listing page is expanded again for new sets
+DEFAULT_LISTING_TTL = 24 * 60 * 60
+
+KIND_SET = "set"
+KIND_LISTING = "listing"
+
+PENDING = "pending"
+IN_PROGRESS = "in_progress"
+DONE = "done"
+FAILED = "failed"
+
+# A username path segment; purely numeric ones are set ids (quizlet.com/434682915/sets/)
+USER_SEGMENT = r'(?:user/)?(?!\d+(?:/|$))[\w.-]+'
+# Listing pages worth following: a user's sets, folders and classes, a folder, a class
+LISTING_PATTERNS = (
+    re.compile(r'^/class/\d+(?:/[\w-]+)?$'),
+    re.compile(r'^/' + USER_SEGMENT + r'/(?:sets|folders|classes)$'),
+    re.compile(r'^/' + USER_SEGMENT + r'/folders/[\w-]+(?:/sets)?$'),
+)
+# A bare profile (quizlet.com/someuser) is only followed when given as a seed
+PROFILE_PATTERN = re.compile(r'^/' + USER_SEGMENT + r'$')
+# Query parameters that select a different page of the same listing
+LISTING_PARAMS = ('page',)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS frontier (
+    url TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    depth INTEGER NOT NULL,
+    priority REAL NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error_kind TEXT,
+    source TEXT,
+    discovered_at REAL NOT NULL,
+    finished_at REAL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS frontier_queue ON frontier (kind, status, priority);
+"""
+
+
+class BloomFilter:
+    """Fixed-size set membership with no false negatives and a tunable false-positive rate"""
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, error_rate: float = DEFAULT_ERROR_RATE):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str) -> Iterable[int]:
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        # Double hashing: k positions from two 64-bit halves
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, key: str) -> bool:
+        """Add key; True if it was (probably) there already"""
+        present = True
+        for position in self._positions(key):
+            byte, bit = divmod(position, 8)
+            if not self.bits[byte] & (1 << bit):
+                present = False
+                self.bits[byte] |= 1 << bit
+        if not present:
+            self.count += 1
+        return present
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[position // 8] & (1 << (position % 8)) for position in self._positions(key))
+
+    @property
+    def memory_bytes(self) -> int:
+        return len(self.bits)
+
+
+def classify_link(url: str, seed: bool = False) -> Optional[str]:
+    """'set', 'listing' or None for a link found on (or given as) a listing page"""
+    parsed = urlparse(url)
+    host = (parsed.hostname or '').lower()
+    if parsed.scheme not in ('http', 'https') or not (host == 'quizlet.com' or host.endswith('.quizlet.com')):
+        return None
+    path = parsed.path.rstrip('/') or '/'
+    # Checked before sets: class ids look like set ids
+    if any(pattern.match(path) for pattern in LISTING_PATTERNS):
+        return KIND_LISTING
+    if SET_ID_PATTERN.search(path + '/'):
+        return KIND_SET
+    if seed and PROFILE_PATTERN.match(path):
+        return KIND_LISTING
+    return None
+
+
+def normalize_url(url: str, kind: str) -> str:
+    """One spelling per page: sets as in ScrapeCache, listings without tracking params"""
+    if kind == KIND_SET:
+        return normalize_set_url(url)
+    parsed = urlparse(url.strip())
+    host = (parsed.hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    query = parse_qs(parsed.query)
+    kept = urlencode([(name, query[name][0]) for name in LISTING_PARAMS if name in query and query[name][0] != '1'])
+    return f"https://{host}{parsed.path.rstrip('/')}/" + (f"?{kept}" if kept else "")
+
+
+class Frontier:
+    """Persistent, deduplicated, prioritized queue of listing pages and sets"""
+
+    def __init__(self, path: str = DEFAULT_FRONTIER_PATH, capacity: int = DEFAULT_CAPACITY,
+                 error_rate: float = DEFAULT_ERROR_RATE, max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+                 listing_ttl: Optional[float] = DEFAULT_LISTING_TTL):
+        self.path = path
+        self.error_rate = error_rate
+        self.max_attempts = max_attempts
+        # None expands every listing page only once
+        self.listing_ttl = listing_ttl
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        # Work claimed by a run that died is up for grabs again
+        with self.db:
+            self.db.execute("UPDATE frontier SET status = ? WHERE status = ?", (PENDING, IN_PROGRESS))
+        self._rebuild(capacity)
+
+    def _rebuild(self, capacity: int) -> None:
+        """Refill the filter from the database, streaming, with room to grow"""
+        known = self.db.execute("SELECT COUNT(*) FROM frontier").fetchone()[0]
+        self.seen = BloomFilter(max(capacity, 2 * known), self.error_rate)
+        for (url,) in self.db.execute("SELECT url FROM frontier"):
+            self.seen.add(url)
+
+    def add(self, url: str, depth: int = 0, source: str = None, rank: float = 0.0, seed: bool = False) -> bool:
+        """Queue a link unless it is unknown territory or already seen; True if queued"""
+        return self.add_links([url], depth, source, seed=seed, ranks=[rank]) == 1
+
+    def add_links(self, links: Iterable[str], depth: int, source: str = None, seed: bool = False,
+                  ranks: List[float] = None) -> int:
+        """Queue the links of one page, ranked by their position on it; returns how many were new"""
+        links = list(links)
+        rows = []
+        now = time.time()
+        with self._lock:
+            for i, link in enumerate(links):
+                kind = classify_link(link, seed=seed)
+                if kind is None:
+                    continue
+                url = normalize_url(link, kind)
+                if self.seen.add(url):
+                    continue
+                rank = ranks[i] if ranks else i / len(links)
+                # Depth dominates; position on the page (newest first) breaks ties
+                rows.append((url, kind, depth, depth + rank, source, now))
+            if rows:
+                with self.db:
+                    self.db.executemany(
+                        "INSERT OR IGNORE INTO frontier (url, kind, depth, priority, source, discovered_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?)", rows)
+            if self.seen.count > self.seen.capacity:
+                self._rebuild(2 * self.seen.capacity)
+        return len(rows)
+
+    def _requeue_stale_listings(self) -> int:
+        """Put listing pages expanded more than listing_ttl ago back in line"""
+        if self.listing_ttl is None:
+            return 0
+        return self.db.execute(
+            "UPDATE frontier SET status = ?, attempts = 0, error_kind = NULL "
+            "WHERE kind = ? AND status = ? AND finished_at <= ?",
+            (PENDING, KIND_LISTING, DONE, time.time() - self.listing_ttl)).rowcount
+
+    def claim(self, kind: str, limit: int) -> List[Dict]:
+        """Take up to limit of the best pending entries of a kind"""
+        with self._lock, self.db:
+            if kind == KIND_LISTING:
+                self._requeue_stale_listings()
+            rows = self.db.execute(
+                "SELECT url, kind, depth, attempts FROM frontier WHERE kind = ? AND status = ? "
+                "ORDER BY priority LIMIT ?", (kind, PENDING, limit)).fetchall()
+            self.db.executemany("UPDATE frontier SET status = ?, attempts = attempts + 1 WHERE url = ?",
+                                [(IN_PROGRESS, row['url']) for row in rows])
+        return [dict(row, attempts=row['attempts'] + 1) for row in rows]
+
+    def finish(self, entry: Dict, error_kind: str = None) -> str:
+        """Record how a claimed entry went; failures go back in line until out of attempts"""
+        if error_kind is None:
+            status = DONE
+        elif error_kind in PERMANENT_ERRORS or entry['attempts'] >= self.max_attempts:
+            status = FAILED
+        else:
+            status = PENDING
+        with self._lock, self.db:
+            self.db.execute("UPDATE frontier SET status = ?, error_kind = ?, finished_at = ? WHERE url = ?",
+                            (status, error_kind, time.time(), entry['url']))
+        return status
+
+    def stats(self) -> Dict:
+        counts = {f"{kind}_{status}": count for kind, status, count in
+                  self.db.execute("SELECT kind, status, COUNT(*) FROM frontier GROUP BY kind, status")}
+        counts['filter_bytes'] = self.seen.memory_bytes
+        return counts
+
+    def close(self) -> None:
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class Discovery:
+    def __init__(self, frontier: Frontier, list_links: Callable[[str], Dict], scrape: Callable[[str], Dict],
+                 on_set: Callable[[str, List[Dict[str, str]]], None] = None, workers: int = 1,
+                 batch_size: int = DEFAULT_BATCH_SIZE, max_depth: int = DEFAULT_MAX_DEPTH):
+        # list_links(url) -> {'links': [...], 'error'}; scrape(url) -> DriverPool-style result.
+        # on_set(url, flashcards) is where scraped sets go (files, corpus, snapshots).
+        self.frontier = frontier
+        self.list_links = list_links
+        self.scrape = scrape
+        self.on_set = on_set
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_depth = max_depth
+
+    def seed(self, urls: Iterable[str]) -> int:
+        return self.frontier.add_links(urls, depth=0, source="seed", seed=True)
+
+    def _expand(self, entry: Dict) -> str:
+        try:
+            result = self.list_links(entry['url'])
+        except Exception as e:
+            result = {'links': [], 'error': str(e), 'error_type': type(e).__name__}
+        if result.get('error'):
+            return self.frontier.finish(entry, classify_error(result.get('error_type'), result['error']))
+        links = result.get('links') or []
+        # Links deeper than max_depth are dropped without being remembered, so a
+        # later run with a bigger max_depth still finds them
+        if entry['depth'] < self.max_depth:
+            self.frontier.add_links(links, depth=entry['depth'] + 1, source=entry['url'])
+        else:
+            self.frontier.add_links([link for link in links if classify_link(link) == KIND_SET],
+                                    depth=entry['depth'] + 1, source=entry['url'])
+        return self.frontier.finish(entry)
+
+    def _scrape(self, entry: Dict) -> str:
+        try:
+            result = self.scrape(entry['url'])
+        except Exception as e:
+            result = {'flashcards': [], 'error': str(e), 'error_type': type(e).__name__}
+        if result.get('error'):
+            return self.frontier.finish(entry, classify_error(result.get('error_type'), result['error']))
+        if not result.get('flashcards'):
+            return self.frontier.finish(entry, ERROR_EMPTY)
+        if self.on_set is not None:
+            self.on_set(entry['url'], result['flashcards'])
+        return self.frontier.finish(entry)
+
+    def run(self, max_sets: int = None) -> Counter:
+        """Alternate between scraping a batch of sets and expanding listing pages until
+        the frontier is empty (or max_sets have been scraped)"""
+        outcomes = Counter()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            while max_sets is None or outcomes[f"{KIND_SET}_{DONE}"] < max_sets:
+                limit = self.batch_size
+                if max_sets is not None:
+                    limit = min(limit, max_sets - outcomes[f"{KIND_SET}_{DONE}"])
+                # Sets first: they are the point, and draining them keeps the frontier small
+                batch = self.frontier.claim(KIND_SET, limit)
+                if batch:
+                    for status in executor.map(self._scrape, batch):
+                        outcomes[f"{KIND_SET}_{status}"] += 1
+                    continue
+                listings = self.frontier.claim(KIND_LISTING, self.workers)
+                if not listings:
+                    break
+                for status in executor.map(self._expand, listings):
+                    outcomes[f"{KIND_LISTING}_{status}"] += 1
+        return outcomes
+
+
+if __name__ == "__main__":
+    from DriverPool import DriverPool
+    from Scheduler import CrawlScheduler, HostLimits
+    from OutputSinks import ShardedOutput
+
+    parser = argparse.ArgumentParser(description="Discover and scrape every set reachable from listing pages")
+    parser.add_argument("seeds", nargs="+", help="profile, folder or class URLs")
+    parser.add_argument("--frontier", default=DEFAULT_FRONTIER_PATH)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--max-depth", type=int, default=DEFAULT_MAX_DEPTH)
+    parser.add_argument("--max-sets", type=int)
+    parser.add_argument("--capacity", type=int, default=DEFAULT_CAPACITY, help="URLs the filter is sized for")
+    parser.add_argument("--listing-ttl", type=float, default=DEFAULT_LISTING_TTL,
+                        help="seconds before an expanded listing page is expanded again")
+    parser.add_argument("--shard-dir", default="sets", help="write every scraped set to its own file here")
+    parser.add_argument("--shard-format", default=".ndjson.gz")
+    parser.add_argument("--corpus", help="also ingest every scraped set into this SQLite corpus")
+    parser.add_argument("--snapshots", help="also publish every scraped set as a new version here")
+    parser.add_argument("--rate", type=float, default=HostLimits().rate)
+    args = parser.parse_args()
+
+    shards = ShardedOutput(args.shard_dir, args.shard_format)
+    corpus = None
+    if args.corpus:
+        from Corpus import Corpus
+        corpus = Corpus(args.corpus)
+    store = None
+    if args.snapshots:
+        from Snapshots import SnapshotStore
+        store = SnapshotStore(args.snapshots)
+
+    def on_set(url, flashcards):
+        shards.write_set(url, flashcards)
+        if corpus is not None:
+            corpus.ingest(url, flashcards, source="discovery")
+        if store is not None:
+            store.publish(url, flashcards)
+
+    scheduler = CrawlScheduler(HostLimits(rate=args.rate))
+    with Frontier(args.frontier, capacity=args.capacity, listing_ttl=args.listing_ttl) as frontier, DriverPool(size=args.workers) as pool:
+        discovery = Discovery(frontier, scheduler.wrap(pool.list_links), scheduler.wrap(pool.scrape),
+                              on_set=on_set, workers=args.workers, batch_size=args.batch_size,
+                              max_depth=args.max_depth)
+        print(f"Seeded {discovery.seed(args.seeds)} new URLs")
+        outcomes = discovery.run(args.max_sets)
+        for outcome, count in outcomes.most_common():
+            print(f"{outcome:<24}{count:>8}")
+        print(f"Frontier: {frontier.stats()}")
+    shards.close()
+    if corpus is not None:
+        corpus.close()
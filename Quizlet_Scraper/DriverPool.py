@@ -0,0 +1,263 @@
+"""
+Pool of pre-initialized stealth Chrome drivers for scraping many sets at once.
+Linux OS Only!! (built on RenderStealthReader)
+"""
+import os
+import sys
+import queue
+import time
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict
+
+from ChromeViewerLinux import RenderStealthReader, DEFAULT_DEBUGGING_PORT
+from Pacing import DEFAULT_PROFILE
+from Extraction import EXTRACT_BULK
+from Metrics import METRICS
+from ResourcePolicy import DEFAULT_POLICY
+from DriverWatchdog import DriverWatchdog
+from HttpFetcher import RateLimitedError
+from ScrapeCache import revalidated_cards, http_fingerprint
+
+# How long acquire() waits for an idle browser before retrying slots whose browser
+# couldn't be restarted
+SLOT_RETRY_INTERVAL = 5.0
+
+
+class DriverPool:
+    def __init__(self, size: int = None, base_port: int = DEFAULT_DEBUGGING_PORT,
+                 profile_root: str = None, reader_class=RenderStealthReader,
+                 start_at_homepage: bool = True, pacing: str = DEFAULT_PROFILE,
+                 cache=None, resource_policy=DEFAULT_POLICY, session_store=None,
+                 watchdog: DriverWatchdog = None, strategy: str = EXTRACT_BULK,
+                 probe=http_fingerprint):
+        # One browser per core by default
+        self.size = size or os.cpu_count() or 1
+        self.base_port = base_port
+        self.reader_class = reader_class
+        self.start_at_homepage = start_at_homepage
+        self.pacing = pacing
+        self.resource_policy = resource_policy
+        # Optional SessionStore shared by every browser in the pool
+        self.session_store = session_store
+        # Recycles browsers between jobs to keep memory bounded; pass False to disable
+        self.watchdog = DriverWatchdog() if watchdog is None else (watchdog or None)
+        # Optional ScrapeCache; cached sets never touch a browser
+        self.cache = cache
+        # Extraction strategy for extract_flashcards, recorded with each cached set
+        self.strategy = strategy
+        # Cheap check that a stale cached set is still current (see ScrapeCache.revalidated_cards);
+        # None re-scrapes every stale set
+        self.probe = probe
+
+        # Each browser gets its own profile dir under one root we can clean up
+        self._owns_profile_root = profile_root is None
+        self.profile_root = profile_root or tempfile.mkdtemp(prefix="quizlet-pool-")
+
+        self._idle = queue.Queue()
+        self.readers = []
+        # Slots whose browser failed to start, retried when a caller is left waiting
+        self._vacant = []
+        self._starting = 0
+        self._slots_lock = threading.Lock()
+
+        # Cold starts are slow, so bring the browsers up in parallel
+        with ThreadPoolExecutor(max_workers=self.size) as executor:
+            started = list(executor.map(self._start_reader, range(self.size)))
+
+        for index, reader in enumerate(started):
+            if reader is not None:
+                self.readers.append(reader)
+                self._idle.put(reader)
+            else:
+                self._vacant.append(index)
+
+        if not self.readers:
+            self.close()
+            raise RuntimeError("Could not start any chrome drivers for the pool")
+
+        print(f"Driver pool ready with {len(self.readers)} browsers")
+
+    def _start_reader(self, index: int):
+        """Start one stealth-configured reader with its own port and profile"""
+        port = self.base_port + index
+        profile_dir = os.path.join(self.profile_root, f"profile-{index}")
+        os.makedirs(profile_dir, exist_ok=True)
+        kwargs = {'pacing': self.pacing, 'resource_policy': self.resource_policy}
+        if self.session_store is not None:
+            kwargs['session_store'] = self.session_store
+        try:
+            return self.reader_class(debugging_port=port, profile_dir=profile_dir, **kwargs)
+        except Exception as e:
+            print(f"Error starting pooled driver on port {port}: {str(e)}")
+            return None
+
+    def _replace(self, reader):
+        """Throw away a broken reader and start a fresh one in its slot; if that fails
+        the slot is left vacant for acquire() to retry"""
+        try:
+            reader.close()
+        except Exception:
+            pass
+
+        index = reader.debugging_port - self.base_port
+        fresh = self._start_reader(index)
+        with self._slots_lock:
+            self.readers.remove(reader)
+            if fresh is not None:
+                self.readers.append(fresh)
+            else:
+                self._vacant.append(index)
+        return fresh
+
+    def _backfill(self):
+        """Try to start a browser in a vacant slot; the new reader, or None"""
+        with self._slots_lock:
+            if not self._vacant:
+                return None
+            index = self._vacant.pop(0)
+            self._starting += 1
+        fresh = self._start_reader(index)
+        with self._slots_lock:
+            self._starting -= 1
+            if fresh is not None:
+                self.readers.append(fresh)
+            else:
+                self._vacant.append(index)
+        return fresh
+
+    def acquire(self, timeout: float = None):
+        """Borrow an idle reader, waiting until one is free. Raises queue.Empty after
+        timeout, and RuntimeError once no slot has a working browser."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = SLOT_RETRY_INTERVAL
+            if deadline is not None:
+                wait = max(0.0, min(wait, deadline - time.monotonic()))
+            try:
+                return self._idle.get(timeout=wait)
+            except queue.Empty:
+                pass
+            reader = self._backfill()
+            if reader is not None:
+                return reader
+            with self._slots_lock:
+                if not self.readers and not self._starting:
+                    raise RuntimeError("Driver pool has no working browsers left")
+            if deadline is not None and time.monotonic() >= deadline:
+                raise queue.Empty
+
+    def release(self, reader) -> None:
+        """Hand a reader back to the pool"""
+        if reader is not None:
+            self._idle.put(reader)
+
+    def scrape(self, url: str) -> Dict:
+        """Scrape a single set on whichever reader is free"""
+        if self.cache is not None:
+            flashcards = revalidated_cards(url, self.cache, self.probe)
+            if flashcards is not None:
+                return {'url': url, 'flashcards': flashcards, 'error': None, 'cached': True}
+
+        reader = self.acquire()
+        result = {'url': url, 'flashcards': [], 'error': None}
+        try:
+            reader.open_url(url, start_at_homepage=self.start_at_homepage)
+            result['flashcards'] = reader.extract_flashcards(self.strategy)
+            result['timing'] = reader.pacer.summary()
+            result['page_stats'] = reader.page_stats
+            if self.cache is not None and result['flashcards']:
+                self.cache.put(url, result['flashcards'], self.strategy)
+        except Exception as e:
+            print(f"Error scraping {url}: {str(e)}")
+            result['error'] = str(e)
+            result['error_type'] = type(e).__name__
+            # open_url closes the driver on captcha, so the slot needs a new one;
+            # a 429 leaves the browser intact
+            if isinstance(e, RateLimitedError):
+                reader = self._check_health(reader)
+            else:
+                reader = self._replace(reader)
+        else:
+            reader = self._check_health(reader)
+        finally:
+            self.release(reader)
+        return result
+
+    def list_links(self, url: str) -> Dict:
+        """Every link on a listing page (profile, folder, class) on whichever reader is free"""
+        reader = self.acquire()
+        result = {'url': url, 'links': [], 'error': None}
+        try:
+            reader.open_url(url, start_at_homepage=self.start_at_homepage)
+            result['links'] = list(reader.harvest_links())
+        except Exception as e:
+            print(f"Error listing {url}: {str(e)}")
+            result['error'] = str(e)
+            result['error_type'] = type(e).__name__
+            if isinstance(e, RateLimitedError):
+                reader = self._check_health(reader)
+            else:
+                reader = self._replace(reader)
+        else:
+            reader = self._check_health(reader)
+        finally:
+            self.release(reader)
+        return result
+
+    def _check_health(self, reader):
+        """Recycle a reader between jobs once it has grown too big or served too many pages"""
+        if self.watchdog is None:
+            return reader
+        self.watchdog.page_done(reader)
+        recycle, reason = self.watchdog.check(reader)
+        if not recycle:
+            return reader
+        print(f"Recycling browser on port {reader.debugging_port}: {reason}")
+        self.watchdog.forget(reader)
+        return self._replace(reader)
+
+    def scrape_many(self, urls: List[str]) -> Dict[str, Dict]:
+        """Spread the urls across the pool and return the result for each url"""
+        unique_urls = list(dict.fromkeys(urls))
+        if not unique_urls:
+            return {}
+        # One worker per slot, vacant ones included, since acquire() can refill them
+        with ThreadPoolExecutor(max_workers=self.size) as executor:
+            results = list(executor.map(self.scrape, unique_urls))
+        return {result['url']: result for result in results}
+
+    def close(self) -> None:
+        """Quit every browser in the pool and remove the temporary profiles"""
+        for reader in self.readers:
+            try:
+                reader.close()
+            except Exception as e:
+                print(f"Error closing pooled driver: {str(e)}")
+        self.readers = []
+        self._vacant = []
+
+        if self._owns_profile_root:
+            shutil.rmtree(self.profile_root, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+if __name__ == "__main__":
+    urls = sys.argv[1:] or ["https://quizlet.com/434682915/mkt327-questions-flash-cards/"]
+    with DriverPool() as pool:
+        results = pool.scrape_many(urls)
+
+    for url, result in results.items():
+        if result['error']:
+            print(f"{url}: failed ({result['error']})")
+        else:
+            print(f"{url}: {len(result['flashcards'])} flashcards")
+
+    METRICS.print_summary()
@@ -0,0 +1,106 @@
+"""
+Memory watchdog for long-running scrapers.
+Samples the resident memory of each reader's chromedriver process tree (chromedriver,
+Chrome and all its renderers) and counts the pages each reader has served, so a pool
+can recycle a browser between jobs once it crosses a memory or page threshold.
+Linux OS Only!! (reads /proc)
+"""
+import os
+import weakref
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_MAX_RSS_MB = 1024
+DEFAULT_MAX_PAGES = 200
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def _children_map() -> Dict[int, List[int]]:
+    """Parent pid -> child pids, for every process on the host"""
+    children = defaultdict(list)
+    for name in os.listdir('/proc'):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f'/proc/{name}/stat', 'r') as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # The command name can contain spaces and parens, so split after the last ')'
+        ppid = int(stat.rsplit(')', 1)[1].split()[1])
+        children[ppid].append(int(name))
+    return children
+
+
+def _process_rss(pid: int) -> int:
+    try:
+        with open(f'/proc/{pid}/statm', 'r') as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def process_tree(pid: int) -> List[int]:
+    """pid and all of its descendants"""
+    children = _children_map()
+    tree = []
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        tree.append(current)
+        pending.extend(children.get(current, []))
+    return tree
+
+
+def process_tree_rss(pid: int) -> int:
+    """Summed RSS in bytes of a process tree. Shared pages are counted once per
+    process, so this overstates real usage a little, which errs on the safe side."""
+    return sum(_process_rss(member) for member in process_tree(pid))
+
+
+def driver_pid(reader) -> Optional[int]:
+    """pid of the chromedriver a reader talks to, if we launched it"""
+    try:
+        return reader.driver.service.process.pid
+    except AttributeError:
+        return None
+
+
+class DriverWatchdog:
+    def __init__(self, max_rss_mb: float = DEFAULT_MAX_RSS_MB, max_pages: int = DEFAULT_MAX_PAGES):
+        self.max_rss = max_rss_mb * 1024 * 1024 if max_rss_mb else None
+        self.max_pages = max_pages
+        self._pages = weakref.WeakKeyDictionary()
+        self.recycled = 0
+
+    def page_done(self, reader) -> None:
+        """Count a page served by reader"""
+        self._pages[reader] = self._pages.get(reader, 0) + 1
+
+    def pages(self, reader) -> int:
+        return self._pages.get(reader, 0)
+
+    def sample(self, reader) -> Optional[int]:
+        """Current RSS in bytes of the reader's browser, or None if unknown"""
+        pid = driver_pid(reader)
+        if pid is None:
+            return None
+        return process_tree_rss(pid)
+
+    def check(self, reader) -> Tuple[bool, str]:
+        """Whether reader should be recycled, and why. Call only between jobs."""
+        pages = self.pages(reader)
+        if self.max_pages and pages >= self.max_pages:
+            return True, f"served {pages} pages"
+
+        if self.max_rss:
+            rss = self.sample(reader)
+            if rss is not None and rss >= self.max_rss:
+                return True, f"using {rss / 1024 / 1024:.0f}MB"
+
+        return False, ""
+
+    def forget(self, reader) -> None:
+        """Drop counters for a reader that has been recycled"""
+        self._pages.pop(reader, None)
+        self.recycled += 1
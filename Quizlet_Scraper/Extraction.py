@@ -0,0 +1,149 @@
+"""
+Flashcard extraction helpers shared by the Chrome readers.
+"""
+from typing import List, Dict, Optional
+
+TERMS_LIST_SELECTOR = "section[data-testid='terms-list']"
+TERM_TEXT_SELECTOR = "span.TermText"
+# Main content of listing pages (profile, folder, class) whose set links discovery follows
+LISTING_SELECTOR = "main, [role='main']"
+
+# Extraction strategies for extract_flashcards
+EXTRACT_BULK = "bulk"          # one execute_script call returning every card
+EXTRACT_ELEMENTS = "elements"  # find_elements and read .text one element at a time
+EXTRACT_HARVEST = "harvest"    # scroll/expand in steps, collecting cards as they render
+EXTRACTION_STRATEGIES = (EXTRACT_BULK, EXTRACT_ELEMENTS, EXTRACT_HARVEST)
+# Upper bound on harvest steps (about a viewport each), so a page that never settles
+# still ends; roomy enough for the largest sets (~11 cards per step)
+HARVEST_MAX_STEPS = 5000
+
+# Groups the TermText spans of the terms list by their card (the closest ancestor
+# holding two spans), so image-only sides and odd span counts don't shift the
+# pairing of later cards. Leaves `section` and `groups` ([card, [texts]]) in scope.
+_GROUP_CARDS_JS = """
+const section = document.querySelector(arguments[0]);
+if (!section) { return null; }
+const groups = [];
+const groupIndex = new Map();
+for (const span of section.querySelectorAll(arguments[1])) {
+    let card = span.parentElement;
+    while (card && card !== section && card.querySelectorAll(arguments[1]).length < 2) {
+        card = card.parentElement;
+    }
+    if (!card || card === section) { card = span; }
+    if (!groupIndex.has(card)) {
+        groupIndex.set(card, groups.length);
+        groups.push([card, []]);
+    }
+    groups[groupIndex.get(card)][1].push(span.innerText);
+}
+"""
+
+# Pulls every card out of the terms list in one round trip.
+BULK_EXTRACT_SCRIPT = _GROUP_CARDS_JS + """
+return groups.map(([card, sides], i) => ({
+    index: i,
+    term: sides[0] || '',
+    definition: sides.length > 1 ? sides[1] : ''
+}));
+"""
+
+# Returns the cards rendered since the last call, each with a key that stays the same
+# when a virtualized list unmounts and re-renders it: the card's own id, else its index
+# in the list as the page numbers it, else its text (so identical cards collapse into
+# one). Cards already sent are stamped and skipped; a re-rendered card loses its stamp
+# and is sent again under the same key, for the caller to drop.
+HARVEST_SCRIPT = _GROUP_CARDS_JS + """
+const fresh = [];
+for (const [card, sides] of groups) {
+    if (card.hasAttribute && card.hasAttribute('data-harvested')) { continue; }
+    if (card.setAttribute) { card.setAttribute('data-harvested', ''); }
+    const attr = name => (card.getAttribute && card.getAttribute(name)) || null;
+    const id = card.id || attr('data-id') || attr('data-term-id');
+    const index = attr('data-index') || attr('aria-posinset') || attr('aria-rowindex');
+    const term = sides[0] || '';
+    const definition = sides.length > 1 ? sides[1] : '';
+    fresh.push({
+        key: id ? 'id:' + id : index !== null ? 'index:' + index : 'text:' + term + '\\u001f' + definition,
+        term: term,
+        definition: definition
+    });
+}
+return fresh;
+"""
+
+
+# Clicks "see more"/"load more" style controls inside the container matched by
+# arguments[0], or in the element right after it (where pagers sit); returns how many
+# were clicked. Anchors that would navigate away are left alone, so expanding can't
+# take the reader off the page it is reading.
+EXPAND_SCRIPT = """
+const container = document.querySelector(arguments[0]);
+if (!container) { return 0; }
+const pattern = /^(see|show|load|view) (more|all)/i;
+const scopes = [container, container.nextElementSibling].filter(Boolean);
+let clicked = 0;
+for (const scope of scopes) {
+    for (const control of scope.querySelectorAll('button, a[role="button"]')) {
+        if (control.tagName === 'A') {
+            const href = (control.getAttribute('href') || '').trim();
+            if (href && href !== '#' && !href.startsWith('javascript:')) { continue; }
+        }
+        if (control.offsetParent !== null && pattern.test(control.innerText.trim())) {
+            control.click();
+            clicked++;
+        }
+    }
+}
+return clicked;
+"""
+
+
+# Every link on the page as an absolute URL, in document order (for discovery)
+LINKS_SCRIPT = """
+return Array.from(document.querySelectorAll('a[href]'), a => a.href);
+"""
+
+
+# Every term/definition text of the terms list in document order, for readers that
+# can't hold element handles (pair them with cards_from_texts)
+TERM_TEXTS_SCRIPT = """
+const section = document.querySelector(arguments[0]);
+if (!section) { return null; }
+return Array.from(section.querySelectorAll(arguments[1]), span => span.innerText);
+"""
+
+
+def make_flashcard(term: Optional[str], definition: Optional[str]) -> Optional[Dict[str, str]]:
+    """Build a flashcard record, or None when both sides are empty"""
+    term = (term or '').strip()
+    definition = (definition or '').strip()
+    if not term and not definition:
+        return None
+    if not term or not definition:
+        print(f"Warning: incomplete card (term={term!r}, definition={definition!r})")
+    return {
+        'term': term,
+        'definition': definition
+    }
+
+
+def cards_from_bulk(payload) -> List[Dict[str, str]]:
+    """Turn the JSON returned by BULK_EXTRACT_SCRIPT into flashcard records"""
+    flashcards = []
+    for item in payload or []:
+        flashcard = make_flashcard(item.get('term'), item.get('definition'))
+        if flashcard:
+            flashcards.append(flashcard)
+    return flashcards
+
+
+def cards_from_texts(texts: List[str]) -> List[Dict[str, str]]:
+    """Pair up a flat term/definition text list, keeping a trailing unpaired term"""
+    flashcards = []
+    for i in range(0, len(texts), 2):
+        definition = texts[i + 1] if i + 1 < len(texts) else ''
+        flashcard = make_flashcard(texts[i], definition)
+        if flashcard:
+            flashcards.append(flashcard)
+    return flashcards
@@ -0,0 +1,219 @@
+"""
+In-process stand-in for a Chrome WebDriver, for benchmarking the readers offline.
+Pages are fetched from a (local) HTTP server and parsed into cards; every command
+goes through execute(), which counts the round trip and sleeps a simulated latency.
+Only the calls and scripts the readers actually make are understood.
+"""
+import re
+import time
+import urllib.request
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+from collections import Counter
+from typing import List, Dict
+
+from Extraction import (
+    BULK_EXTRACT_SCRIPT, HARVEST_SCRIPT, EXPAND_SCRIPT, LINKS_SCRIPT, TERMS_LIST_SELECTOR, TERM_TEXT_SELECTOR
+)
+from HttpFetcher import _TermsListParser, PAGE_CHALLENGE_SCRIPT
+from Pacing import RESOURCE_COUNT_SCRIPT, READY_STATE_SCRIPT
+
+DEFAULT_LATENCY = 0.0005
+VIEWPORT_HEIGHT = 900
+HEADER_HEIGHT = 400
+CARD_HEIGHT = 80
+# How far below the viewport a lazily rendered list renders ahead
+RENDER_AHEAD = 2 * VIEWPORT_HEIGHT
+
+SCROLL_PATTERN = re.compile(r'scrollTo\((?:\{\s*top:\s*|0,\s*)(-?\d+)')
+
+
+class _LinkParser(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.hrefs = []
+
+    def handle_starttag(self, tag, attrs):
+        href = dict(attrs).get('href')
+        if tag == 'a' and href:
+            self.hrefs.append(href)
+
+
+class FakeElement:
+    def __init__(self, driver, kind: str, index: int = None):
+        self._driver = driver
+        self._kind = kind
+        self._index = index
+
+    @property
+    def text(self) -> str:
+        return self._driver.execute('getElementText', {'kind': self._kind, 'index': self._index})
+
+    def find_element(self, by, value):
+        return self.find_elements(by, value)[0]
+
+    def find_elements(self, by, value) -> List['FakeElement']:
+        return self._driver.execute('findChildElements', {'kind': self._kind, 'value': value})
+
+    def click(self):
+        return self._driver.execute('clickElement', {'kind': self._kind})
+
+
+class FakeWebDriver:
+    def __init__(self, latency: float = DEFAULT_LATENCY, lazy: bool = True):
+        self.latency = latency
+        # Whether cards only render once they are scrolled near
+        self.lazy = lazy
+        self.commands = Counter()
+        self.current_url = "about:blank"
+        self.texts = []
+        self.links = []
+        self.scroll_y = 0
+        self._harvested = 0
+        self.closed = False
+
+    @property
+    def command_count(self) -> int:
+        return sum(self.commands.values())
+
+    def reset_counts(self) -> None:
+        self.commands = Counter()
+
+    def execute(self, driver_command: str, params: Dict = None):
+        """Every round trip goes through here, like selenium's WebDriver.execute"""
+        self.commands[driver_command] += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return getattr(self, f"_cmd_{driver_command}")(params or {})
+
+    # Public WebDriver surface used by the readers
+
+    def get(self, url: str) -> None:
+        self.execute('get', {'url': url})
+
+    def execute_script(self, script: str, *args):
+        return self.execute('executeScript', {'script': script, 'args': list(args)})
+
+    def execute_cdp_cmd(self, cmd: str, cmd_args: Dict):
+        return self.execute('executeCdpCommand', {'cmd': cmd, 'params': cmd_args})
+
+    def find_element(self, by, value):
+        elements = self.find_elements(by, value)
+        if not elements:
+            raise LookupError(f"No element matches {value}")
+        return elements[0]
+
+    def find_elements(self, by, value) -> List[FakeElement]:
+        return self.execute('findElements', {'value': value})
+
+    def close(self) -> None:
+        self.execute('closeWindow')
+
+    def quit(self) -> None:
+        self.execute('quit')
+
+    # Page model
+
+    @property
+    def card_count(self) -> int:
+        return (len(self.texts) + 1) // 2
+
+    def _rendered_cards(self) -> int:
+        if not self.lazy:
+            return self.card_count
+        visible = (self.scroll_y + VIEWPORT_HEIGHT + RENDER_AHEAD - HEADER_HEIGHT) // CARD_HEIGHT
+        return max(0, min(self.card_count, visible))
+
+    def _page_height(self) -> int:
+        return HEADER_HEIGHT + self.card_count * CARD_HEIGHT
+
+    def _card(self, index: int) -> Dict[str, str]:
+        definition = self.texts[2 * index + 1] if 2 * index + 1 < len(self.texts) else ''
+        return {'term': self.texts[2 * index], 'definition': definition}
+
+    # Command handlers
+
+    def _cmd_get(self, params):
+        url = params['url']
+        self.current_url = url
+        self.scroll_y = 0
+        self._harvested = 0
+        self.texts = []
+        self.links = []
+        if url.startswith('http'):
+            with urllib.request.urlopen(url) as response:
+                html = response.read().decode('utf-8', errors='replace')
+            parser = _TermsListParser()
+            parser.feed(html)
+            parser.close()
+            self.texts = parser.texts
+            links = _LinkParser()
+            links.feed(html)
+            links.close()
+            self.links = [urljoin(url, href) for href in links.hrefs]
+
+    def _cmd_executeScript(self, params):
+        script = params['script']
+        args = params['args']
+
+        if script == BULK_EXTRACT_SCRIPT:
+            if not self.texts:
+                return None
+            return [dict(self._card(i), index=i) for i in range(self._rendered_cards())]
+        if script == HARVEST_SCRIPT:
+            if not self.texts:
+                return None
+            rendered = self._rendered_cards()
+            fresh = [dict(self._card(i), key=f"index:{i}") for i in range(self._harvested, rendered)]
+            self._harvested = max(self._harvested, rendered)
+            return fresh
+        if script == EXPAND_SCRIPT:
+            return 0
+        if script == LINKS_SCRIPT:
+            return list(self.links)
+        if script == READY_STATE_SCRIPT:
+            return "complete"
+        if script == RESOURCE_COUNT_SCRIPT:
+            return 10
+        if script == PAGE_CHALLENGE_SCRIPT:
+            return {'status': 200, 'captcha': False, 'title': ''}
+        if "scrollHeight" in script:
+            return self._page_height()
+        if "innerHeight" in script:
+            return VIEWPORT_HEIGHT
+
+        match = SCROLL_PATTERN.search(script)
+        if match:
+            limit = max(0, self._page_height() - VIEWPORT_HEIGHT)
+            self.scroll_y = max(0, min(int(match.group(1)), limit))
+        return None
+
+    def _cmd_executeCdpCommand(self, params):
+        return {}
+
+    def _cmd_findElements(self, params):
+        if params['value'] == TERMS_LIST_SELECTOR and self.texts:
+            return [FakeElement(self, 'section')]
+        if params['value'] == TERM_TEXT_SELECTOR:
+            return self._cmd_findChildElements({'kind': 'section', 'value': TERM_TEXT_SELECTOR})
+        return []
+
+    def _cmd_findChildElements(self, params):
+        if params['kind'] == 'section' and params['value'] == TERM_TEXT_SELECTOR:
+            rendered_spans = min(len(self.texts), 2 * self._rendered_cards())
+            return [FakeElement(self, 'span', i) for i in range(rendered_spans)]
+        return []
+
+    def _cmd_getElementText(self, params):
+        if params['kind'] == 'span':
+            return self.texts[params['index']]
+        return ''
+
+    def _cmd_clickElement(self, params):
+        return None
+
+    def _cmd_closeWindow(self, params):
+        return None
+
+    def _cmd_quit(self, params):
+        self.closed = True
@@ -0,0 +1,311 @@
+"""
+Grading index: an offline pass over scraped cards that precomputes everything needed
+to check a spoken answer without asking an LLM. For each card it stores the parsed
+multiple-choice options, the normalized forms of the right answer, phonetic keys for
+sound-alike matches and token sets for fuzzy matching. grade() is the reference for
+how a consumer uses an entry; anything it calls ambiguous goes to the LLM as before.
+
+    python GradingIndex.py flashcards.json -o grading_index.json
+"""
+import re
+import hashlib
+import argparse
+import unicodedata
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from OutputSinks import read_cards, write_cards
+
+DEFAULT_INDEX_FILE = "grading_index.json"
+
+KIND_MULTIPLE_CHOICE = "multiple_choice"
+KIND_FREE = "free"
+
+CORRECT = "correct"
+INCORRECT = "incorrect"
+AMBIGUOUS = "ambiguous"
+
+# Token overlap above which a free answer counts as right, and below which a
+# multiple-choice answer that is closer to another option counts as wrong
+ACCEPT_OVERLAP = 0.8
+REJECT_OVERLAP = 0.3
+# A sound-alike answer only counts as right when it is also spelled nearly the same;
+# Soundex alone can't tell "Austria" from "Australia"
+SOUND_ALIKE_SIMILARITY = 0.8
+
+CHOICES_HEADER = re.compile(r'^\s*select (?:one|all that apply)\s*:?\s*$', re.IGNORECASE | re.MULTILINE)
+CHOICE_LINE = re.compile(r'^\s*([a-h])[.)]\s+(.+?)\s*$', re.IGNORECASE)
+# "b. vision", "b) vision", "b"
+ANSWER_LETTER = re.compile(r'^\s*([a-h])(?:[.)]\s*(.*))?\s*$', re.IGNORECASE | re.DOTALL)
+
+# How choice letters come back from speech recognition
+SPOKEN_LETTERS = {
+    'a': ('a', 'ay', 'eh'),
+    'b': ('b', 'bee', 'be'),
+    'c': ('c', 'see', 'sea', 'si'),
+    'd': ('d', 'dee', 'de'),
+    'e': ('e', 'ee'),
+    'f': ('f', 'ef', 'eff'),
+    'g': ('g', 'gee', 'ji'),
+    'h': ('h', 'aitch', 'ach'),
+}
+# Lead-ins people say before the actual answer
+ANSWER_FILLERS = ('um', 'uh', 'i think', 'i guess', 'i say', 'maybe', 'the answer is', 'answer is', 'it is', 'its',
+                  'answer', 'option', 'letter', 'choice')
+
+ARTICLES = {'a', 'an', 'the'}
+STOPWORDS = ARTICLES | {'of', 'and', 'or', 'to', 'in', 'on', 'for', 'is', 'are', 'it', 'its', 'with', 'by'}
+NUMBER_WORDS = {
+    'zero': '0', 'one': '1', 'two': '2', 'three': '3', 'four': '4', 'five': '5', 'six': '6',
+    'seven': '7', 'eight': '8', 'nine': '9', 'ten': '10', 'eleven': '11', 'twelve': '12',
+    'thirteen': '13', 'fourteen': '14', 'fifteen': '15', 'sixteen': '16', 'seventeen': '17',
+    'eighteen': '18', 'nineteen': '19', 'twenty': '20',
+}
+
+SOUNDEX_CODES = {
+    **dict.fromkeys('bfpv', '1'), **dict.fromkeys('cgjkqsxz', '2'), **dict.fromkeys('dt', '3'),
+    'l': '4', **dict.fromkeys('mn', '5'), 'r': '6',
+}
+
+
+def _words(text: str) -> List[str]:
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch)).lower()
+    text = text.replace('&', ' and ')
+    return [NUMBER_WORDS.get(word, word) for word in re.findall(r"[a-z0-9]+", text.replace("'", ""))]
+
+
+def _stem(word: str) -> str:
+    """Just enough stemming that plurals match"""
+    if len(word) > 4 and word.endswith('ies'):
+        return word[:-3] + 'y'
+    if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+        return word[:-1]
+    return word
+
+
+def normalize_answer(text: str) -> str:
+    """Lowercase, accents, punctuation and articles stripped, number words as digits"""
+    return ' '.join(word for word in _words(text) if word not in ARTICLES)
+
+
+def token_set(text: str) -> List[str]:
+    """Content words of an answer, for overlap scoring"""
+    return sorted({_stem(word) for word in _words(text) if word not in STOPWORDS})
+
+
+def soundex(word: str) -> str:
+    """American Soundex of one word; digits pass through unchanged"""
+    word = word.lower()
+    if not word or not word[0].isalpha():
+        return word
+    code = word[0].upper()
+    last = SOUNDEX_CODES.get(word[0], '')
+    for ch in word[1:]:
+        digit = SOUNDEX_CODES.get(ch, '')
+        if digit and digit != last:
+            code += digit
+            if len(code) == 4:
+                break
+        # h and w don't separate letters with the same code; vowels do
+        if ch not in 'hw':
+            last = digit
+    return code.ljust(4, '0')
+
+
+def phonetic_key(text: str) -> str:
+    """Sound-alike key of a whole answer: the Soundex of each content word"""
+    return ' '.join(soundex(_stem(word)) for word in _words(text) if word not in STOPWORDS)
+
+
+def overlap(a: Iterable[str], b: Iterable[str]) -> float:
+    """Jaccard similarity of two token sets"""
+    a, b = set(a), set(b)
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def spelling_similarity(a: str, b: str) -> float:
+    """1 minus the edit distance between a and b over the longer one's length"""
+    if not a or not b:
+        return 0.0
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return 1.0 - previous[-1] / max(len(a), len(b))
+
+
+def parse_choices(text: str) -> Tuple[str, List[Tuple[str, str]]]:
+    """Split a Moodle-style question into its stem and lettered options"""
+    lines = (text or '').splitlines()
+    choices = []
+    stem = []
+    for line in lines:
+        match = CHOICE_LINE.match(line)
+        if match and (choices or stem):
+            choices.append((match.group(1).lower(), match.group(2)))
+        elif not choices:
+            stem.append(line)
+    stem_text = CHOICES_HEADER.sub('', '\n'.join(stem)).strip()
+    # A single "a. something" line is just a sentence that starts with a letter
+    if len(choices) < 2:
+        return (text or '').strip(), []
+    return stem_text, choices
+
+
+def _answer_forms(text: str) -> Dict:
+    return {
+        'text': text,
+        'normalized': normalize_answer(text),
+        'phonetic': phonetic_key(text),
+        'tokens': token_set(text),
+    }
+
+
+def card_id(card: Dict[str, str]) -> str:
+    """Stable id for a card, so the consumer can look entries up without positions"""
+    digest = hashlib.sha1()
+    digest.update(card.get('term', '').encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(card.get('definition', '').encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def index_card(card: Dict[str, str]) -> Dict:
+    """Grading entry for one card.
+
+    Multiple-choice cards carry the question and options in the term and the correct
+    option in the definition. Everything else is graded the way the skill asks it:
+    the definition is read out and the term is the expected answer."""
+    term = card.get('term', '')
+    definition = card.get('definition', '')
+    stem, choices = parse_choices(term)
+
+    if choices:
+        options = [dict(_answer_forms(option), letter=letter) for letter, option in choices]
+        match = ANSWER_LETTER.match(definition)
+        correct_letter = match.group(1).lower() if match else None
+        if correct_letter not in {letter for letter, _ in choices}:
+            # The definition isn't "b. ..."; find the option whose text it is
+            normalized = normalize_answer(definition)
+            correct_letter = next((option['letter'] for option in options
+                                   if option['normalized'] == normalized), None)
+        correct = next((option for option in options if option['letter'] == correct_letter), None)
+        answer = correct['text'] if correct else definition
+        entry = {'kind': KIND_MULTIPLE_CHOICE, 'question': stem, 'choices': options,
+                 'correct_letter': correct_letter}
+    else:
+        answer = term
+        entry = {'kind': KIND_FREE, 'question': definition}
+
+    forms = _answer_forms(answer)
+    accept = {forms['normalized']}
+    if entry.get('correct_letter'):
+        accept.add(entry['correct_letter'])
+    entry.update({
+        'id': card_id(card),
+        'answer': answer,
+        'accept': sorted(form for form in accept if form),
+        'phonetic': forms['phonetic'],
+        'tokens': forms['tokens'],
+    })
+    return entry
+
+
+def build_index(cards: Iterable[Dict[str, str]]) -> Iterator[Dict]:
+    for card in cards:
+        yield index_card(card)
+
+
+def strip_fillers(spoken: str) -> str:
+    """Drop lead-ins like "I think it's" from a spoken answer"""
+    text = ' '.join(_words(spoken))
+    stripped = True
+    while stripped:
+        stripped = False
+        for filler in ANSWER_FILLERS:
+            if text.startswith(filler + ' '):
+                text = text[len(filler) + 1:]
+                stripped = True
+    return text
+
+
+def spoken_letter(spoken: str) -> Optional[str]:
+    """The option letter an answer names, if it is nothing but a letter ("option bee")"""
+    text = strip_fillers(spoken)
+    for letter, forms in SPOKEN_LETTERS.items():
+        if text in forms:
+            return letter
+    return None
+
+
+def grade(entry: Dict, spoken: str) -> Tuple[str, float]:
+    """(correct | incorrect | ambiguous, confidence) for a spoken answer"""
+    spoken = strip_fillers(spoken)
+    if entry['kind'] == KIND_MULTIPLE_CHOICE and entry.get('correct_letter'):
+        # Checked first: "a" on its own would otherwise normalize away as an article
+        letter = spoken_letter(spoken)
+        if letter is not None:
+            return (CORRECT, 1.0) if letter == entry['correct_letter'] else (INCORRECT, 1.0)
+
+    normalized = normalize_answer(spoken)
+    if not normalized:
+        return AMBIGUOUS, 0.0
+    # Speech recognition splits and joins words freely ("photo synthesis")
+    compact = normalized.replace(' ', '')
+    if any(compact == form.replace(' ', '') for form in entry['accept']):
+        return CORRECT, 1.0
+
+    tokens = token_set(spoken)
+    phonetic = phonetic_key(spoken)
+
+    if entry['kind'] == KIND_MULTIPLE_CHOICE and entry.get('correct_letter'):
+        # Score the answer against every option and see which one it is closest to
+        scored = []
+        for option in entry['choices']:
+            score = overlap(tokens, option['tokens'])
+            if phonetic and phonetic == option['phonetic'] and \
+                    spelling_similarity(compact, option['normalized'].replace(' ', '')) >= SOUND_ALIKE_SIMILARITY:
+                score = max(score, 0.9)
+            if compact == option['normalized'].replace(' ', ''):
+                score = 1.0
+            scored.append((score, option['letter']))
+        scored.sort(reverse=True)
+        best_score, best_letter = scored[0]
+        runner_up = scored[1][0] if len(scored) > 1 else 0.0
+        if best_score >= ACCEPT_OVERLAP and best_score > runner_up:
+            return (CORRECT if best_letter == entry['correct_letter'] else INCORRECT), best_score
+        # Clearly about another option and sharing nothing with the right one
+        correct_score = next(score for score, letter in scored if letter == entry['correct_letter'])
+        if best_letter != entry['correct_letter'] and best_score > REJECT_OVERLAP and correct_score == 0.0:
+            return INCORRECT, best_score
+        return AMBIGUOUS, best_score
+
+    score = overlap(tokens, entry['tokens'])
+    if score >= ACCEPT_OVERLAP:
+        return CORRECT, score
+    if phonetic and phonetic == entry['phonetic']:
+        similarity = max(spelling_similarity(compact, form.replace(' ', '')) for form in entry['accept'])
+        if similarity >= SOUND_ALIKE_SIMILARITY:
+            return CORRECT, 0.9
+        return AMBIGUOUS, max(score, similarity)
+    # A free answer can be right in words we didn't predict; let the LLM judge
+    return AMBIGUOUS, score
+
+
+def write_index(cards: Iterable[Dict[str, str]], output_file: str = DEFAULT_INDEX_FILE) -> Dict:
+    """Build the index for cards and write it atomically; returns its manifest entry"""
+    return write_cards(output_file, build_index(cards), root='cards')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute a grading index for scraped flashcards")
+    parser.add_argument("cards", help="flashcards file (.json or .ndjson, optionally compressed)")
+    parser.add_argument("-o", "--output", default=DEFAULT_INDEX_FILE)
+    args = parser.parse_args()
+
+    entry = write_index(read_cards(args.cards), args.output)
+    print(f"Indexed {entry['cards']} cards into {args.output}")
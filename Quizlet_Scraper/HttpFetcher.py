@@ -0,0 +1,314 @@
+"""
+Browserless fast path: read a set page over plain HTTP and parse the cards out of
+its embedded JSON state or server-rendered HTML. Falls back to the Chrome reader
+only when the page can't be parsed or a challenge page comes back.
+"""
+import re
+import sys
+import gzip
+import json
+import zlib
+import urllib.request
+import urllib.error
+from html.parser import HTMLParser
+from typing import List, Dict, Optional, Tuple
+
+from Extraction import make_flashcard, cards_from_texts
+
+USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+REQUEST_TIMEOUT = 15
+
+# Status codes and page markers that mean we were served a bot check instead of the set
+CHALLENGE_STATUSES = (403, 429, 503)
+CHALLENGE_MARKERS = (
+    "px-captcha",
+    "captcha-delivery",
+    "cf-challenge",
+    # Cloudflare's interstitial; its /cdn-cgi/challenge-platform/ scripts are also
+    # injected into ordinary pages, so the script path alone means nothing
+    "cf_chl_opt",
+    'id="challenge-form"',
+    "<title>Just a moment...</title>",
+    "Access to this page has been denied",
+    "Please verify you are a human",
+)
+
+# Elements that never get a closing tag, so they must not count towards nesting depth
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+
+NEXT_DATA_PATTERN = re.compile(
+    r'<script[^>]+id="__NEXT_DATA__"[^>]*>(.*?)</script>', re.DOTALL
+)
+
+
+class FetchError(RuntimeError):
+    """The page could not be fetched or parsed without a browser"""
+
+
+class ChallengeError(FetchError):
+    """The host answered with a captcha or rate-limit page"""
+
+
+class RateLimitedError(ChallengeError):
+    """The host answered 429: slow down rather than solve anything"""
+
+
+# What a loaded page in the browser looks like to the challenge check. The navigation
+# entry's responseStatus needs Chrome 109+; older browsers report 0.
+PAGE_CHALLENGE_SCRIPT = """
+const nav = performance.getEntriesByType('navigation')[0];
+return {
+    status: (nav && nav.responseStatus) || 0,
+    captcha: !!document.querySelector('#px-captcha-wrapper, #px-captcha, iframe[src*="captcha"]'),
+    title: document.title || ''
+};
+"""
+
+CHALLENGE_CAPTCHA = "captcha"
+CHALLENGE_RATE_LIMITED = "rate_limited"
+
+
+def fetch_html(url: str, timeout: float = REQUEST_TIMEOUT) -> Tuple[int, str]:
+    """GET a page and return its status code and decoded body"""
+    status, html, _ = fetch_page(url, timeout=timeout)
+    return status, html
+
+
+def fetch_page(url: str, timeout: float = REQUEST_TIMEOUT, headers: Dict[str, str] = None) -> Tuple[int, str, Dict]:
+    """GET a page with extra request headers (e.g. If-None-Match); returns the status,
+    decoded body and response headers. A 304 comes back as a status, not an error."""
+    request = urllib.request.Request(url, headers={
+        "User-Agent": USER_AGENT,
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+        "Accept-Language": "en-US,en;q=0.9",
+        "Accept-Encoding": "gzip, deflate",
+        **(headers or {}),
+    })
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            status = response.status
+            body = response.read()
+            response_headers = response.headers
+    except urllib.error.HTTPError as e:
+        status = e.code
+        body = e.read()
+        response_headers = e.headers
+    except (urllib.error.URLError, OSError) as e:
+        raise FetchError(f"Could not fetch {url}: {str(e)}")
+
+    encoding = response_headers.get("Content-Encoding", "")
+    charset = response_headers.get_content_charset() or "utf-8"
+    try:
+        if encoding == "gzip":
+            body = gzip.decompress(body)
+        elif encoding == "deflate":
+            body = zlib.decompress(body)
+    except (OSError, EOFError, zlib.error) as e:
+        raise FetchError(f"Could not decode {encoding} body of {url}: {str(e)}")
+
+    return status, body.decode(charset, errors="replace"), dict(response_headers.items())
+
+
+def is_challenge_page(status: int, html: str) -> bool:
+    """Whether the response is a bot check or rate limit rather than the set"""
+    if status in CHALLENGE_STATUSES:
+        return True
+    return any(marker in html for marker in CHALLENGE_MARKERS)
+
+
+def challenge_error(url: str, status: int) -> ChallengeError:
+    """The right ChallengeError for a challenge response"""
+    if status == 429:
+        return RateLimitedError(f"Rate limited on {url} (status 429)")
+    return ChallengeError(f"Challenge page returned for {url} (status {status})")
+
+
+def page_challenge(driver) -> Optional[str]:
+    """Whether the page loaded in driver is a captcha or rate-limit page, and which"""
+    return challenge_from_state(driver.execute_script(PAGE_CHALLENGE_SCRIPT))
+
+
+def challenge_from_state(state: Optional[Dict]) -> Optional[str]:
+    """Verdict on what PAGE_CHALLENGE_SCRIPT returned"""
+    state = state or {}
+    status = state.get('status') or 0
+    if status == 429:
+        return CHALLENGE_RATE_LIMITED
+    if state.get('captcha') or status in CHALLENGE_STATUSES or \
+            any(marker in state.get('title', '') for marker in CHALLENGE_MARKERS):
+        return CHALLENGE_CAPTCHA
+    return None
+
+
+def _side_text(side: Dict) -> str:
+    """Plain text of one side of a studiable item"""
+    texts = []
+    for media in side.get('media') or []:
+        if isinstance(media, dict) and media.get('plainText'):
+            texts.append(media['plainText'])
+    return "\n".join(texts)
+
+
+def _card_from_node(node: Dict) -> Optional[Dict[str, str]]:
+    """Recognize the term shapes Quizlet uses in its page state"""
+    # Current studiable item shape: cardSides labelled word/definition
+    sides = node.get('cardSides')
+    if isinstance(sides, list) and sides:
+        by_label = {side.get('label'): side for side in sides if isinstance(side, dict)}
+        word = by_label.get('word') or sides[0]
+        definition = by_label.get('definition') or (sides[1] if len(sides) > 1 else {})
+        return make_flashcard(_side_text(word), _side_text(definition))
+
+    # Older term shape: flat word/definition strings
+    if isinstance(node.get('word'), str) and isinstance(node.get('definition'), str):
+        return make_flashcard(node['word'], node['definition'])
+
+    return None
+
+
+def parse_embedded_state(html: str) -> List[Dict[str, str]]:
+    """Pull cards out of the __NEXT_DATA__ JSON the page ships with"""
+    match = NEXT_DATA_PATTERN.search(html)
+    if not match:
+        return []
+    try:
+        state = json.loads(match.group(1))
+    except ValueError:
+        return []
+
+    flashcards = []
+    seen_ids = set()
+    stack = [state]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, str):
+            # Redux state is shipped as a JSON string inside the JSON
+            if node.startswith('{"') and len(node) > 100:
+                try:
+                    stack.append(json.loads(node))
+                except ValueError:
+                    pass
+            continue
+        if isinstance(node, list):
+            stack.extend(reversed(node))
+            continue
+        if not isinstance(node, dict):
+            continue
+
+        flashcard = _card_from_node(node)
+        if flashcard is not None:
+            # The same term shows up in several slices of the state
+            card_id = node.get('id')
+            if card_id is not None and card_id in seen_ids:
+                continue
+            seen_ids.add(card_id)
+            flashcards.append(flashcard)
+            continue
+
+        stack.extend(reversed(list(node.values())))
+
+    return flashcards
+
+
+class _TermsListParser(HTMLParser):
+    """Collect TermText span text from the server-rendered terms list"""
+
+    def __init__(self):
+        super().__init__()
+        self.texts = []
+        self._section_depth = 0
+        self._span_depth = 0
+        self._depth = 0
+        self._current = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in VOID_TAGS:
+            self.handle_startendtag(tag, attrs)
+            return
+        self._depth += 1
+        attrs = dict(attrs)
+        if tag == 'section' and attrs.get('data-testid') == 'terms-list':
+            self._section_depth = self._depth
+        elif (self._section_depth and not self._span_depth and tag == 'span'
+              and 'TermText' in (attrs.get('class') or '').split()):
+            self._span_depth = self._depth
+            self._current = []
+
+    def handle_startendtag(self, tag, attrs):
+        if self._span_depth and tag == 'br':
+            self._current.append("\n")
+
+    def handle_endtag(self, tag):
+        if self._span_depth and self._depth == self._span_depth:
+            self.texts.append("".join(self._current))
+            self._span_depth = 0
+        if self._section_depth and self._depth == self._section_depth:
+            self._section_depth = 0
+        self._depth -= 1
+
+    def handle_data(self, data):
+        if self._span_depth:
+            self._current.append(data)
+
+
+def parse_terms_list(html: str) -> List[Dict[str, str]]:
+    """Pull cards out of the server-rendered terms-list section"""
+    parser = _TermsListParser()
+    parser.feed(html)
+    parser.close()
+    return cards_from_texts(parser.texts)
+
+
+def parse_flashcards(html: str) -> List[Dict[str, str]]:
+    """Parse cards from a set page, preferring the embedded state over the markup"""
+    return parse_embedded_state(html) or parse_terms_list(html)
+
+
+def fetch_flashcards(url: str, timeout: float = REQUEST_TIMEOUT) -> List[Dict[str, str]]:
+    """Fetch a set page over HTTP and return its flashcards"""
+    status, html = fetch_html(url, timeout=timeout)
+    return flashcards_from_response(url, status, html)
+
+
+def flashcards_from_response(url: str, status: int, html: str) -> List[Dict[str, str]]:
+    """The flashcards of a fetched set page; FetchError (or ChallengeError) if it has none"""
+    if is_challenge_page(status, html):
+        raise challenge_error(url, status)
+    if status != 200:
+        raise FetchError(f"Unexpected status {status} for {url}")
+
+    flashcards = parse_flashcards(html)
+    if not flashcards:
+        raise FetchError(f"No flashcards found in the HTML of {url}")
+    return flashcards
+
+
+def scrape_flashcards(url: str, reader_factory=None, **open_url_kwargs) -> List[Dict[str, str]]:
+    """Try the HTTP fast path first and only launch Chrome when it fails"""
+    try:
+        flashcards = fetch_flashcards(url)
+        print(f"Fetched {len(flashcards)} flashcards from {url} without a browser")
+        return flashcards
+    except FetchError as e:
+        print(f"HTTP fast path failed, falling back to Chrome: {str(e)}")
+
+    if reader_factory is None:
+        # Only pay for selenium when we actually need a browser
+        from ChromeViewerLinux import RenderStealthReader
+        reader_factory = RenderStealthReader
+
+    reader = reader_factory()
+    try:
+        reader.open_url(url, **open_url_kwargs)
+        return reader.extract_flashcards()
+    finally:
+        try:
+            reader.close()
+        except Exception:
+            pass
+
+
+if __name__ == "__main__":
+    url = sys.argv[1] if len(sys.argv) > 1 else "https://quizlet.com/434682915/mkt327-questions-flash-cards/"
+    flashcards = scrape_flashcards(url)
+    print(json.dumps({'terms': flashcards}, ensure_ascii=False, indent=2))
@@ -0,0 +1,181 @@
+"""
+Per-phase timing instrumentation for the scrapers.
+Records a timed span for each phase of a scrape (driver start, stealth, homepage,
+navigation, waits, scrolling, extraction, saving) per URL, counts WebDriver commands
+and bytes written, and exports them as JSON-lines logs, a Prometheus text file and
+an optional summary table.
+"""
+import os
+import json
+import time
+import tempfile
+import threading
+from collections import Counter, OrderedDict, defaultdict, deque
+from contextlib import contextmanager
+from typing import Dict
+
+METRIC_PREFIX = "quizlet_scraper"
+# Memory stays flat in long-running processes: only the latest spans are kept, and
+# per-URL totals only for the most recently active URLs (phase totals cover everything)
+MAX_RECENT_SPANS = 10000
+MAX_TRACKED_URLS = 1000
+
+
+class Metrics:
+    def __init__(self, log_path: str = None):
+        # JSON-lines file every span is appended to as it finishes (optional)
+        self.log_path = log_path
+        self.spans = deque(maxlen=MAX_RECENT_SPANS)
+        self._url_totals = OrderedDict()
+        self.phase_totals = defaultdict(lambda: {'count': 0, 'seconds': 0.0, 'max': 0.0, 'errors': 0})
+        self.commands = Counter()
+        self.bytes_written = 0
+        self.page_requests = 0
+        self.page_bytes = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, phase: str, url: str = None):
+        """Time a block of work as one phase of scraping url"""
+        started_at = time.time()
+        started = time.perf_counter()
+        error = None
+        try:
+            yield
+        except Exception as e:
+            error = type(e).__name__
+            raise
+        finally:
+            self.record(phase, time.perf_counter() - started, url=url, started_at=started_at, error=error)
+
+    def record(self, phase: str, seconds: float, url: str = None, started_at: float = None, error: str = None) -> None:
+        """Store a finished span"""
+        span = {
+            'phase': phase,
+            'url': url,
+            'started_at': started_at if started_at is not None else time.time() - seconds,
+            'seconds': round(seconds, 6),
+            'error': error,
+        }
+        with self._lock:
+            self.spans.append(span)
+            key = url or '-'
+            url_totals = self._url_totals.pop(key, None) or defaultdict(float)
+            url_totals[phase] += span['seconds']
+            self._url_totals[key] = url_totals
+            if len(self._url_totals) > MAX_TRACKED_URLS:
+                self._url_totals.popitem(last=False)
+            totals = self.phase_totals[phase]
+            totals['count'] += 1
+            totals['seconds'] += seconds
+            totals['max'] = max(totals['max'], seconds)
+            if error:
+                totals['errors'] += 1
+            self._log(dict(span, event='span'))
+
+    def count_command(self, command: str) -> None:
+        with self._lock:
+            self.commands[command] += 1
+
+    def add_bytes(self, count: int) -> None:
+        with self._lock:
+            self.bytes_written += count
+
+    def observe_page(self, url: str, stats: Dict) -> None:
+        """Record the requests and bytes a page load cost"""
+        with self._lock:
+            self.page_requests += stats.get('requests', 0)
+            self.page_bytes += stats.get('bytes', 0)
+            self._log({'event': 'page', 'url': url, 'requests': stats.get('requests', 0),
+                       'bytes': stats.get('bytes', 0), 'by_type': stats.get('by_type', {})})
+
+    def _log(self, record: Dict) -> None:
+        if not self.log_path:
+            return
+        try:
+            with open(self.log_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        except OSError as e:
+            print(f"Error writing metrics log: {str(e)}")
+
+    def instrument_driver(self, driver) -> None:
+        """Count every WebDriver command this driver sends"""
+        execute = driver.execute
+
+        def counted_execute(driver_command, params=None):
+            self.count_command(driver_command)
+            return execute(driver_command, params)
+
+        driver.execute = counted_execute
+
+    def url_totals(self) -> Dict[str, Dict[str, float]]:
+        """Seconds spent in each phase, per URL (the MAX_TRACKED_URLS most recent ones)"""
+        with self._lock:
+            return {url: dict(totals) for url, totals in self._url_totals.items()}
+
+    def to_prometheus(self) -> str:
+        """Render the metrics in Prometheus text exposition format"""
+        lines = [
+            f"# HELP {METRIC_PREFIX}_phase_seconds Time spent in each scrape phase",
+            f"# TYPE {METRIC_PREFIX}_phase_seconds summary",
+        ]
+        with self._lock:
+            for phase, totals in sorted(self.phase_totals.items()):
+                lines.append(f'{METRIC_PREFIX}_phase_seconds_sum{{phase="{phase}"}} {totals["seconds"]:.6f}')
+                lines.append(f'{METRIC_PREFIX}_phase_seconds_count{{phase="{phase}"}} {totals["count"]}')
+            lines.append(f"# HELP {METRIC_PREFIX}_phase_errors_total Phases that raised")
+            lines.append(f"# TYPE {METRIC_PREFIX}_phase_errors_total counter")
+            for phase, totals in sorted(self.phase_totals.items()):
+                lines.append(f'{METRIC_PREFIX}_phase_errors_total{{phase="{phase}"}} {totals["errors"]}')
+
+            lines.append(f"# HELP {METRIC_PREFIX}_webdriver_commands_total WebDriver commands sent")
+            lines.append(f"# TYPE {METRIC_PREFIX}_webdriver_commands_total counter")
+            for command, count in sorted(self.commands.items()):
+                lines.append(f'{METRIC_PREFIX}_webdriver_commands_total{{command="{command}"}} {count}')
+
+            lines.append(f"# HELP {METRIC_PREFIX}_bytes_written_total Bytes of output written")
+            lines.append(f"# TYPE {METRIC_PREFIX}_bytes_written_total counter")
+            lines.append(f"{METRIC_PREFIX}_bytes_written_total {self.bytes_written}")
+
+            lines.append(f"# HELP {METRIC_PREFIX}_page_requests_total Network requests made by loaded pages")
+            lines.append(f"# TYPE {METRIC_PREFIX}_page_requests_total counter")
+            lines.append(f"{METRIC_PREFIX}_page_requests_total {self.page_requests}")
+            lines.append(f"# HELP {METRIC_PREFIX}_page_transfer_bytes_total Bytes transferred by loaded pages")
+            lines.append(f"# TYPE {METRIC_PREFIX}_page_transfer_bytes_total counter")
+            lines.append(f"{METRIC_PREFIX}_page_transfer_bytes_total {self.page_bytes}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str) -> None:
+        """Write the Prometheus text file atomically (for node_exporter's textfile collector)"""
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp_path, path)
+
+    def print_summary(self) -> None:
+        """Print a per-phase and per-URL summary table for the run"""
+        with self._lock:
+            phases = sorted(self.phase_totals.items(), key=lambda item: -item[1]['seconds'])
+            command_count = sum(self.commands.values())
+            bytes_written = self.bytes_written
+            page_requests = self.page_requests
+            page_bytes = self.page_bytes
+
+        print(f"{'phase':<16}{'count':>8}{'total s':>12}{'mean s':>10}{'max s':>10}")
+        for phase, totals in phases:
+            mean = totals['seconds'] / totals['count'] if totals['count'] else 0.0
+            print(f"{phase:<16}{totals['count']:>8}{totals['seconds']:>12.3f}{mean:>10.3f}{totals['max']:>10.3f}")
+
+        print()
+        print(f"{'url':<60}{'total s':>10}")
+        for url, totals in self.url_totals().items():
+            print(f"{url[:59]:<60}{sum(totals.values()):>10.3f}")
+
+        print()
+        print(f"WebDriver commands: {command_count}  Bytes written: {bytes_written}  "
+              f"Page requests: {page_requests}  Page bytes: {page_bytes}")
+
+
+# Shared by every reader unless one is given its own
+METRICS = Metrics()
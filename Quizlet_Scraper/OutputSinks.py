@@ -0,0 +1,361 @@
+"""
+Atomic, streaming output for scraped flashcards.
+Cards are written one at a time to a temp file next to the target, which is fsync'd
+and renamed into place only once everything made it to disk, so whoever reads the
+output (the Alexa skill reads flashcards.json) sees either the old file or the new
+one, never half of one. Memory stays constant however big the set is.
+
+The format follows the file name:
+    flashcards.json        {"terms": [...]} like before
+    flashcards.ndjson      one card per line (.jsonl works too)
+    ... .gz / .zst         gzip, or zstd if the zstandard package is installed
+
+Every write also records the file's card count, size and sha256 in a manifest.json
+in the same directory.
+"""
+import io
+import os
+import re
+import json
+import gzip
+import time
+import hashlib
+import tempfile
+import threading
+from urllib.parse import urlparse
+from typing import Dict, Iterable, Iterator, Optional
+
+from ScrapeCache import normalize_set_url
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+FORMAT_JSON = "json"
+FORMAT_NDJSON = "ndjson"
+FORMAT_EXTENSIONS = {'.json': FORMAT_JSON, '.ndjson': FORMAT_NDJSON, '.jsonl': FORMAT_NDJSON}
+COMPRESSION_EXTENSIONS = {'.gz': 'gzip', '.zst': 'zstd'}
+MANIFEST_NAME = "manifest.json"
+JSON_ROOT = "terms"
+# Sets ShardedOutput writes between manifest rewrites
+MANIFEST_BATCH = 100
+UNSAFE_NAME_CHARS = re.compile(r'[^A-Za-z0-9._-]+')
+
+_manifest_lock = threading.Lock()
+
+
+class OutputError(RuntimeError):
+    """The output could not be written; the previous file is left untouched"""
+
+
+def output_format(path: str):
+    """(format, compression) for a file name, e.g. 'sets.ndjson.gz' -> ('ndjson', 'gzip')"""
+    root, ext = os.path.splitext(path.lower())
+    compression = COMPRESSION_EXTENSIONS.get(ext)
+    if compression:
+        root, ext = os.path.splitext(root)
+    if ext not in FORMAT_EXTENSIONS:
+        raise OutputError(f"Don't know how to write {path}: use .json, .ndjson or .jsonl, optionally .gz/.zst")
+    if compression == 'zstd' and zstandard is None:
+        raise OutputError(f"Writing {path} needs the zstandard package")
+    return FORMAT_EXTENSIONS[ext], compression
+
+
+class _HashingFile:
+    """Raw file wrapper that hashes and counts the bytes that actually hit the disk"""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data) -> int:
+        self.sha256.update(data)
+        self.size += len(data)
+        return self.raw.write(data)
+
+    def flush(self) -> None:
+        self.raw.flush()
+
+
+def _fsync_dir(directory: str) -> None:
+    """Make the rename itself durable"""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _current_umask() -> int:
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+# mkstemp creates files 0600; outputs get the mode open() would give them (0644 under
+# umask 022) so readers running as other users (the skill, a web server) can open them
+_FILE_MODE = 0o666 & ~_current_umask()
+
+
+def _make_readable(fd: int) -> None:
+    if hasattr(os, 'fchmod'):
+        os.fchmod(fd, _FILE_MODE)
+
+
+def atomic_write_bytes(path: str, data: bytes) -> None:
+    """Replace path with data in one step"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=os.path.basename(path))
+    try:
+        _make_readable(fd)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    _fsync_dir(directory)
+
+
+class CardWriter:
+    """Stream cards into path; the file appears atomically when the block exits cleanly
+
+        with CardWriter("flashcards.json", url=url) as writer:
+            for card in reader.harvest_flashcards():
+                writer.write(card)
+    """
+
+    def __init__(self, path: str, url: str = None, manifest: bool = True, root: str = JSON_ROOT):
+        self.path = path
+        self.url = url
+        self.manifest = manifest
+        # Key of the list in .json output; NDJSON has no wrapper
+        self.root = root
+        self.format, self.compression = output_format(path)
+        self.count = 0
+        self.entry = None
+        self._raw = None
+        self._hashing = None
+        self._stream = None
+        self._tmp_path = None
+
+    def __enter__(self) -> 'CardWriter':
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, self._tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=os.path.basename(self.path))
+        _make_readable(fd)
+        self._raw = os.fdopen(fd, 'wb')
+        self._hashing = _HashingFile(self._raw)
+        if self.compression == 'gzip':
+            # mtime=0 keeps the bytes (and so the hash) identical for identical cards
+            self._stream = gzip.GzipFile(fileobj=self._hashing, mode='wb', mtime=0)
+        elif self.compression == 'zstd':
+            self._stream = zstandard.ZstdCompressor().stream_writer(self._hashing, closefd=False)
+        else:
+            self._stream = self._hashing
+
+        if self.format == FORMAT_JSON:
+            self._emit('{' + json.dumps(self.root) + ': [')
+        return self
+
+    def _emit(self, text: str) -> None:
+        self._stream.write(text.encode('utf-8'))
+
+    def write(self, card: Dict[str, str]) -> None:
+        line = json.dumps(card, ensure_ascii=False)
+        if self.format == FORMAT_JSON:
+            self._emit(("," if self.count else "") + "\n  " + line)
+        else:
+            self._emit(line + "\n")
+        self.count += 1
+
+    def write_all(self, cards: Iterable[Dict[str, str]]) -> None:
+        for card in cards:
+            self.write(card)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            self._discard()
+            return False
+        try:
+            self._finish()
+        except BaseException:
+            self._discard()
+            raise
+        return False
+
+    def _finish(self) -> None:
+        if self.format == FORMAT_JSON:
+            self._emit("\n]}\n")
+        if self._stream is not self._hashing:
+            self._stream.close()
+        self._raw.flush()
+        os.fsync(self._raw.fileno())
+        self._raw.close()
+        os.replace(self._tmp_path, self.path)
+        _fsync_dir(os.path.dirname(os.path.abspath(self.path)))
+
+        self.entry = {
+            'url': self.url,
+            'format': self.format,
+            'compression': self.compression,
+            'cards': self.count,
+            'bytes': self._hashing.size,
+            'sha256': self._hashing.sha256.hexdigest(),
+            'written_at': time.time(),
+        }
+        if self.manifest:
+            update_manifest(self.path, self.entry)
+
+    def _discard(self) -> None:
+        try:
+            self._raw.close()
+        except Exception:
+            pass
+        try:
+            os.remove(self._tmp_path)
+        except OSError:
+            pass
+
+
+def write_cards(path: str, cards: Iterable[Dict[str, str]], url: str = None, manifest: bool = True,
+                root: str = JSON_ROOT) -> Dict:
+    """Write cards (a list or any iterator) atomically and return its manifest entry"""
+    try:
+        with CardWriter(path, url=url, manifest=manifest, root=root) as writer:
+            writer.write_all(cards)
+    except OutputError:
+        raise
+    except (OSError, TypeError, ValueError) as e:
+        raise OutputError(f"Could not write {path}: {str(e)}") from e
+    return writer.entry
+
+
+def _open_text(path: str, compression: Optional[str]):
+    if compression == 'gzip':
+        return gzip.open(path, 'rt', encoding='utf-8')
+    if compression == 'zstd':
+        return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True),
+                                encoding='utf-8')
+    return open(path, 'r', encoding='utf-8')
+
+
+def read_cards(path: str) -> Iterator[Dict]:
+    """Cards back out of any file this module writes. NDJSON streams; .json is loaded
+    whole and may use any top-level list key (older files use 'flashcards')."""
+    fmt, compression = output_format(path)
+    with _open_text(path, compression) as f:
+        if fmt == FORMAT_NDJSON:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+            return
+        document = json.load(f)
+    if isinstance(document, list):
+        yield from document
+        return
+    for value in document.values():
+        if isinstance(value, list):
+            yield from value
+            return
+
+
+def read_manifest(directory: str) -> Dict:
+    try:
+        with open(os.path.join(directory, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {'files': {}}
+
+
+def update_manifest(path: str, entry: Dict) -> None:
+    """Record one file in its directory's manifest"""
+    update_manifest_entries(os.path.dirname(os.path.abspath(path)), {os.path.basename(path): entry})
+
+
+def update_manifest_entries(directory: str, entries: Dict[str, Dict]) -> None:
+    """Record several files of one directory in its manifest with a single rewrite"""
+    with _manifest_lock:
+        manifest = read_manifest(directory)
+        manifest['files'].update(entries)
+        manifest['updated_at'] = time.time()
+        atomic_write_bytes(os.path.join(directory, MANIFEST_NAME),
+                           json.dumps(manifest, ensure_ascii=False, indent=2).encode('utf-8'))
+
+
+def verify(path: str) -> bool:
+    """Whether path still matches the hash its manifest recorded"""
+    entry = read_manifest(os.path.dirname(os.path.abspath(path)))['files'].get(os.path.basename(path))
+    if entry is None:
+        return False
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            sha256.update(block)
+    return sha256.hexdigest() == entry['sha256']
+
+
+def set_file_name(url: str) -> str:
+    """Stable file name for a set, e.g. quizlet.com/434682915/mkt327-... -> 434682915"""
+    parsed = urlparse(normalize_set_url(url))
+    return UNSAFE_NAME_CHARS.sub('_', parsed.path.strip('/') or parsed.hostname or 'set')
+
+
+class ShardedOutput:
+    """One file per set in a directory, all listed in that directory's manifest.
+
+    The manifest is rewritten once per manifest_batch sets rather than per set, which
+    would make a big crawl's manifest I/O quadratic; close() (or leaving the with
+    block) records the rest. Sets written since the last flush are on disk but not in
+    the manifest if the process dies."""
+
+    def __init__(self, directory: str, extension: str = ".ndjson.gz", manifest_batch: int = MANIFEST_BATCH):
+        self.directory = directory
+        self.extension = extension
+        self.manifest_batch = manifest_batch
+        self._pending = {}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        # Fail now rather than after the first scrape
+        output_format("set" + extension)
+
+    def path_for(self, url: str) -> str:
+        return os.path.join(self.directory, set_file_name(url) + self.extension)
+
+    def write_set(self, url: str, cards: Iterable[Dict[str, str]]) -> Dict:
+        path = self.path_for(url)
+        entry = write_cards(path, cards, url=url, manifest=False)
+        with self._lock:
+            self._pending[os.path.basename(path)] = entry
+            full = len(self._pending) >= self.manifest_batch
+        if full:
+            self.flush()
+        return entry
+
+    def flush(self) -> None:
+        """Record every set written so far in the manifest"""
+        with self._lock:
+            entries, self._pending = self._pending, {}
+        if entries:
+            update_manifest_entries(os.path.abspath(self.directory), entries)
+
+    def close(self) -> None:
+        self.flush()
+
+    def __enter__(self) -> 'ShardedOutput':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
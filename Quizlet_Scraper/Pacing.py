@@ -0,0 +1,219 @@
+"""
+Pacing engine for the Chrome readers.
+Every pause a reader takes goes through one Pacer, so the time spent per page can be
+measured and capped. Waits poll DOM/network conditions instead of sleeping blindly,
+and the gap between visits to a host comes from a shared per-host budget.
+"""
+import time
+import random
+import threading
+from urllib.parse import urlparse
+from typing import Callable, Dict, Tuple
+
+# Number of resource entries the page has loaded so far; stable count == network idle
+RESOURCE_COUNT_SCRIPT = "return performance.getEntriesByType('resource').length"
+READY_STATE_SCRIPT = "return document.readyState"
+
+
+class PacingProfile:
+    def __init__(self, name: str,
+                 host_interval: Tuple[float, float],
+                 homepage_dwell: Tuple[float, float],
+                 post_load: Tuple[float, float],
+                 scroll_pause: Tuple[float, float],
+                 scroll_back_pause: Tuple[float, float],
+                 scroll_back_chance: float,
+                 pre_extract: Tuple[float, float],
+                 page_budget: float,
+                 poll_interval: float = 0.1,
+                 idle_window: float = 0.5):
+        self.name = name
+        # Minimum gap between two navigations to the same host
+        self.host_interval = host_interval
+        self.homepage_dwell = homepage_dwell
+        self.post_load = post_load
+        self.scroll_pause = scroll_pause
+        self.scroll_back_pause = scroll_back_pause
+        self.scroll_back_chance = scroll_back_chance
+        self.pre_extract = pre_extract
+        # Cap on discretionary delays per page, in seconds
+        self.page_budget = page_budget
+        self.poll_interval = poll_interval
+        # How long the resource count must stay flat to call the network idle
+        self.idle_window = idle_window
+
+
+PROFILES: Dict[str, PacingProfile] = {
+    'fast': PacingProfile(
+        'fast',
+        host_interval=(0.5, 1.0),
+        homepage_dwell=(0, 0),
+        post_load=(0, 0),
+        scroll_pause=(0.05, 0.15),
+        scroll_back_pause=(0, 0),
+        scroll_back_chance=0.0,
+        pre_extract=(0, 0),
+        page_budget=2.0,
+        poll_interval=0.05,
+        idle_window=0.3,
+    ),
+    'balanced': PacingProfile(
+        'balanced',
+        host_interval=(1.0, 3.0),
+        homepage_dwell=(0.5, 1.5),
+        post_load=(0.2, 0.8),
+        scroll_pause=(0.2, 0.8),
+        scroll_back_pause=(0.2, 0.4),
+        scroll_back_chance=0.1,
+        pre_extract=(0, 0.3),
+        page_budget=6.0,
+    ),
+    # Matches the original fixed random sleeps
+    'stealthy': PacingProfile(
+        'stealthy',
+        host_interval=(1.0, 3.0),
+        homepage_dwell=(2.0, 4.0),
+        post_load=(1.0, 3.0),
+        scroll_pause=(0.5, 2.0),
+        scroll_back_pause=(0.3, 0.7),
+        scroll_back_chance=0.2,
+        pre_extract=(0.5, 2.0),
+        page_budget=25.0,
+        idle_window=1.0,
+    ),
+}
+# Readers keep their original timings unless a caller opts into a faster profile
+DEFAULT_PROFILE = 'stealthy'
+
+
+class HostClock:
+    """Hands out the next allowed visit time per host, shared by every reader"""
+
+    def __init__(self):
+        self._next_visit = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, host: str, interval: float) -> float:
+        """Book the next slot for a host and return how long to wait for it"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_visit.get(host, now))
+            self._next_visit[host] = slot + interval
+            return slot - now
+
+
+HOST_CLOCK = HostClock()
+
+
+class Pacer:
+    def __init__(self, profile=DEFAULT_PROFILE, host_clock: HostClock = HOST_CLOCK):
+        if isinstance(profile, str):
+            if profile not in PROFILES:
+                raise ValueError(f"Unknown pacing profile: {profile}")
+            profile = PROFILES[profile]
+        self.profile = profile
+        self.host_clock = host_clock
+        self.begin_page()
+
+    def begin_page(self, url: str = None) -> None:
+        """Reset the per-page clocks before a new navigation"""
+        self.url = url
+        self.page_started = time.monotonic()
+        self.page_slept = 0.0
+        self.page_delay = 0.0
+
+    def page_elapsed(self) -> float:
+        """Wall time since begin_page"""
+        return time.monotonic() - self.page_started
+
+    def remaining_budget(self) -> float:
+        """Discretionary delay left for this page"""
+        return max(0.0, self.profile.page_budget - self.page_delay)
+
+    def sleep(self, seconds: float) -> None:
+        """The one place readers are allowed to sleep"""
+        if seconds <= 0:
+            return
+        time.sleep(seconds)
+        self.page_slept += seconds
+
+    def draw(self, kind: str) -> float:
+        """Pick a human-like pause from the profile, clipped to the page budget, and
+        charge it to the page without sleeping (for callers that sleep themselves)"""
+        low, high = getattr(self.profile, kind)
+        seconds = min(random.uniform(low, high), self.remaining_budget())
+        self.page_delay += max(seconds, 0.0)
+        return seconds
+
+    def delay(self, kind: str) -> float:
+        """Take a human-like pause from the profile, clipped to the page budget"""
+        seconds = self.draw(kind)
+        self.sleep(seconds)
+        return seconds
+
+    def chance(self, kind: str) -> bool:
+        """Roll against a probability from the profile"""
+        return random.random() < getattr(self.profile, kind)
+
+    def reserve_host(self, url: str) -> float:
+        """Book the next visit to url's host and return how long until it is due"""
+        host = urlparse(url).hostname or ''
+        low, high = self.profile.host_interval
+        return self.host_clock.reserve(host, random.uniform(low, high))
+
+    def wait_for_host(self, url: str) -> float:
+        """Wait only as long as the host's visit budget requires"""
+        wait = self.reserve_host(url)
+        self.sleep(wait)
+        return wait
+
+    def wait_until(self, condition: Callable[[], bool], timeout: float = 10, message: str = "") -> None:
+        """Poll a condition until it is truthy, raising TimeoutError after timeout"""
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                if condition():
+                    return
+            except Exception:
+                # Page may be mid-navigation; treat as not ready yet
+                pass
+            if time.monotonic() >= deadline:
+                raise TimeoutError(message or f"Condition not met within {timeout}s")
+            self.sleep(self.profile.poll_interval)
+
+    def wait_for_network_idle(self, driver, timeout: float = 10) -> bool:
+        """Wait until the page stops loading new resources; False on timeout"""
+        deadline = time.monotonic() + timeout
+        last_count = -1
+        stable_since = time.monotonic()
+        while time.monotonic() < deadline:
+            try:
+                count = driver.execute_script(RESOURCE_COUNT_SCRIPT)
+            except Exception:
+                count = -1
+            now = time.monotonic()
+            if count != last_count:
+                last_count = count
+                stable_since = now
+            elif now - stable_since >= self.profile.idle_window:
+                return True
+            self.sleep(self.profile.poll_interval)
+        return False
+
+    def wait_for_ready_state(self, driver, timeout: float = 10) -> None:
+        """Wait for document.readyState to reach complete"""
+        self.wait_until(
+            lambda: driver.execute_script(READY_STATE_SCRIPT) == "complete",
+            timeout=timeout,
+            message="Page did not finish loading",
+        )
+
+    def summary(self) -> Dict[str, float]:
+        """Timing for the current page"""
+        return {
+            'url': self.url,
+            'profile': self.profile.name,
+            'elapsed': round(self.page_elapsed(), 3),
+            'slept': round(self.page_slept, 3),
+            'delay': round(self.page_delay, 3),
+        }
@@ -0,0 +1,209 @@
+"""
+Per-host crawl scheduler.
+Sits in front of any scrape(url) callable and decides when each job may start: a
+token bucket per host sets the request rate, a cap limits concurrent pages per host,
+failures back off exponentially with jitter, and repeated challenges trip a circuit
+breaker that pauses the host. The rate adapts: it creeps up while pages come back
+clean and halves on every challenge or 429, settling just under what the host
+tolerates.
+
+    scheduler = CrawlScheduler()
+    crawl = BatchCrawl(journal, scheduler.wrap(pool.scrape), workers=4)
+"""
+import time
+import random
+import threading
+from urllib.parse import urlparse
+from typing import Callable, Dict, Optional
+
+from BatchCrawl import (
+    classify_error, ERROR_CAPTCHA, ERROR_RATE_LIMITED, ERROR_TIMEOUT, ERROR_DRIVER_CRASH, ERROR_NETWORK
+)
+
+OK = "ok"
+# Outcomes that mean the host is pushing back: cut the rate and back off
+PUSHBACK_ERRORS = {ERROR_CAPTCHA, ERROR_RATE_LIMITED}
+# Outcomes that are probably transient on our side or the network: back off only
+TRANSIENT_ERRORS = {ERROR_TIMEOUT, ERROR_DRIVER_CRASH, ERROR_NETWORK}
+
+
+class CircuitOpenError(RuntimeError):
+    """The host is paused after repeated challenges and the caller won't wait"""
+
+
+class HostLimits:
+    def __init__(self, rate: float = 0.5, min_rate: float = 0.05, max_rate: float = 2.0,
+                 rate_step: float = 0.05, burst: float = 2, concurrency: int = 2,
+                 base_backoff: float = 5.0, max_backoff: float = 300.0,
+                 breaker_threshold: int = 3, breaker_cooldown: float = 600.0,
+                 max_breaker_cooldown: float = 3600.0):
+        # Pages per second to start at, and the range the adaptive rate stays in
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        # Added to the rate after every clean page
+        self.rate_step = rate_step
+        self.burst = burst
+        self.concurrency = concurrency
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        # Consecutive challenges that pause the host, and for how long
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self.max_breaker_cooldown = max_breaker_cooldown
+
+
+class TokenBucket:
+    """Rate limiter that queues callers instead of rejecting them"""
+
+    def __init__(self, burst: float):
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def reserve(self, rate: float, now: float) -> float:
+        """Take a token and return how long to wait before it is really ours"""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / rate
+
+
+def backoff_delay(failures: int, base: float, cap: float) -> float:
+    """Exponential backoff with equal jitter: half fixed, half random"""
+    delay = min(cap, base * 2 ** (failures - 1))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+class HostState:
+    def __init__(self, host: str, limits: HostLimits):
+        self.host = host
+        self.limits = limits
+        self.rate = limits.rate
+        self.bucket = TokenBucket(limits.burst)
+        self.active = 0
+        self.failures = 0
+        self.challenges = 0
+        self.backoff_until = 0.0
+        self.breaker_until = 0.0
+        self.breaker_cooldown = limits.breaker_cooldown
+        # After the breaker closes, one probe page at a time until something succeeds
+        self.probing = False
+        self.pages = 0
+        self.trips = 0
+
+    def paused_for(self, now: float) -> float:
+        return max(self.backoff_until, self.breaker_until) - now
+
+    def concurrency(self) -> int:
+        return 1 if self.probing else self.limits.concurrency
+
+    def to_dict(self, now: float) -> Dict:
+        return {
+            'rate': round(self.rate, 3),
+            'active': self.active,
+            'pages': self.pages,
+            'consecutive_failures': self.failures,
+            'paused_for': round(max(0.0, self.paused_for(now)), 1),
+            'breaker_trips': self.trips,
+            'probing': self.probing,
+        }
+
+
+class CrawlScheduler:
+    def __init__(self, limits: HostLimits = None, max_wait: Optional[float] = None):
+        self.limits = limits or HostLimits()
+        # How long acquire() may sit out an open circuit; None waits as long as it takes
+        self.max_wait = max_wait
+        self.hosts: Dict[str, HostState] = {}
+        self._cond = threading.Condition()
+
+    def _host(self, url: str) -> HostState:
+        host = urlparse(url).hostname or ''
+        if host not in self.hosts:
+            self.hosts[host] = HostState(host, self.limits)
+        return self.hosts[host]
+
+    def acquire(self, url: str) -> None:
+        """Block until a job for url may start"""
+        with self._cond:
+            state = self._host(url)
+            while True:
+                now = time.monotonic()
+                paused = state.paused_for(now)
+                if paused <= 0 and state.active < state.concurrency():
+                    break
+                if self.max_wait is not None and state.breaker_until - now > self.max_wait:
+                    raise CircuitOpenError(f"Circuit open for {state.host} for another {paused:.0f}s")
+                self._cond.wait(timeout=paused if paused > 0 else None)
+            state.active += 1
+            delay = state.bucket.reserve(state.rate, now)
+        if delay > 0:
+            time.sleep(delay)
+
+    def release(self, url: str, outcome: str) -> None:
+        """Finish a job and adapt the host's pace to how it went"""
+        with self._cond:
+            state = self._host(url)
+            state.active -= 1
+            state.pages += 1
+            self._record(state, outcome, time.monotonic())
+            self._cond.notify_all()
+
+    def _record(self, state: HostState, outcome: str, now: float) -> None:
+        limits = state.limits
+        if outcome in PUSHBACK_ERRORS:
+            state.rate = max(limits.min_rate, state.rate / 2)
+            state.failures += 1
+            state.challenges += 1
+            state.backoff_until = now + backoff_delay(state.failures, limits.base_backoff, limits.max_backoff)
+            if state.probing or state.challenges >= limits.breaker_threshold:
+                self._trip(state, now)
+        elif outcome in TRANSIENT_ERRORS:
+            state.failures += 1
+            state.backoff_until = now + backoff_delay(state.failures, limits.base_backoff, limits.max_backoff)
+        else:
+            # Clean pages, and errors that say nothing about our pace (404, empty set)
+            state.failures = 0
+            state.challenges = 0
+            state.backoff_until = 0.0
+            if state.probing:
+                state.probing = False
+                state.breaker_cooldown = limits.breaker_cooldown
+            if outcome == OK:
+                state.rate = min(limits.max_rate, state.rate + limits.rate_step)
+
+    def _trip(self, state: HostState, now: float) -> None:
+        # A failed probe means the host still isn't ready: wait twice as long next time
+        if state.probing:
+            state.breaker_cooldown = min(state.limits.max_breaker_cooldown, state.breaker_cooldown * 2)
+        state.breaker_until = now + state.breaker_cooldown
+        state.challenges = 0
+        state.probing = True
+        state.trips += 1
+        print(f"Circuit open for {state.host}: pausing {state.breaker_cooldown:.0f}s after repeated challenges")
+
+    def wrap(self, scrape: Callable[[str], Dict]) -> Callable[[str], Dict]:
+        """A scrape(url) that runs under the scheduler and reports its own outcome"""
+        def scheduled(url: str) -> Dict:
+            try:
+                self.acquire(url)
+            except CircuitOpenError as e:
+                return {'url': url, 'flashcards': [], 'error': str(e), 'error_type': type(e).__name__}
+
+            outcome = ERROR_DRIVER_CRASH
+            try:
+                result = scrape(url)
+                outcome = classify_error(result.get('error_type'), result['error']) if result.get('error') else OK
+                return result
+            except Exception as e:
+                outcome = classify_error(type(e).__name__, str(e))
+                raise
+            finally:
+                self.release(url, outcome)
+        return scheduled
+
+    def status(self) -> Dict[str, Dict]:
+        with self._cond:
+            now = time.monotonic()
+            return {host: state.to_dict(now) for host, state in self.hosts.items()}
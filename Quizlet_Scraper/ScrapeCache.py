@@ -0,0 +1,252 @@
+"""
+Persistent on-disk cache of scraped sets, keyed by normalized set URL.
+Each entry stores the cards, a content hash, the fetch time and the extraction
+strategy. Entries expire after a TTL, the cache is kept under a size bound with
+LRU eviction, and stale entries can be revalidated cheaply before re-scraping.
+"""
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from urllib.parse import urlparse
+from typing import List, Dict, Optional, Callable, Union
+
+DEFAULT_CACHE_DIR = ".scrape_cache"
+DEFAULT_TTL = 24 * 60 * 60
+DEFAULT_MAX_ENTRIES = 5000
+DEFAULT_MAX_BYTES = 500 * 1024 * 1024
+
+# Quizlet set pages look like /434682915/some-slug/ (optionally behind a locale prefix)
+SET_ID_PATTERN = re.compile(r'/(\d{4,})(?:/|$)')
+
+
+def normalize_set_url(url: str) -> str:
+    """Reduce the different spellings of a set URL to one canonical form"""
+    parsed = urlparse(url.strip())
+    host = (parsed.hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+
+    match = SET_ID_PATTERN.search(parsed.path)
+    if host.endswith('quizlet.com') and match:
+        path = f"/{match.group(1)}/"
+    else:
+        path = parsed.path.rstrip('/') + '/'
+
+    return f"https://{host}{path}"
+
+
+def content_hash(flashcards: List[Dict[str, str]]) -> str:
+    """Stable hash of a card list, used to tell whether a set changed"""
+    digest = hashlib.sha256()
+    for card in flashcards:
+        digest.update(card.get('term', '').encode('utf-8'))
+        digest.update(b'\x1f')
+        digest.update(card.get('definition', '').encode('utf-8'))
+        digest.update(b'\x1e')
+    return digest.hexdigest()
+
+
+def card_fingerprint(flashcards: List[Dict[str, str]]) -> str:
+    """Hash of a card list that ignores whitespace, so the same set read by the browser
+    and by the HTTP parser (which lay out line breaks and spacing differently) matches"""
+    return content_hash([{'term': ' '.join(card.get('term', '').split()),
+                          'definition': ' '.join(card.get('definition', '').split())}
+                         for card in flashcards])
+
+
+class ScrapeCache:
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, ttl: float = DEFAULT_TTL,
+                 max_entries: int = DEFAULT_MAX_ENTRIES, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key_for(self, url: str) -> str:
+        """Content address of a set URL"""
+        return hashlib.sha256(normalize_set_url(url).encode('utf-8')).hexdigest()
+
+    def _path(self, url: str) -> str:
+        return os.path.join(self.cache_dir, f"{self.key_for(url)}.json")
+
+    def is_fresh(self, entry: Dict) -> bool:
+        """Whether an entry is still inside its TTL"""
+        return time.time() - entry['fetched_at'] < self.ttl
+
+    def get(self, url: str, allow_stale: bool = False) -> Optional[Dict]:
+        """Return the cached entry for a set, or None if missing (or stale)"""
+        path = self._path(url)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"Dropping unreadable cache entry {path}: {str(e)}")
+            self._remove(path)
+            return None
+
+        if not allow_stale and not self.is_fresh(entry):
+            return None
+
+        # Bump the mtime so eviction sees this entry as recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry
+
+    def put(self, url: str, flashcards: List[Dict[str, str]], strategy: str) -> Dict:
+        """Store a freshly scraped set"""
+        entry = {
+            'url': normalize_set_url(url),
+            'fetched_at': time.time(),
+            'content_hash': content_hash(flashcards),
+            'card_fingerprint': card_fingerprint(flashcards),
+            'card_count': len(flashcards),
+            'strategy': strategy,
+            'flashcards': flashcards,
+        }
+        self._write(self._path(url), entry)
+        self.evict()
+        return entry
+
+    def touch(self, url: str, entry: Dict) -> Dict:
+        """Mark a revalidated entry as fresh again without re-extracting"""
+        entry['fetched_at'] = time.time()
+        self._write(self._path(url), entry)
+        return entry
+
+    def _write(self, path: str, entry: Dict) -> None:
+        # Write to a temp file and rename so readers never see half an entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except Exception:
+            self._remove(tmp_path)
+            raise
+
+    def _remove(self, path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def evict(self) -> int:
+        """Remove least recently used entries until the cache is within bounds"""
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.cache_dir):
+                if not name.endswith('.json'):
+                    continue
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+            entries.sort()
+            total_bytes = sum(size for _, size, _ in entries)
+            removed = 0
+            while entries and (len(entries) > self.max_entries or total_bytes > self.max_bytes):
+                _, size, path = entries.pop(0)
+                self._remove(path)
+                total_bytes -= size
+                removed += 1
+            return removed
+
+    def clear(self) -> None:
+        """Drop every cached entry"""
+        for name in os.listdir(self.cache_dir):
+            self._remove(os.path.join(self.cache_dir, name))
+
+
+def entry_matches(entry: Dict, fingerprint: Union[int, str, Dict]) -> bool:
+    """Compare a cached entry against what a probe saw on the live page: a card count,
+    a content hash, or http_fingerprint's {'card_count', 'card_fingerprint'}"""
+    if isinstance(fingerprint, dict):
+        if fingerprint.get('not_modified'):
+            return True
+        if fingerprint['card_count'] != entry['card_count']:
+            return False
+        # Entries from before card_fingerprint existed can only be checked by count
+        return entry.get('card_fingerprint') in (None, fingerprint['card_fingerprint'])
+    if isinstance(fingerprint, int):
+        return fingerprint == entry['card_count']
+    return fingerprint == entry['content_hash']
+
+
+def http_fingerprint(url: str, entry: Dict = None) -> Dict:
+    """Revalidation probe without a browser. Once an entry has the page's ETag or
+    Last-Modified the request is conditional, and a 304 settles it without a body;
+    otherwise the page is fetched and parsed, and its cards compared by count and
+    card_fingerprint (not content_hash: the two extractors' text differs in spacing)."""
+    from HttpFetcher import fetch_page, flashcards_from_response
+    headers = {}
+    if entry is not None and entry.get('etag'):
+        headers['If-None-Match'] = entry['etag']
+    if entry is not None and entry.get('last_modified'):
+        headers['If-Modified-Since'] = entry['last_modified']
+    status, html, response_headers = fetch_page(url, headers=headers)
+    validators = {'etag': response_headers.get('ETag') or (entry or {}).get('etag'),
+                  'last_modified': response_headers.get('Last-Modified') or (entry or {}).get('last_modified')}
+    if status == 304 and headers:
+        return dict(validators, not_modified=True)
+    flashcards = flashcards_from_response(url, status, html)
+    return dict(validators, card_count=len(flashcards), card_fingerprint=card_fingerprint(flashcards))
+
+
+def revalidated_cards(url: str, cache: ScrapeCache,
+                      probe: Callable[[str, Dict], Union[int, str, Dict]] = None) -> Optional[List[Dict[str, str]]]:
+    """The cached cards of a set if they are fresh, or stale but confirmed current by
+    probe(url, entry); None when the set has to be scraped again"""
+    entry = cache.get(url, allow_stale=True)
+    if entry is None:
+        return None
+    if cache.is_fresh(entry):
+        return entry['flashcards']
+
+    if probe is not None:
+        try:
+            fingerprint = probe(url, entry)
+            if entry_matches(entry, fingerprint):
+                print(f"Cached set still current: {url}")
+                if isinstance(fingerprint, dict):
+                    # Keep the page's validators so the next check can be conditional
+                    entry.update({key: fingerprint[key] for key in ('etag', 'last_modified') if fingerprint.get(key)})
+                return cache.touch(url, entry)['flashcards']
+        except Exception as e:
+            print(f"Revalidation failed for {url}: {str(e)}")
+    return None
+
+
+def cached_scrape(url: str, cache: ScrapeCache, scrape: Callable[[str], List[Dict[str, str]]],
+                  strategy: str, probe: Callable[[str, Dict], Union[int, str, Dict]] = None) -> List[Dict[str, str]]:
+    """Serve a set from the cache, revalidating stale entries before re-scraping"""
+    flashcards = revalidated_cards(url, cache, probe)
+    if flashcards is not None:
+        return flashcards
+
+    flashcards = scrape(url)
+    if flashcards:
+        cache.put(url, flashcards, strategy)
+    return flashcards
+
+
+if __name__ == "__main__":
+    from HttpFetcher import scrape_flashcards
+
+    url = sys.argv[1] if len(sys.argv) > 1 else "https://quizlet.com/434682915/mkt327-questions-flash-cards/"
+    started = time.monotonic()
+    flashcards = cached_scrape(url, ScrapeCache(), scrape_flashcards, strategy="http", probe=http_fingerprint)
+    print(f"{len(flashcards)} flashcards in {time.monotonic() - started:.3f}s")
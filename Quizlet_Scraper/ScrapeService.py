@@ -0,0 +1,293 @@
+"""
+Long-running scrape service.
+Submit a set URL over HTTP, a bounded worker pool scrapes it, and the result can be
+polled for. Concurrent submissions of the same set share one in-flight job.
+
+    POST /jobs               {"url": "..."}  -> 202 {"job_id": ..., "status": ...}
+    GET  /jobs/<job_id>                      -> job status
+    GET  /jobs/<job_id>/result               -> {"terms": [...]} once done
+    GET  /health                             -> queue and worker counts
+
+With --snapshots, every finished set is also published as a version (see Snapshots):
+
+    GET  /sets/versions?url=...              -> the set's version manifest
+    GET  /sets/delta?url=...&since=N         -> patch from version N, or 304 if N is current
+"""
+import json
+import time
+import uuid
+import queue
+import argparse
+import threading
+from collections import OrderedDict
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, Callable, Optional
+
+from ScrapeCache import normalize_set_url
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+DEFAULT_WORKERS = 2
+# Finished jobs kept around for result polling
+MAX_FINISHED_JOBS = 1000
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class ScrapeJob:
+    def __init__(self, url: str):
+        self.job_id = uuid.uuid4().hex
+        self.url = url
+        self.status = QUEUED
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.flashcards = []
+        self.error = None
+        # Snapshot version the result was published as, when the service keeps snapshots
+        self.version = None
+        # Number of submissions this job is answering
+        self.subscribers = 1
+
+    def to_dict(self) -> Dict:
+        return {
+            'job_id': self.job_id,
+            'url': self.url,
+            'status': self.status,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'card_count': len(self.flashcards),
+            'subscribers': self.subscribers,
+            'error': self.error,
+            'version': self.version,
+        }
+
+
+class ScrapeService:
+    def __init__(self, scrape: Callable[[str], Dict], workers: int = DEFAULT_WORKERS, snapshots=None):
+        # scrape(url) returns a DriverPool-style result: {'flashcards': [...], 'error': ...}
+        self.scrape = scrape
+        self.workers = workers
+        # Optional Snapshots.SnapshotStore that finished sets are published to
+        self.snapshots = snapshots
+        self._queue = queue.Queue()
+        self._jobs = OrderedDict()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def start(self) -> None:
+        """Start the worker threads"""
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"scrape-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self) -> None:
+        """Ask every worker to exit once the queue drains"""
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def submit(self, url: str) -> ScrapeJob:
+        """Queue a set, or join the job already in flight for it"""
+        key = normalize_set_url(url)
+        with self._lock:
+            job = self._in_flight.get(key)
+            if job is not None:
+                job.subscribers += 1
+                return job
+
+            job = ScrapeJob(url)
+            self._in_flight[key] = job
+            self._jobs[job.job_id] = job
+            self._queue.put((key, job))
+            return job
+
+    def get(self, job_id: str) -> Optional[ScrapeJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'workers': len(self._threads),
+                'queued': self._queue.qsize(),
+                'in_flight': len(self._in_flight),
+                'jobs': len(self._jobs),
+            }
+
+    def _work(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            key, job = item
+
+            job.status = RUNNING
+            job.started_at = time.time()
+            try:
+                result = self.scrape(job.url)
+                job.flashcards = result.get('flashcards') or []
+                job.error = result.get('error')
+                # An empty result is a failed render, not a set that lost every card
+                if self.snapshots is not None and not job.error and job.flashcards:
+                    job.version = self.snapshots.publish(job.url, job.flashcards)['version']
+            except Exception as e:
+                job.error = str(e)
+            job.status = FAILED if job.error else DONE
+            job.finished_at = time.time()
+
+            with self._lock:
+                self._in_flight.pop(key, None)
+                self._forget_old_jobs()
+
+    def _forget_old_jobs(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in (DONE, FAILED)]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job_id]
+
+
+class ScrapeRequestHandler(BaseHTTPRequestHandler):
+    # Set by make_server
+    service: ScrapeService = None
+
+    def _send_not_modified(self) -> None:
+        self.send_response(304)
+        self.end_headers()
+
+    def _send_json(self, status: int, payload: Dict) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if self.path.rstrip('/') != '/jobs':
+            self._send_json(404, {'error': 'not found'})
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            url = json.loads(self.rfile.read(length) or b'{}').get('url')
+        except (ValueError, AttributeError):
+            url = None
+        if not url or not isinstance(url, str):
+            self._send_json(400, {'error': 'expected a JSON body with a "url"'})
+            return
+
+        job = self.service.submit(url)
+        self._send_json(202, job.to_dict())
+
+    def do_GET(self):
+        request = urlparse(self.path)
+        parts = [part for part in request.path.split('/') if part]
+
+        if parts == ['health']:
+            self._send_json(200, self.service.stats())
+            return
+
+        if len(parts) in (2, 3) and parts[0] == 'jobs':
+            job = self.service.get(parts[1])
+            if job is None:
+                self._send_json(404, {'error': 'unknown job'})
+            elif len(parts) == 2:
+                self._send_json(200, job.to_dict())
+            elif parts[2] != 'result':
+                self._send_json(404, {'error': 'not found'})
+            elif job.status == DONE:
+                self._send_json(200, {'terms': job.flashcards})
+            elif job.status == FAILED:
+                self._send_json(502, {'error': job.error})
+            else:
+                self._send_json(409, {'error': f'job is {job.status}'})
+            return
+
+        if len(parts) == 2 and parts[0] == 'sets' and parts[1] in ('versions', 'delta'):
+            self._send_snapshot(parts[1], parse_qs(request.query))
+            return
+
+        self._send_json(404, {'error': 'not found'})
+
+    def _send_snapshot(self, kind: str, query: Dict) -> None:
+        if self.service.snapshots is None:
+            self._send_json(404, {'error': 'this service keeps no snapshots'})
+            return
+        url = (query.get('url') or [None])[0]
+        if not url:
+            self._send_json(400, {'error': 'expected a "url" query parameter'})
+            return
+
+        if kind == 'versions':
+            manifest = self.service.snapshots.versions(url)
+            if manifest is None:
+                self._send_json(404, {'error': 'set was never published'})
+            else:
+                self._send_json(200, manifest)
+            return
+
+        try:
+            since = int(query['since'][0]) if 'since' in query else None
+        except ValueError:
+            self._send_json(400, {'error': '"since" must be a version number'})
+            return
+        try:
+            patch = self.service.snapshots.delta_since(url, since)
+        except KeyError:
+            self._send_json(404, {'error': 'set was never published'})
+            return
+        if patch is None:
+            self._send_not_modified()
+        else:
+            self._send_json(200, patch)
+
+    def log_message(self, format, *args):
+        print(f"[service] {self.address_string()} {format % args}")
+
+
+def make_server(service: ScrapeService, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> ThreadingHTTPServer:
+    """Bind an HTTP server in front of a scrape service"""
+    handler = type('BoundScrapeRequestHandler', (ScrapeRequestHandler,), {'service': service})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+if __name__ == "__main__":
+    from DriverPool import DriverPool
+    from ScrapeCache import ScrapeCache
+
+    parser = argparse.ArgumentParser(description="Quizlet scrape service")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--snapshots", help="publish finished sets as versioned snapshots in this directory")
+    args = parser.parse_args()
+
+    snapshots = None
+    if args.snapshots:
+        from Snapshots import SnapshotStore
+        snapshots = SnapshotStore(args.snapshots)
+
+    # One browser per worker so a job never waits on another job's browser
+    pool = DriverPool(size=args.workers, cache=ScrapeCache())
+    service = ScrapeService(pool.scrape, workers=args.workers, snapshots=snapshots)
+    service.start()
+    server = make_server(service, args.host, args.port)
+    print(f"Scrape service listening on http://{args.host}:{args.port}")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop()
+        pool.close()
@@ -0,0 +1,158 @@
+"""
+Portable browser session store.
+Saves cookies (including the anti-bot ones), localStorage and their expiry after a
+successful visit, and restores them into fresh drivers, so later scrapes can skip
+the homepage warm-up hop. Snapshots are plain JSON files, one per host.
+"""
+import os
+import json
+import time
+import tempfile
+from urllib.parse import urlparse
+from typing import Dict, Optional
+
+DEFAULT_SESSION_DIR = ".sessions"
+# Never trust a snapshot longer than this, even if its cookies claim to live longer
+DEFAULT_MAX_AGE = 6 * 60 * 60
+# Refresh a snapshot this long before it expires
+DEFAULT_REFRESH_MARGIN = 30 * 60
+
+# Cookie and storage prefixes set by the bot-detection layer (PerimeterX on Quizlet)
+ANTI_BOT_PREFIXES = ("_px", "pxcts", "__cf", "cf_clearance")
+
+LOCAL_STORAGE_SCRIPT = "return JSON.stringify(Object.entries(window.localStorage))"
+
+# Seeds localStorage on every new document of the snapshot's origin, without
+# clobbering anything the page has since written itself
+RESTORE_STORAGE_TEMPLATE = """
+(() => {
+    if (location.origin !== %(origin)s) { return; }
+    const items = %(items)s;
+    for (const [key, value] of items) {
+        if (window.localStorage.getItem(key) === null) {
+            window.localStorage.setItem(key, value);
+        }
+    }
+})();
+"""
+
+
+def host_key(url: str) -> str:
+    host = (urlparse(url).hostname or '').lower()
+    return host[4:] if host.startswith('www.') else host
+
+
+def origin_of(url: str) -> str:
+    parsed = urlparse(url)
+    return f"{parsed.scheme}://{parsed.netloc}"
+
+
+def is_anti_bot(name: str) -> bool:
+    return name.startswith(ANTI_BOT_PREFIXES)
+
+
+def capture(driver, url: str, max_age: float = DEFAULT_MAX_AGE) -> Dict:
+    """Snapshot the session state of the page currently loaded in driver"""
+    cookies = driver.execute_cdp_cmd('Network.getAllCookies', {}).get('cookies', [])
+    try:
+        local_storage = json.loads(driver.execute_script(LOCAL_STORAGE_SCRIPT) or '[]')
+    except Exception as e:
+        print(f"Error reading localStorage: {str(e)}")
+        local_storage = []
+
+    now = time.time()
+    expires_at = now + max_age
+    # The snapshot is only as good as its shortest-lived anti-bot cookie
+    for cookie in cookies:
+        expires = cookie.get('expires', -1)
+        if is_anti_bot(cookie['name']) and expires and expires > 0:
+            expires_at = min(expires_at, expires)
+
+    return {
+        'host': host_key(url),
+        'origin': origin_of(url),
+        'saved_at': now,
+        'expires_at': expires_at,
+        'cookies': cookies,
+        'local_storage': local_storage,
+        'anti_bot_tokens': sorted(cookie['name'] for cookie in cookies if is_anti_bot(cookie['name'])),
+    }
+
+
+def _settable_cookie(cookie: Dict) -> Dict:
+    """Drop the read-only fields Network.getAllCookies returns"""
+    allowed = ('name', 'value', 'domain', 'path', 'secure', 'httpOnly', 'sameSite', 'expires', 'priority')
+    params = {key: cookie[key] for key in allowed if key in cookie}
+    if params.get('expires', 0) <= 0:
+        # Session cookie
+        params.pop('expires', None)
+    return params
+
+
+def restore(driver, snapshot: Dict) -> None:
+    """Load a snapshot into a fresh driver before its first navigation"""
+    cookies = [_settable_cookie(cookie) for cookie in snapshot['cookies']]
+    if cookies:
+        driver.execute_cdp_cmd('Network.setCookies', {'cookies': cookies})
+
+    if snapshot['local_storage']:
+        source = RESTORE_STORAGE_TEMPLATE % {
+            'origin': json.dumps(snapshot['origin']),
+            'items': json.dumps(snapshot['local_storage']),
+        }
+        driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {'source': source})
+
+
+class SessionStore:
+    def __init__(self, session_dir: str = DEFAULT_SESSION_DIR, max_age: float = DEFAULT_MAX_AGE,
+                 refresh_margin: float = DEFAULT_REFRESH_MARGIN):
+        self.session_dir = session_dir
+        self.max_age = max_age
+        self.refresh_margin = refresh_margin
+        os.makedirs(session_dir, exist_ok=True)
+
+    def _path(self, url: str) -> str:
+        return os.path.join(self.session_dir, f"{host_key(url)}.json")
+
+    def load(self, url: str) -> Optional[Dict]:
+        """The saved snapshot for url's host, or None if missing or expired"""
+        try:
+            with open(self._path(url), 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable session snapshot: {str(e)}")
+            return None
+
+        if snapshot['expires_at'] <= time.time():
+            return None
+        return snapshot
+
+    def needs_refresh(self, url: str) -> bool:
+        """Whether the host has no snapshot or its snapshot is about to expire"""
+        snapshot = self.load(url)
+        return snapshot is None or snapshot['expires_at'] - time.time() < self.refresh_margin
+
+    def save(self, url: str, driver) -> Dict:
+        """Capture the driver's session and store it for url's host"""
+        snapshot = capture(driver, url, max_age=self.max_age)
+        fd, tmp_path = tempfile.mkstemp(dir=self.session_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, self._path(url))
+        except Exception:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        return snapshot
+
+    def invalidate(self, url: str) -> None:
+        """Forget a host's snapshot, e.g. after it led to a challenge page"""
+        try:
+            os.remove(self._path(url))
+        except OSError:
+            pass
@@ -0,0 +1,251 @@
+"""
+Versioned snapshots of each set, with card-level deltas between versions.
+Every publish of a set whose cards changed becomes version N+1: a full snapshot plus
+a small delta from N (cards added, removed and edited). A consumer holding version N
+asks for delta_since(N) and gets nothing (not modified), the patch to the latest
+version, or the full set when N is too old to patch from. apply_delta() is the
+reference for how a consumer applies a patch.
+
+Cards get an integer id within their set the first time they appear and keep it
+through edits, so a patch can name cards without repeating them.
+
+    snapshots/<set>/versions.json     latest version, and every retained one
+    snapshots/<set>/v<N>.json         {"terms": [{"id", "term", "definition"}, ...]}
+    snapshots/<set>/delta-<N>.json    patch from version N-1 to N
+
+    python Snapshots.py publish flashcards.json --url https://quizlet.com/434682915/...
+    python Snapshots.py delta https://quizlet.com/434682915/... --since 3
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from collections import defaultdict, deque
+from typing import Dict, List, Optional
+
+from ScrapeCache import normalize_set_url, content_hash
+from OutputSinks import read_cards, write_cards, atomic_write_bytes, set_file_name
+
+DEFAULT_SNAPSHOT_DIR = "snapshots"
+# Versions kept per set; consumers further behind than this get the full set
+DEFAULT_KEEP_VERSIONS = 20
+VERSIONS_NAME = "versions.json"
+
+
+def _pop_match(index: Dict, key, taken: set) -> Optional[int]:
+    """First id under key that hasn't been matched yet"""
+    candidates = index.get(key)
+    while candidates:
+        card_id = candidates.popleft()
+        if card_id not in taken:
+            return card_id
+    return None
+
+
+def assign_ids(previous: List[Dict], flashcards: List[Dict[str, str]], next_id: int):
+    """Give flashcards ids carried over from previous (cards that already have ids).
+    Returns (cards with ids, next free id).
+
+    An unchanged card keeps its id, and so does a card whose term or definition (not
+    both) changed; anything else gets a new id."""
+    exact, by_term, by_definition = defaultdict(deque), defaultdict(deque), defaultdict(deque)
+    for card in previous:
+        exact[(card['term'], card['definition'])].append(card['id'])
+        by_term[card['term']].append(card['id'])
+        by_definition[card['definition']].append(card['id'])
+
+    ids = [None] * len(flashcards)
+    taken = set()
+    # Exact matches first, so a reordered set isn't mistaken for a pile of edits
+    passes = ((exact, lambda card: (card['term'], card['definition'])),
+              (by_term, lambda card: card['term']),
+              (by_definition, lambda card: card['definition']))
+    for index, key in passes:
+        for i, card in enumerate(flashcards):
+            if ids[i] is None:
+                card_id = _pop_match(index, key(card), taken)
+                if card_id is not None:
+                    ids[i] = card_id
+                    taken.add(card_id)
+
+    cards = []
+    for card_id, card in zip(ids, flashcards):
+        if card_id is None:
+            card_id = next_id
+            next_id += 1
+        cards.append({'id': card_id, 'term': card['term'], 'definition': card['definition']})
+    return cards, next_id
+
+
+def card_delta(previous: List[Dict], cards: List[Dict]) -> Dict:
+    """Patch turning one snapshot's cards into another's"""
+    before = {card['id']: card for card in previous}
+    after = {card['id'] for card in cards}
+    delta = {
+        'added': [card for card in cards if card['id'] not in before],
+        'edited': [card for card in cards if card['id'] in before and card != before[card['id']]],
+        'removed': [card['id'] for card in previous if card['id'] not in after],
+    }
+    # Order is only sent when it isn't "old order, minus removed, plus added at the end"
+    order = [card['id'] for card in cards]
+    if order != _default_order(previous, delta):
+        delta['order'] = order
+    return delta
+
+
+def _default_order(previous: List[Dict], delta: Dict) -> List[int]:
+    removed = set(delta['removed'])
+    return [card['id'] for card in previous if card['id'] not in removed] + [card['id'] for card in delta['added']]
+
+
+def apply_delta(cards: List[Dict], delta: Dict) -> List[Dict]:
+    """The cards of delta['to'], from the cards of delta['from']"""
+    if delta.get('full'):
+        return list(delta['terms'])
+    by_id = {card['id']: card for card in cards}
+    for card_id in delta['removed']:
+        by_id.pop(card_id, None)
+    for card in delta['edited'] + delta['added']:
+        by_id[card['id']] = card
+    order = delta.get('order') or _default_order(cards, delta)
+    return [by_id[card_id] for card_id in order]
+
+
+class SnapshotStore:
+    def __init__(self, directory: str = DEFAULT_SNAPSHOT_DIR, keep_versions: int = DEFAULT_KEEP_VERSIONS):
+        self.directory = directory
+        self.keep_versions = keep_versions
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def set_dir(self, url: str) -> str:
+        return os.path.join(self.directory, set_file_name(url))
+
+    def _path(self, url: str, name: str) -> str:
+        return os.path.join(self.set_dir(url), name)
+
+    def versions(self, url: str) -> Optional[Dict]:
+        """The set's version manifest, or None if it was never published"""
+        try:
+            with open(self._path(url, VERSIONS_NAME), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def snapshot(self, url: str, version: int) -> List[Dict]:
+        return list(read_cards(self._path(url, f"v{version}.json")))
+
+    def latest(self, url: str) -> Optional[Dict]:
+        """{'version': N, 'terms': [...]} for the newest version"""
+        with self._lock:
+            manifest = self.versions(url)
+            if manifest is None:
+                return None
+            return {'version': manifest['latest'], 'terms': self.snapshot(url, manifest['latest'])}
+
+    def publish(self, url: str, flashcards: List[Dict[str, str]]) -> Dict:
+        """Record a scrape; a new version is only cut when the cards changed.
+        Returns the version's manifest entry plus 'changed'."""
+        with self._lock:
+            manifest = self.versions(url)
+            digest = content_hash(flashcards)
+            if manifest is not None:
+                current = manifest['versions'][-1]
+                if current['content_hash'] == digest:
+                    return dict(current, changed=False)
+                previous = self.snapshot(url, manifest['latest'])
+            else:
+                manifest = {'url': normalize_set_url(url), 'latest': 0, 'next_id': 0, 'versions': []}
+                previous = []
+
+            version = manifest['latest'] + 1
+            cards, manifest['next_id'] = assign_ids(previous, flashcards, manifest['next_id'])
+            delta = card_delta(previous, cards)
+            os.makedirs(self.set_dir(url), exist_ok=True)
+            snapshot_entry = write_cards(self._path(url, f"v{version}.json"), cards, url=url, manifest=False)
+
+            delta.update({'from': version - 1, 'to': version})
+            delta_bytes = json.dumps(delta, ensure_ascii=False).encode('utf-8')
+            atomic_write_bytes(self._path(url, f"delta-{version}.json"), delta_bytes)
+
+            entry = {
+                'version': version,
+                'content_hash': digest,
+                'cards': len(cards),
+                'bytes': snapshot_entry['bytes'],
+                'sha256': snapshot_entry['sha256'],
+                'delta_bytes': len(delta_bytes),
+                'added': len(delta['added']),
+                'edited': len(delta['edited']),
+                'removed': len(delta['removed']),
+                'published_at': time.time(),
+            }
+            manifest['versions'].append(entry)
+            manifest['latest'] = version
+            expired = manifest['versions'][:-self.keep_versions]
+            manifest['versions'] = manifest['versions'][-self.keep_versions:]
+            # Manifest last: until it lands, readers keep seeing the previous version
+            atomic_write_bytes(self._path(url, VERSIONS_NAME),
+                               json.dumps(manifest, ensure_ascii=False, indent=2).encode('utf-8'))
+            for old in expired:
+                for name in (f"v{old['version']}.json", f"delta-{old['version']}.json"):
+                    try:
+                        os.remove(self._path(url, name))
+                    except OSError:
+                        pass
+            return dict(entry, changed=True)
+
+    def delta_since(self, url: str, since: Optional[int]) -> Optional[Dict]:
+        """What a consumer holding version `since` needs to reach the latest version:
+        None when it is already current, a patch when `since` is still retained,
+        otherwise {'full': True, 'terms': [...]}. KeyError for unknown sets."""
+        # Under the lock, so a publish can't expire the files between reading the
+        # manifest and reading the snapshots it names
+        with self._lock:
+            manifest = self.versions(url)
+            if manifest is None:
+                raise KeyError(url)
+            latest = manifest['latest']
+            if since == latest:
+                return None
+            retained = {entry['version'] for entry in manifest['versions']}
+            if since is None or since not in retained or since > latest:
+                return {'from': since, 'to': latest, 'full': True, 'terms': self.snapshot(url, latest)}
+            if since == latest - 1:
+                with open(self._path(url, f"delta-{latest}.json"), 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            # Several versions behind: diff the two snapshots directly, ids make it exact
+            delta = card_delta(self.snapshot(url, since), self.snapshot(url, latest))
+            delta.update({'from': since, 'to': latest})
+            return delta
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Versioned set snapshots and deltas")
+    parser.add_argument("--dir", default=DEFAULT_SNAPSHOT_DIR)
+    commands = parser.add_subparsers(dest="command", required=True)
+    publish = commands.add_parser("publish", help="record a saved flashcards file as a new version")
+    publish.add_argument("file")
+    publish.add_argument("--url", required=True, help="set the file was scraped from")
+    versions = commands.add_parser("versions", help="print a set's version manifest")
+    versions.add_argument("url")
+    delta = commands.add_parser("delta", help="print the patch from a version to the latest")
+    delta.add_argument("url")
+    delta.add_argument("--since", type=int)
+    args = parser.parse_args()
+
+    store = SnapshotStore(args.dir)
+    if args.command == "publish":
+        entry = store.publish(args.url, list(read_cards(args.file)))
+        print(f"Version {entry['version']}: {entry['cards']} cards" +
+              (f", +{entry['added']} ~{entry['edited']} -{entry['removed']}" if entry['changed'] else " (unchanged)"))
+    elif args.command == "versions":
+        json.dump(store.versions(args.url), sys.stdout, ensure_ascii=False, indent=2)
+    else:
+        patch = store.delta_since(args.url, args.since)
+        if patch is None:
+            print("Not modified")
+        else:
+            json.dump(patch, sys.stdout, ensure_ascii=False, indent=2)
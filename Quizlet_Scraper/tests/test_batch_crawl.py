@@ -0,0 +1,78 @@
+from BatchCrawl import (BatchCrawl, CrawlJournal, classify_error, pending_urls,
+                        DONE, FAILED, STARTED, ERROR_CAPTCHA, ERROR_NOT_FOUND, ERROR_TIMEOUT,
+                        ERROR_UNKNOWN)
+
+A = "https://quizlet.com/111111/a/"
+B = "https://quizlet.com/222222/b/"
+CARDS = [{'term': 't', 'definition': 'd'}]
+
+
+def test_classify_error_ignores_urls():
+    assert classify_error("TimeoutException", "timed out") == ERROR_TIMEOUT
+    assert classify_error("Exception", "404 Not Found") == ERROR_NOT_FOUND
+    assert classify_error("ChallengeError", "") == ERROR_CAPTCHA
+    assert classify_error("Exception", "failed on https://quizlet.com/404/captcha-basics/") == ERROR_UNKNOWN
+
+
+def test_journal_replay_skips_torn_line(tmp_path):
+    path = tmp_path / "crawl.journal"
+    journal = CrawlJournal(str(path))
+    journal.open()
+    journal.append({'key': 'a', 'url': A, 'status': STARTED})
+    journal.append({'key': 'a', 'url': A, 'status': DONE, 'flashcards': CARDS})
+    journal.close()
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"key": "b", "url"')
+
+    assert [record['status'] for record in journal.records()] == [STARTED, DONE]
+    assert list(journal.results()) == [{'url': A, 'flashcards': CARDS}]
+
+    # Reopening terminates the torn line, so the next record parses
+    journal.open()
+    journal.append({'key': 'b', 'url': B, 'status': STARTED})
+    journal.close()
+    assert journal.state()['b'] == {'url': B, 'status': STARTED, 'attempts': 1, 'error_kind': None}
+
+
+def test_state_keeps_done_over_later_attempts(tmp_path):
+    journal = CrawlJournal(str(tmp_path / "crawl.journal"))
+    journal.open()
+    for status in (STARTED, DONE, STARTED):
+        journal.append({'key': 'a', 'url': A, 'status': status})
+    journal.close()
+    assert journal.state()['a']['status'] == DONE
+    assert journal.state()['a']['attempts'] == 2
+
+
+def test_pending_urls():
+    state = {
+        'done': {'status': DONE, 'attempts': 1, 'error_kind': None},
+        'gone': {'status': FAILED, 'attempts': 1, 'error_kind': ERROR_NOT_FOUND},
+        'flaky': {'status': FAILED, 'attempts': 1, 'error_kind': ERROR_TIMEOUT},
+        'spent': {'status': FAILED, 'attempts': 3, 'error_kind': ERROR_TIMEOUT},
+    }
+    keyed = {key: f"https://quizlet.com/{i}/{key}/" for i, key in enumerate(state, 1)}
+    state = {f"https://quizlet.com/{i}/{key}/": entry for i, (key, entry) in enumerate(state.items(), 1)}
+    urls = list(keyed.values()) + [A, A]
+    assert pending_urls(urls, state, max_attempts=3) == [keyed['flaky'], A]
+
+
+def test_resume_only_scrapes_unfinished(tmp_path):
+    path = str(tmp_path / "crawl.journal")
+    calls = []
+
+    def flaky(url):
+        calls.append(url)
+        if url == B and calls.count(B) == 1:
+            raise RuntimeError("timed out")
+        return {'flashcards': CARDS}
+
+    first = BatchCrawl(path, flaky, max_attempts=1)
+    first.run([A, B])
+    assert calls == [A, B]
+    assert first.summary()[DONE] == 1
+
+    resumed = BatchCrawl(path, flaky, max_attempts=2)
+    resumed.run([A, B])
+    assert calls == [A, B, B]
+    assert resumed.summary() == {DONE: 2}
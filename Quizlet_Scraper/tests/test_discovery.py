@@ -0,0 +1,89 @@
+from Discovery import (BloomFilter, Frontier, classify_link, normalize_url,
+                       KIND_SET, KIND_LISTING, DONE, FAILED, PENDING)
+
+SET_URL = "https://quizlet.com/434682915/biology-flash-cards/"
+
+
+def test_bloom_filter_dedup():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    assert bloom.add("a") is False
+    assert bloom.add("a") is True
+    assert "a" in bloom
+    assert "b" not in bloom
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=500, error_rate=0.01)
+    keys = [f"https://quizlet.com/{i}/set/" for i in range(500)]
+    for key in keys:
+        bloom.add(key)
+    assert all(key in bloom for key in keys)
+
+
+def test_classify_link():
+    assert classify_link(SET_URL) == KIND_SET
+    assert classify_link("https://quizlet.com/434682915/sets/") == KIND_SET
+    assert classify_link("https://quizlet.com/jdoe/sets") == KIND_LISTING
+    assert classify_link("https://quizlet.com/class/123/") == KIND_LISTING
+    assert classify_link("https://quizlet.com/jdoe") is None
+    assert classify_link("https://quizlet.com/jdoe", seed=True) == KIND_LISTING
+    assert classify_link("https://example.com/434682915/x/") is None
+
+
+def test_normalize_listing_url_drops_tracking_and_first_page():
+    url = "https://www.quizlet.com/jdoe/sets?page=1&utm_source=x"
+    assert normalize_url(url, KIND_LISTING) == "https://quizlet.com/jdoe/sets/"
+    assert normalize_url("https://quizlet.com/jdoe/sets?page=2", KIND_LISTING) == \
+        "https://quizlet.com/jdoe/sets/?page=2"
+
+
+def test_frontier_dedups_across_spellings(tmp_path):
+    with Frontier(str(tmp_path / "frontier.db")) as frontier:
+        assert frontier.add(SET_URL) is True
+        assert frontier.add(SET_URL) is False
+        assert frontier.add("https://www.quizlet.com/434682915/biology-flash-cards?x=1") is False
+        assert frontier.add_links(["https://quizlet.com/jdoe/sets", "https://example.com/"], depth=1) == 1
+
+
+def test_frontier_dedup_survives_reopen(tmp_path):
+    path = str(tmp_path / "frontier.db")
+    with Frontier(path) as frontier:
+        frontier.add(SET_URL)
+    with Frontier(path) as frontier:
+        assert frontier.add(SET_URL) is False
+
+
+def test_frontier_claim_orders_by_depth_and_retries(tmp_path):
+    with Frontier(str(tmp_path / "frontier.db"), max_attempts=2) as frontier:
+        frontier.add("https://quizlet.com/222222/deep/", depth=2)
+        frontier.add("https://quizlet.com/111111/shallow/", depth=0)
+        claimed = frontier.claim(KIND_SET, 1)
+        assert [entry['url'] for entry in claimed] == ["https://quizlet.com/111111/"]
+
+        assert frontier.finish(claimed[0], error_kind="timeout") == PENDING
+        retry = frontier.claim(KIND_SET, 1)[0]
+        assert retry['attempts'] == 2
+        assert frontier.finish(retry, error_kind="timeout") == FAILED
+
+        assert frontier.finish(frontier.claim(KIND_SET, 1)[0]) == DONE
+        assert frontier.claim(KIND_SET, 1) == []
+
+
+def test_frontier_requeues_in_progress_after_crash(tmp_path):
+    path = str(tmp_path / "frontier.db")
+    with Frontier(path) as frontier:
+        frontier.add(SET_URL)
+        assert len(frontier.claim(KIND_SET, 10)) == 1
+    with Frontier(path) as frontier:
+        assert len(frontier.claim(KIND_SET, 10)) == 1
+
+
+def test_frontier_listing_ttl(tmp_path):
+    with Frontier(str(tmp_path / "frontier.db"), listing_ttl=0) as frontier:
+        frontier.add("https://quizlet.com/jdoe/sets")
+        frontier.finish(frontier.claim(KIND_LISTING, 1)[0])
+        assert len(frontier.claim(KIND_LISTING, 1)) == 1
+    with Frontier(str(tmp_path / "once.db"), listing_ttl=None) as frontier:
+        frontier.add("https://quizlet.com/jdoe/sets")
+        frontier.finish(frontier.claim(KIND_LISTING, 1)[0])
+        assert frontier.claim(KIND_LISTING, 1) == []
@@ -0,0 +1,59 @@
+from GradingIndex import index_card, grade, CORRECT, INCORRECT, AMBIGUOUS
+
+AUSTRIA = {'term': 'Austria', 'definition': 'Country whose capital is Vienna'}
+AUSTRIA_MC = {
+    'term': 'Which country has Vienna as its capital?\na. Australia\nb. Austria\nc. Germany',
+    'definition': 'b',
+}
+
+
+def test_free_exact_and_filler():
+    entry = index_card(AUSTRIA)
+    assert grade(entry, 'Austria') == (CORRECT, 1.0)
+    assert grade(entry, "I think it's austria") == (CORRECT, 1.0)
+
+
+def test_free_sound_alike_country_is_not_accepted():
+    # Austria and Australia share a Soundex code but are different answers
+    verdict, _ = grade(index_card(AUSTRIA), 'Australia')
+    assert verdict != CORRECT
+
+
+def test_free_misspelling_is_accepted():
+    entry = index_card({'term': 'nucleus', 'definition': 'Control center of the cell'})
+    assert grade(entry, 'nucleous') == (CORRECT, 0.9)
+
+
+def test_free_split_words_are_joined():
+    entry = index_card({'term': 'photosynthesis', 'definition': 'How plants make sugar'})
+    assert grade(entry, 'photo synthesis') == (CORRECT, 1.0)
+
+
+def test_free_unrelated_answer_is_ambiguous():
+    assert grade(index_card(AUSTRIA), 'Ostria')[0] == AMBIGUOUS
+
+
+def test_multiple_choice_correct_letter():
+    entry = index_card(AUSTRIA_MC)
+    assert entry['correct_letter'] == 'b'
+    assert grade(entry, 'b') == (CORRECT, 1.0)
+    assert grade(entry, 'bee') == (CORRECT, 1.0)
+    assert grade(entry, 'option a') == (INCORRECT, 1.0)
+
+
+def test_multiple_choice_by_option_text():
+    entry = index_card(AUSTRIA_MC)
+    assert grade(entry, 'Austria') == (CORRECT, 1.0)
+    assert grade(entry, 'Germany')[0] == INCORRECT
+
+
+def test_multiple_choice_sound_alike_needs_close_spelling():
+    entry = index_card(AUSTRIA_MC)
+    assert grade(entry, 'Australia')[0] == INCORRECT
+    assert grade(entry, 'Austrea') == (CORRECT, 0.9)
+
+
+def test_multiple_choice_answer_given_as_option_text():
+    entry = index_card({'term': 'Pick one\na. red\nb. blue', 'definition': 'blue'})
+    assert entry['correct_letter'] == 'b'
+    assert grade(entry, 'blue') == (CORRECT, 1.0)
@@ -0,0 +1,81 @@
+import pytest
+
+from Snapshots import SnapshotStore, assign_ids, card_delta, apply_delta
+
+URL = "https://quizlet.com/434682915/biology-flash-cards/"
+
+
+def cards(*pairs):
+    return [{'term': term, 'definition': definition} for term, definition in pairs]
+
+
+V1 = cards(('a', '1'), ('b', '2'), ('c', '3'))
+
+
+def round_trip(before, after):
+    previous, next_id = assign_ids([], before, 0)
+    current, _ = assign_ids(previous, after, next_id)
+    delta = card_delta(previous, current)
+    assert apply_delta(previous, delta) == current
+    return previous, current, delta
+
+
+def test_edit_keeps_id():
+    previous, current, delta = round_trip(V1, cards(('a', '1'), ('b', 'two'), ('c', '3')))
+    assert current[1]['id'] == previous[1]['id']
+    assert [card['id'] for card in delta['edited']] == [previous[1]['id']]
+    assert delta['added'] == [] and delta['removed'] == []
+    assert 'order' not in delta
+
+
+def test_add_and_remove():
+    previous, current, delta = round_trip(V1, cards(('a', '1'), ('c', '3'), ('d', '4')))
+    assert delta['removed'] == [previous[1]['id']]
+    assert [card['term'] for card in delta['added']] == ['d']
+    assert 'order' not in delta
+
+
+def test_reorder_is_not_an_edit():
+    _, _, delta = round_trip(V1, list(reversed(V1)))
+    assert delta['edited'] == [] and delta['added'] == [] and delta['removed'] == []
+    assert len(delta['order']) == 3
+
+
+def test_duplicate_cards():
+    round_trip(cards(('a', '1'), ('a', '1')), cards(('a', '1'), ('a', '1'), ('a', '1')))
+    round_trip(cards(('a', '1'), ('a', '1'), ('b', '2')), cards(('b', '2'), ('a', '1')))
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SnapshotStore(str(tmp_path / "snapshots"), keep_versions=3)
+
+
+def test_publish_only_versions_changes(store):
+    assert store.publish(URL, V1)['changed'] is True
+    assert store.publish(URL, V1)['changed'] is False
+    assert store.latest(URL)['version'] == 1
+
+
+def test_delta_since_round_trips(store):
+    versions = [V1, V1 + cards(('d', '4')), cards(('d', '4'), ('a', 'one'), ('c', '3'))]
+    for version in versions:
+        store.publish(URL, version)
+    held = store.snapshot(URL, 1)
+    delta = store.delta_since(URL, 1)
+    assert (delta['from'], delta['to']) == (1, 3)
+    latest = store.latest(URL)
+    assert apply_delta(held, delta) == latest['terms']
+    assert [(card['term'], card['definition']) for card in latest['terms']] == \
+        [('d', '4'), ('a', 'one'), ('c', '3')]
+    assert store.delta_since(URL, 3) is None
+
+
+def test_delta_since_expired_version_is_full(store):
+    for i in range(5):
+        store.publish(URL, V1 + cards((f"x{i}", str(i))))
+    delta = store.delta_since(URL, 1)
+    assert delta['full'] is True
+    assert apply_delta([], delta) == store.latest(URL)['terms']
+    with pytest.raises(KeyError):
+        store.delta_since("https://quizlet.com/999/unknown/", 1)